@@ -0,0 +1,241 @@
+"""
+Аутентификация по токену с кешированием.
+
+CachedTokenAuthentication:
+    Вместо запроса `Token` + `User` на каждый запрос берёт токен из
+    ограниченного LRU-кеша процесса, а при промахе — из общего кеша
+    `AUTH_TOKEN_SHARED_CACHE`, если он задан.
+
+В кеше хранится не пользователь целиком, а `CACHED_USER_FIELDS`
+(без пароля, почты и профиля): `request.user` собирается из них,
+остальные поля при обращении дочитываются из базы. Представления,
+которым нужен профиль, читают пользователя сами.
+
+Записи сбрасываются сигналами из `api/signals.py` при удалении токена
+(выход через djoser) и при сохранении пользователя (деактивация, смена
+пароля, изменение профиля). Процесс, выполнивший сброс, удаляет свою
+запись сразу, остальные узнают о нём не позже чем через
+`AUTH_TOKEN_CACHE_VERIFY_INTERVAL` секунд:
+    - с общим кешем сброс меняет версию токена в нём, и процесс сверяет
+      с ней свою запись не чаще раза в этот интервал (один `get` общего
+      кеша вместо запроса к базе на каждый запрос);
+    - без общего кеша запись процесса живёт только этот интервал.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+SHARED_KEY: str = 'auth-token:{digest}'
+VERSION_KEY: str = 'auth-token:version:{digest}'
+
+# Поля пользователя в кеше: нужные для проверки прав.
+CACHED_USER_FIELDS: tuple[str, ...] = (
+    'id', 'is_active', 'is_staff', 'is_superuser',
+)
+
+# Кеши, живущие внутри одного процесса.
+PROCESS_LOCAL_BACKENDS: frozenset[str] = frozenset({
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+})
+
+
+def shared_cache_alias() -> str:
+    """Алиас общего для процессов кеша токенов или пустая строка."""
+    alias = settings.AUTH_TOKEN_SHARED_CACHE
+    if not alias:
+        return ''
+    backend = settings.CACHES.get(alias, {}).get('BACKEND', '')
+    return '' if backend in PROCESS_LOCAL_BACKENDS else alias
+
+
+def project(token) -> tuple:
+    """Значения `CACHED_USER_FIELDS` пользователя токена."""
+    return tuple(getattr(token.user, field) for field in CACHED_USER_FIELDS)
+
+
+def restore(key: str, projection: tuple):
+    """Токен с пользователем, загруженным только из `CACHED_USER_FIELDS`.
+    """
+    user = User.from_db(DEFAULT_DB_ALIAS, CACHED_USER_FIELDS, projection)
+    token = Token.from_db(DEFAULT_DB_ALIAS, ('key', 'user_id'), (key, user.pk))
+    token.user = user
+    return token
+
+
+class TokenCache:
+    """Потокобезопасный LRU-кеш токенов с ограниченным временем жизни.
+
+    Запись процесса и запись общего кеша помнят версию токена, с которой
+    были прочитаны из базы, и считаются промахом, если версия с тех пор
+    сменилась.
+    """
+
+    def __init__(self, max_size: int, ttl: float, verify_interval: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.verify_interval = verify_interval
+        self.hits = 0
+        self.misses = 0
+        # key -> [истекает, сверена с общим кешем, версия, поля].
+        self._entries: OrderedDict[str, list] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        alias = shared_cache_alias()
+        return caches[alias] if alias else None
+
+    @staticmethod
+    def _digest(key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def shared_key(cls, key: str) -> str:
+        return SHARED_KEY.format(digest=cls._digest(key))
+
+    @classmethod
+    def version_key(cls, key: str) -> str:
+        return VERSION_KEY.format(digest=cls._digest(key))
+
+    def version(self, key: str):
+        """Текущая версия токена; читается до запроса к базе."""
+        shared = self.shared
+        return None if shared is None else shared.get(self.version_key(key))
+
+    def get(self, key: str):
+        """Возвращает токен из кеша или None."""
+        projection = self._get_local(key)
+        if projection is None:
+            projection = self._get_shared(key)
+        with self._lock:
+            if projection is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return restore(key, projection)
+
+    def _get_local(self, key: str) -> Optional[tuple]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, verified, version, projection = entry
+            if expires <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            if now - verified < self.verify_interval:
+                return projection
+        shared = self.shared
+        if shared is not None and (
+            shared.get(self.version_key(key)) == version
+        ):
+            with self._lock:
+                entry[1] = now
+            return projection
+        with self._lock:
+            self._entries.pop(key, None)
+        return None
+
+    def _get_shared(self, key: str) -> Optional[tuple]:
+        shared = self.shared
+        if shared is None:
+            return None
+        found = shared.get_many([self.shared_key(key), self.version_key(key)])
+        stored = found.get(self.shared_key(key))
+        if stored is None or stored[0] != found.get(self.version_key(key)):
+            return None
+        self._store(key, *stored)
+        return stored[1]
+
+    def set(self, key: str, token, version) -> None:
+        """Кладёт токен, прочитанный из базы при версии `version`."""
+        projection = project(token)
+        self._store(key, version, projection)
+        shared = self.shared
+        if shared is not None:
+            shared.set(
+                self.shared_key(key), (version, projection), timeout=self.ttl
+            )
+
+    def _store(self, key: str, version, projection: tuple) -> None:
+        now = time.monotonic()
+        # Без общего кеша сброс в другом процессе не виден:
+        # запись живёт не дольше интервала сверки.
+        lifetime = self.ttl if self.shared is not None else min(
+            self.ttl, self.verify_interval
+        )
+        with self._lock:
+            self._entries[key] = [now + lifetime, now, version, projection]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[str]) -> None:
+        """Сбрасывает токены во всех процессах.
+
+        Сначала удаляет записи общего кеша, затем меняет версии: процесс,
+        прочитавший старую запись до удаления, отбросит её по версии.
+        Версия живёт дольше записей, иначе её истечение вернуло бы
+        силу записи, сохранённой до сброса.
+        """
+        keys = list(keys)
+        if not keys:
+            return
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        shared = self.shared
+        if shared is None:
+            return
+        shared.delete_many([self.shared_key(key) for key in keys])
+        shared.set_many(
+            {self.version_key(key): time.time_ns() for key in keys},
+            timeout=self.ttl * 2,
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+token_cache = TokenCache(
+    max_size=settings.AUTH_TOKEN_CACHE_SIZE,
+    ttl=settings.AUTH_TOKEN_CACHE_TTL,
+    verify_interval=settings.AUTH_TOKEN_CACHE_VERIFY_INTERVAL,
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """`TokenAuthentication`, обращающийся к базе только при промахе кеша."""
+
+    def authenticate_credentials(self, key: str):
+        token = token_cache.get(key)
+        if token is None:
+            version = token_cache.version(key)
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, token, version)
+            return user, token
+        return token.user, token
@@ -0,0 +1,343 @@
+"""
+Потоковый импорт и экспорт каталога рецептов в формате NDJSON.
+
+Каждая строка - отдельный рецепт в JSON:
+
+    {"name": "Омлет", "text": "...", "cooking_time": 10,
+     "image": "data:image/png;base64,...",
+     "tags": ["breakfast"],
+     "ingredients": [{"name": "яйца", "measurement_unit": "шт", "amount": 3}]}
+
+Теги указываются слагом или названием, ингредиенты - названием
+и единицей измерения (единицу можно опустить, если название однозначно).
+При экспорте дополнительно выводятся `id`, `author` и `pub_date`,
+а `image` - ссылкой на файл или, по запросу, base64-строкой.
+Импорт эти поля игнорирует.
+
+Импорт читает строки по одной, проверяет их правилами
+`CreateRecipeSerializer` и записывает пачками через `bulk_create`.
+Названия тегов и ингредиентов разрешаются по словарям в памяти,
+поэтому проверка строки не обращается к базе данных.
+Экспорт читает рецепты через `iterator()` (на PostgreSQL - серверным
+курсором), так что ни в одном направлении каталог не загружается целиком.
+"""
+import base64
+import json
+import mimetypes
+import random
+import string
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+
+from api import counters, surrogate
+from api.pantry import recipes_changed
+from api.prerender import RECIPES, schedule_prerender
+from api.serializers import CreateRecipeSerializer
+from api.similar import schedule_update as schedule_similar_update
+from api.surrogate import schedule_purge
+from food.models import (
+    SHORT_CODE_LENGTH, Ingredient, Recipe, RecipeIngredient, Tag,
+)
+from jobs.queue import enqueue, enqueue_many
+
+NDJSON_CONTENT_TYPE: str = 'application/x-ndjson'
+IMPORT_BATCH_SIZE: int = 100
+EXPORT_CHUNK_SIZE: int = 500
+SHORT_CODE_ALPHABET: str = string.ascii_letters + string.digits
+# Сколько ошибок вернуть в отчёте, остальные только подсчитываются.
+MAX_REPORTED_ERRORS: int = 100
+
+
+@dataclass
+class ImportReport:
+    """Итоги импорта."""
+    created: int = 0
+    failed: int = 0
+    errors: list[dict[str, Any]] = field(default_factory=list)
+
+    def add_error(self, line: int, errors: Any) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+
+class RecipeImporter:
+    """Импортирует рецепты из строк NDJSON от имени автора."""
+
+    def __init__(self, author, batch_size: int = IMPORT_BATCH_SIZE) -> None:
+        self.author = author
+        self.batch_size = batch_size
+        self.report = ImportReport()
+
+        tags = Tag.objects.in_bulk()
+        ingredients = Ingredient.objects.in_bulk()
+        self.preloaded = {Tag: tags, Ingredient: ingredients}
+        self.tag_ids: dict[str, int] = {}
+        for tag in tags.values():
+            self.tag_ids[tag.name.lower()] = tag.pk
+            self.tag_ids[tag.slug.lower()] = tag.pk
+        self.ingredient_ids: dict[tuple[str, str], int] = {}
+        # По одному названию, если единица измерения не указана.
+        # None - название встречается с разными единицами.
+        self.ingredient_ids_by_name: dict[str, Optional[int]] = {}
+        for ingredient in ingredients.values():
+            name = ingredient.name.lower()
+            unit = ingredient.measurement_unit.lower()
+            self.ingredient_ids[(name, unit)] = ingredient.pk
+            self.ingredient_ids_by_name[name] = (
+                None if name in self.ingredient_ids_by_name else ingredient.pk
+            )
+
+    def run(self, lines: Iterable) -> ImportReport:
+        """Импортирует строки и возвращает отчёт."""
+        batch: list[tuple[int, dict]] = []
+        for number, line in enumerate(lines, start=1):
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            if not line.strip():
+                continue
+            validated = self.validate_line(number, line)
+            if validated is None:
+                continue
+            batch.append((number, validated))
+            if len(batch) >= self.batch_size:
+                self.write_batch(batch)
+                batch = []
+        if batch:
+            self.write_batch(batch)
+        return self.report
+
+    def validate_line(self, number: int, line: str) -> Optional[dict]:
+        """Проверяет строку. Ошибки записывает в отчёт и возвращает None."""
+        try:
+            item = json.loads(line)
+        except ValueError:
+            self.report.add_error(number, 'Строка не является JSON.')
+            return None
+        if not isinstance(item, dict):
+            self.report.add_error(number, 'Ожидается объект JSON.')
+            return None
+
+        data, errors = self.resolve_names(item)
+        if errors:
+            self.report.add_error(number, errors)
+            return None
+
+        serializer = CreateRecipeSerializer(
+            data=data, context={'preloaded': self.preloaded}
+        )
+        if not serializer.is_valid():
+            self.report.add_error(number, serializer.errors)
+            return None
+        return serializer.validated_data
+
+    def resolve_names(self, item: dict) -> tuple[dict, dict]:
+        """Заменяет названия тегов и ингредиентов на их id."""
+        data = {
+            key: item[key]
+            for key in ('name', 'text', 'cooking_time', 'image')
+            if key in item
+        }
+        errors: dict[str, Any] = {}
+
+        tags = item.get('tags')
+        if isinstance(tags, list):
+            data['tags'] = []
+            for tag in tags:
+                tag_id = self.tag_ids.get(str(tag).lower())
+                if tag_id is None:
+                    errors['tags'] = [f'Тег "{tag}" не найден.']
+                    break
+                data['tags'].append(tag_id)
+        elif tags is not None:
+            data['tags'] = tags
+
+        ingredients = item.get('ingredients')
+        if isinstance(ingredients, list):
+            data['ingredients'] = []
+            ingredient_errors = []
+            for ingredient in ingredients:
+                resolved, error = self.resolve_ingredient(ingredient)
+                data['ingredients'].append(resolved)
+                ingredient_errors.append(error)
+            if any(ingredient_errors):
+                errors['ingredients'] = ingredient_errors
+        elif ingredients is not None:
+            data['ingredients'] = ingredients
+        return data, errors
+
+    def resolve_ingredient(self, ingredient) -> tuple[Any, dict]:
+        if not isinstance(ingredient, dict):
+            return ingredient, {}
+        name = str(ingredient.get('name', '')).lower()
+        unit = ingredient.get('measurement_unit')
+        ingredient_id = (
+            self.ingredient_ids.get((name, str(unit).lower())) if unit
+            else self.ingredient_ids_by_name.get(name)
+        )
+        if ingredient_id is None:
+            message = (
+                'Укажите единицу измерения: ингредиентов с таким названием '
+                'несколько.'
+                if not unit and name in self.ingredient_ids_by_name
+                else 'Ингредиент с таким названием не найден.'
+            )
+            return ingredient, {'name': [message]}
+        resolved = {'id': ingredient_id}
+        if 'amount' in ingredient:
+            resolved['amount'] = ingredient['amount']
+        return resolved, {}
+
+    def write_batch(self, batch: list[tuple[int, dict]]) -> None:
+        """Записывает пачку проверенных рецептов в одной транзакции."""
+        recipes = [
+            Recipe(
+                author=self.author,
+                name=data['name'],
+                text=data['text'],
+                cooking_time=data['cooking_time'],
+                image=data['image'],
+            )
+            for _, data in batch
+        ]
+        try:
+            with transaction.atomic():
+                assign_short_codes(recipes)
+                Recipe.objects.bulk_create(recipes)
+                RecipeIngredient.objects.bulk_create(
+                    RecipeIngredient(
+                        recipe=recipe,
+                        ingredient=ingredient['id'],
+                        amount=ingredient['amount'],
+                    )
+                    for recipe, (_, data) in zip(recipes, batch)
+                    for ingredient in data['ingredients']
+                )
+                Recipe.tags.through.objects.bulk_create(
+                    Recipe.tags.through(recipe=recipe, tag=tag)
+                    for recipe, (_, data) in zip(recipes, batch)
+                    for tag in data['tags']
+                )
+                # Сигналы `post_save` при `bulk_create` не отправляются.
+                counters.add(counters.RECIPES, self.author.pk, len(recipes))
+                enqueue_many(
+                    'images.ensure_derivatives',
+                    ({'name': recipe.image.name} for recipe in recipes),
+                )
+                enqueue('feed.fan_out', {
+                    'recipe_ids': [recipe.pk for recipe in recipes],
+                })
+                schedule_prerender(RECIPES)
+                schedule_similar_update(*(recipe.pk for recipe in recipes))
+                recipes_changed(*(recipe.pk for recipe in recipes))
+                schedule_purge(
+                    surrogate.RECIPES, surrogate.author_key(self.author.pk)
+                )
+        except IntegrityError as error:
+            delete_saved_images(recipes)
+            for number, _ in batch:
+                self.report.add_error(number, f'Ошибка записи: {error}')
+            return
+        self.report.created += len(recipes)
+
+
+def delete_saved_images(recipes: list[Recipe]) -> None:
+    """Удаляет файлы изображений пачки, строки которой откатились.
+
+    `bulk_create` сохраняет файлы в хранилище до вставки строк,
+    и откат транзакции их не удаляет. Несохранённые файлы пропускаются:
+    их имя ещё не путь в хранилище.
+    """
+    for recipe in recipes:
+        if recipe.image and recipe.image._committed:
+            recipe.image.delete(save=False)
+
+
+def assign_short_codes(recipes: list[Recipe]) -> None:
+    """Назначает рецептам уникальные короткие коды пачкой."""
+    codes: set[str] = set()
+    while len(codes) < len(recipes):
+        candidates = {
+            ''.join(random.choices(SHORT_CODE_ALPHABET, k=SHORT_CODE_LENGTH))
+            for _ in range(len(recipes) - len(codes))
+        } - codes
+        taken = set(
+            Recipe.objects.filter(short_code__in=candidates)
+            .values_list('short_code', flat=True)
+        )
+        codes |= candidates - taken
+    for recipe, code in zip(recipes, codes):
+        recipe.short_code = code
+
+
+# Export >>
+
+def export_queryset():
+    """Рецепты со всеми связями, нужными для экспорта."""
+    return Recipe.objects.select_related('author').prefetch_related(
+        'tags',
+        Prefetch(
+            'recipeingredient_set',
+            queryset=RecipeIngredient.objects.select_related('ingredient'),
+        ),
+    ).order_by('pk')
+
+
+def image_data_uri(image) -> str:
+    """Кодирует файл изображения в base64-строку с типом данных."""
+    content_type = mimetypes.guess_type(image.name)[0] or 'image/png'
+    with image.storage.open(image.name, 'rb') as file:
+        encoded = base64.b64encode(file.read()).decode()
+    return f'data:{content_type};base64,{encoded}'
+
+
+def export_recipe(recipe: Recipe, request=None, inline_images=False) -> dict:
+    if not recipe.image:
+        image = None
+    elif inline_images:
+        image = image_data_uri(recipe.image)
+    else:
+        image = recipe.image.url
+        if request is not None:
+            image = request.build_absolute_uri(image)
+    return {
+        'id': recipe.pk,
+        'name': recipe.name,
+        'author': recipe.author.email,
+        'pub_date': recipe.pub_date.isoformat(),
+        'cooking_time': recipe.cooking_time,
+        'text': recipe.text,
+        'image': image,
+        'tags': [tag.slug for tag in recipe.tags.all()],
+        'ingredients': [
+            {
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe.recipeingredient_set.all()
+        ],
+    }
+
+
+def export_lines(
+    queryset=None, request=None, inline_images: bool = False
+) -> Iterator[str]:
+    """Выдаёт рецепты строками NDJSON, читая их из базы порциями."""
+    if queryset is None:
+        queryset = export_queryset()
+    for recipe in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield json.dumps(
+            export_recipe(recipe, request, inline_images),
+            ensure_ascii=False,
+        ) + '\n'
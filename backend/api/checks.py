@@ -0,0 +1,75 @@
+"""
+Проверки настроек API (`manage.py check`, запуск сервера).
+
+Подключаются в `ApiConfig.ready()`.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+from api.authentication import PROCESS_LOCAL_BACKENDS, shared_cache_alias
+
+# Наименьший буфер заголовков ответа у прокси: proxy_buffer_size
+# nginx по умолчанию (4 КБ на x86), у Varnish - 8 КБ.
+PROXY_HEADER_BUFFER: int = 4096
+
+
+@register(Tags.compatibility)
+def surrogate_key_length(app_configs, **kwargs):
+    """Заголовок суррогатных ключей должен помещаться в буфер прокси."""
+    limit = settings.SURROGATE_KEY_MAX_LENGTH
+    if 0 < limit < PROXY_HEADER_BUFFER:
+        return []
+    return [Error(
+        f'SURROGATE_KEY_MAX_LENGTH={limit}: ожидается от 1 '
+        f'до {PROXY_HEADER_BUFFER - 1} байт.',
+        hint='Прокси отвергнет ответ с заголовками больше своего буфера '
+             '(nginx: "upstream sent too big header").',
+        id='api.E001',
+    )]
+
+
+@register(Tags.caches)
+def token_cache_shared(app_configs, **kwargs):
+    """Кеш токенов в памяти процесса как общий бесполезен."""
+    alias = settings.AUTH_TOKEN_SHARED_CACHE
+    if not alias or shared_cache_alias():
+        return []
+    return [Warning(
+        f'AUTH_TOKEN_SHARED_CACHE={alias!r} хранится в памяти процесса: '
+        f'он не используется, и сброс токена виден другим воркерам '
+        f'через AUTH_TOKEN_CACHE_VERIFY_INTERVAL '
+        f'({settings.AUTH_TOKEN_CACHE_VERIFY_INTERVAL} с).',
+        hint='Укажите кеш, общий для воркеров (FileBasedCache, Redis), '
+             'или оставьте AUTH_TOKEN_SHARED_CACHE пустым.',
+        id='api.W002',
+    )]
+
+
+@register(Tags.security)
+def throttle_num_proxies(app_configs, **kwargs):
+    """Без учёта прокси все анонимные клиенты делят одну корзину."""
+    if not settings.THROTTLE_ENABLED or settings.THROTTLE_NUM_PROXIES > 0:
+        return []
+    return [Warning(
+        'THROTTLE_NUM_PROXIES=0: клиентом считается REMOTE_ADDR, '
+        'а за nginx это адрес прокси.',
+        hint='Укажите число прокси перед бэкендом '
+             '(2 - внешний nginx и nginx из docker compose).',
+        id='api.W003',
+    )]
+
+
+@register(Tags.caches, Tags.database)
+def replica_pin_cache(app_configs, **kwargs):
+    """Отметка чтения из основной базы должна быть видна всем воркерам."""
+    backend = settings.CACHES['default']['BACKEND']
+    if not settings.DATABASE_REPLICAS or backend not in PROCESS_LOCAL_BACKENDS:
+        return []
+    return [Error(
+        f'Заданы реплики ({", ".join(settings.DATABASE_REPLICAS)}), а кеш '
+        f'default хранится в памяти процесса ({backend}).',
+        hint='Другие воркеры не увидят отметку пользователя, изменившего '
+             'данные, и прочитают с реплики старые данные. Укажите общий '
+             'кеш в CACHE_BACKEND (FileBasedCache, Redis).',
+        id='api.E002',
+    )]
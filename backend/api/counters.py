@@ -0,0 +1,81 @@
+"""
+Счётчики рецептов и подписчиков автора.
+
+`User.recipes_count` и `User.subscribers_count` хранятся в строке
+пользователя, поэтому карточка автора не считает `COUNT` по рецептам
+и подпискам, а список авторов сортируется по подписчикам по индексу.
+
+Счётчики меняет `add` выражением `F() + n` в той же транзакции, что
+создаёт или удаляет рецепт или подписку: обработчики сигналов
+(`api/signals.py`), а для `bulk_create`, который сигналов не отправляет,
+сами массовые пути (импорт, `seed_data`). Параллельные изменения
+не теряются, так как значение не читается в Python. Расхождения после
+правки базы в обход ORM исправляет команда `recount_authors`.
+"""
+import logging
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from api.surrogate import author_key, schedule_purge
+from food.models import Recipe
+from users.models import Subscription
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+RECIPES: str = 'recipes_count'
+SUBSCRIBERS: str = 'subscribers_count'
+WRITE_BATCH_SIZE: int = 1000
+
+
+def add(counter: str, user_id: int, delta: int) -> None:
+    """Изменяет счётчик пользователя на `delta`, не опуская ниже нуля."""
+    User.objects.filter(pk=user_id).update(
+        **{counter: Greatest(F(counter) + delta, Value(0))}
+    )
+
+
+def actual(counter: str) -> Coalesce:
+    """Подзапрос с числом рецептов или подписчиков пользователя."""
+    related = Recipe if counter == RECIPES else Subscription
+    return Coalesce(
+        Subquery(
+            related.objects.filter(author=OuterRef('pk'))
+            .order_by().values('author')
+            .annotate(count=Count('pk')).values('count')
+        ),
+        0,
+    )
+
+
+def recount() -> int:
+    """Исправляет счётчики, не совпадающие с таблицами.
+
+    Расходящиеся строки находятся одним запросом, а пересчитываются
+    пачками по `WRITE_BATCH_SIZE` тем же выражением в `UPDATE`.
+    Возвращает число исправленных пользователей.
+    """
+    wrong = list(
+        User.objects.alias(
+            actual_recipes=actual(RECIPES),
+            actual_subscribers=actual(SUBSCRIBERS),
+        ).filter(
+            ~Q(recipes_count=F('actual_recipes'))
+            | ~Q(subscribers_count=F('actual_subscribers'))
+        ).values_list('pk', flat=True)
+    )
+    iterator = iter(wrong)
+    while batch := list(islice(iterator, WRITE_BATCH_SIZE)):
+        with transaction.atomic():
+            User.objects.filter(pk__in=batch).update(
+                recipes_count=actual(RECIPES),
+                subscribers_count=actual(SUBSCRIBERS),
+            )
+            schedule_purge(*(author_key(user_id) for user_id in batch))
+    logger.info(f'Счётчики авторов исправлены: {len(wrong)}.')
+    return len(wrong)
@@ -0,0 +1,228 @@
+"""
+Лента рецептов от авторов, на которых подписан пользователь.
+
+Лента хранится в таблице `TimelineEntry` (fan-out on write): новый
+рецепт раскладывается по лентам подписчиков фоновой задачей `feed.fan_out`
+пачками `bulk_create`, а при подписке задача `feed.backfill` добавляет
+в ленту последние рецепты автора. Отписка сразу удаляет его записи.
+
+Рецепты авторов, у которых больше `FEED_FANOUT_MAX_SUBSCRIBERS`
+подписчиков, не раскладываются: при чтении они берутся напрямую
+из таблицы рецептов (fan-out on read) и сливаются с лентой. Популярность
+определяется по счётчику `User.subscribers_count`. Когда автор после
+отписки опускается до порога, задача `feed.materialize` раскладывает
+по лентам подписчиков его последние `FEED_BACKFILL_SIZE` рецептов,
+опубликованные, пока он был популярным.
+
+Страницы листаются по ключу (keyset pagination): курсор хранит
+`(pub_date, id)` последнего рецепта страницы, поэтому стоимость чтения
+не зависит от глубины.
+"""
+import base64
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Q
+
+from food.models import Recipe, TimelineEntry
+from users.models import Subscription
+
+User = get_user_model()
+
+POPULAR_AUTHORS_KEY: str = 'feed:popular-authors'
+
+Cursor = tuple[datetime, int]
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def popular_author_ids() -> set[int]:
+    """Авторы, рецепты которых читаются без раскладки по лентам.
+
+    Читаются по индексу `user_subscribers`; список кешируется
+    на `FEED_POPULAR_CACHE_TTL` секунд.
+    """
+    def compute() -> set[int]:
+        return set(
+            User.objects.filter(
+                subscribers_count__gt=settings.FEED_FANOUT_MAX_SUBSCRIBERS
+            ).values_list('pk', flat=True)
+        )
+    return cache.get_or_set(
+        POPULAR_AUTHORS_KEY, compute, settings.FEED_POPULAR_CACHE_TTL
+    )
+
+
+# Write >>
+
+def fan_out(recipe_ids: list[int]) -> dict[str, int]:
+    """Задача: раскладывает рецепты по лентам подписчиков авторов."""
+    popular = popular_author_ids()
+    recipes = (
+        Recipe.objects.filter(pk__in=recipe_ids)
+        .exclude(author__in=popular)
+        .values_list('pk', 'author_id', 'pub_date')
+    )
+    created = 0
+    for recipe_id, author_id, pub_date in recipes:
+        subscribers = (
+            Subscription.objects.filter(author=author_id)
+            .values_list('user_id', flat=True)
+            .iterator(chunk_size=settings.FEED_FANOUT_BATCH_SIZE)
+        )
+        for user_ids in batched(subscribers, settings.FEED_FANOUT_BATCH_SIZE):
+            created += len(TimelineEntry.objects.bulk_create(
+                (
+                    TimelineEntry(
+                        user_id=user_id,
+                        recipe_id=recipe_id,
+                        author_id=author_id,
+                        pub_date=pub_date,
+                    )
+                    for user_id in user_ids
+                ),
+                ignore_conflicts=True,
+            ))
+    return {'entries': created}
+
+
+def backfill(user_id: int, author_id: int) -> dict[str, int]:
+    """Задача: добавляет в ленту последние рецепты нового автора."""
+    if author_id in popular_author_ids():
+        return {'entries': 0}
+    recipes = (
+        Recipe.objects.filter(author=author_id)
+        .order_by('-pub_date', '-pk')
+        .values_list('pk', 'pub_date')[:settings.FEED_BACKFILL_SIZE]
+    )
+    entries = TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                recipe_id=recipe_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for recipe_id, pub_date in recipes
+        ),
+        ignore_conflicts=True,
+    )
+    return {'entries': len(entries)}
+
+
+def materialize(author_id: int) -> dict[str, int]:
+    """Задача: раскладывает рецепты автора, переставшего быть популярным.
+
+    Рецепты, опубликованные, пока автор был популярным, есть только
+    в таблице рецептов. Ставится с задержкой `FEED_POPULAR_CACHE_TTL`,
+    чтобы захватить и рецепты, пропущенные `fan_out` по кешу популярных.
+    """
+    if User.objects.filter(
+        pk=author_id,
+        subscribers_count__gt=settings.FEED_FANOUT_MAX_SUBSCRIBERS,
+    ).exists():
+        return {'entries': 0}
+    recipes = list(
+        Recipe.objects.filter(author=author_id)
+        .order_by('-pub_date', '-pk')
+        .values_list('pk', 'pub_date')[:settings.FEED_BACKFILL_SIZE]
+    )
+    subscribers = (
+        Subscription.objects.filter(author=author_id)
+        .values_list('user_id', flat=True)
+        .iterator(chunk_size=settings.FEED_FANOUT_BATCH_SIZE)
+    )
+    created = 0
+    for user_ids in batched(subscribers, settings.FEED_FANOUT_BATCH_SIZE):
+        created += len(TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(
+                    user_id=user_id,
+                    recipe_id=recipe_id,
+                    author_id=author_id,
+                    pub_date=pub_date,
+                )
+                for user_id in user_ids
+                for recipe_id, pub_date in recipes
+            ),
+            batch_size=settings.FEED_FANOUT_BATCH_SIZE,
+            ignore_conflicts=True,
+        ))
+    return {'entries': created}
+
+
+def remove_author(user_id: int, author_id: int) -> None:
+    """Удаляет рецепты автора из ленты пользователя."""
+    TimelineEntry.objects.filter(user=user_id, author=author_id).delete()
+
+
+# Read >>
+
+def encode_cursor(cursor: Cursor) -> str:
+    pub_date, recipe_id = cursor
+    return base64.urlsafe_b64encode(
+        f'{pub_date.isoformat()}|{recipe_id}'.encode()
+    ).decode()
+
+
+def decode_cursor(value: str) -> Cursor:
+    """Разбирает курсор. Вызывает ValueError, если он повреждён."""
+    try:
+        pub_date, recipe_id = (
+            base64.urlsafe_b64decode(value.encode()).decode().split('|')
+        )
+        return datetime.fromisoformat(pub_date), int(recipe_id)
+    except (UnicodeError, ValueError):
+        raise ValueError('Некорректный курсор.')
+
+
+def before(cursor: Cursor, id_field: str) -> Q:
+    """Условие «строго раньше курсора» в порядке (-pub_date, -id)."""
+    pub_date, recipe_id = cursor
+    return Q(pub_date__lt=pub_date) | Q(
+        pub_date=pub_date, **{f'{id_field}__lt': recipe_id}
+    )
+
+
+def feed_page(
+    user, cursor: Optional[Cursor], limit: int
+) -> tuple[list[int], Optional[Cursor]]:
+    """Возвращает id рецептов страницы ленты и курсор следующей.
+
+    Каждый источник отдаёт не больше `limit + 1` строк
+    по индексу, после чего строки сливаются в памяти.
+    """
+    entries = TimelineEntry.objects.filter(user=user)
+    if cursor is not None:
+        entries = entries.filter(before(cursor, 'recipe_id'))
+    rows = set(
+        entries.order_by('-pub_date', '-recipe_id')
+        .values_list('pub_date', 'recipe_id')[:limit + 1]
+    )
+
+    popular = popular_author_ids()
+    if popular:
+        pulled_authors = list(
+            Subscription.objects.filter(user=user, author__in=popular)
+            .values_list('author_id', flat=True)
+        )
+        if pulled_authors:
+            recipes = Recipe.objects.filter(author__in=pulled_authors)
+            if cursor is not None:
+                recipes = recipes.filter(before(cursor, 'pk'))
+            rows.update(
+                recipes.order_by('-pub_date', '-pk')
+                .values_list('pub_date', 'pk')[:limit + 1]
+            )
+
+    rows = sorted(rows, reverse=True)
+    next_cursor = rows[limit - 1] if len(rows) > limit else None
+    return [recipe_id for _, recipe_id in rows[:limit]], next_cursor
@@ -0,0 +1,534 @@
+import json
+import re
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from typing import Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from config.db_indexes import ValidateModelName, get_indexes_for_model
+from config.paginators import estimate_count
+from food.models import Favorite, Recipe, RecipeIngredient
+
+User = get_user_model()
+
+# Каталог горячих запросов: имя, путь эндпоинта и нужен ли пользователь.
+# Значения в фигурных скобках подставляются из данных базы.
+HOT_QUERIES: tuple[tuple[str, str, bool], ...] = (
+    ('recipes', '/api/recipes/', False),
+    ('recipes, page 3', '/api/recipes/?page=3', False),
+    ('recipes by tag', '/api/recipes/?tags={tag}', False),
+    ('recipes by author', '/api/recipes/?author={author}', False),
+    ('popular recipes', '/api/recipes/?ordering=popular', False),
+    ('recipes, authenticated', '/api/recipes/', True),
+    ('favorites', '/api/recipes/?is_favorited=1', True),
+    ('shopping cart filter', '/api/recipes/?is_in_shopping_cart=1', True),
+    ('subscriptions', '/api/users/subscriptions/?recipes_limit=3', True),
+    ('popular authors', '/api/users/?ordering=popular', False),
+    ('shopping cart download', '/api/recipes/download_shopping_cart/', True),
+    ('ingredient search', '/api/ingredients/?name={prefix}', False),
+)
+
+SEQUENTIAL: str = 'seq'
+INDEX: str = 'index'
+FULL_INDEX: str = 'full index'
+
+PG_SCANS: dict[str, str] = {
+    'Seq Scan': SEQUENTIAL,
+    'Index Scan': INDEX,
+    'Index Only Scan': INDEX,
+    'Bitmap Index Scan': INDEX,
+}
+SQLITE_SCAN = re.compile(
+    r'^(?P<verb>SCAN|SEARCH) (?P<name>\w+)'
+    r'(?: USING (?:COVERING )?INDEX (?P<index>\w+))?'
+)
+# Таблицы и их псевдонимы в SQL Django: FROM "favorite" U0.
+TABLE_ALIAS = re.compile(r'(?:FROM|JOIN) "(\w+)"(?: (?:AS )?(\w+))?')
+# Условия на столбцы: "favorite"."user_id" = 5, U0."recipe_id" IN (...),
+# UPPER("food_ingredient"."name"::text) LIKE UPPER('...').
+PREDICATE = re.compile(
+    r'(?:UPPER\()?(?:"(\w+)"|\b(\w+))\."(\w+)"(?:::text\))?\s*'
+    r'(?P<operator>=|IN\b|LIKE\b|<=?|>=?)',
+)
+ORDER_BY = re.compile(r'ORDER BY (.+?)(?: LIMIT| OFFSET|\)|$)', re.S)
+ORDER_COLUMN = re.compile(r'(?:"(\w+)"|\b(\w+))\."(\w+)"')
+RANGE_OPERATORS: frozenset[str] = frozenset({'LIKE', '<', '<=', '>', '>='})
+
+
+@dataclass
+class Scan:
+    """Чтение таблицы в плане запроса."""
+    table: str
+    kind: str
+    index: Optional[str] = None
+
+
+@dataclass
+class Explained:
+    """Запрос эндпоинта и разбор его плана."""
+    endpoint: str
+    alias: str
+    sql: str
+    scans: list[Scan] = field(default_factory=list)
+    sorts: int = 0
+    milliseconds: Optional[float] = None
+    buffers: Optional[int] = None
+
+
+def table_aliases(sql: str) -> dict[str, list[str]]:
+    """Таблицы запроса по псевдонимам в порядке появления.
+
+    Django повторяет псевдонимы (U0) в разных подзапросах, поэтому
+    псевдониму может соответствовать несколько таблиц.
+    """
+    aliases: dict[str, list[str]] = {}
+    for table, alias in TABLE_ALIAS.findall(sql):
+        aliases.setdefault(table, []).append(table)
+        if alias and alias.upper() not in ('ON', 'WHERE', 'INNER', 'LEFT'):
+            aliases.setdefault(alias, []).append(table)
+    return aliases
+
+
+def predicate_columns(sql: str, table: str) -> tuple[list[str], list[str]]:
+    """Столбцы таблицы в условиях на равенство и в диапазонах/LIKE."""
+    aliases = table_aliases(sql)
+    equal, ranged = [], []
+    for match in PREDICATE.finditer(sql):
+        name = match.group(1) or match.group(2)
+        if table not in aliases.get(name, ()):
+            continue
+        column = match.group(3)
+        target = (
+            ranged if match.group('operator') in RANGE_OPERATORS else equal
+        )
+        if column not in equal and column not in ranged:
+            target.append(column)
+    return equal, ranged
+
+
+def order_columns(sql: str, table: str) -> list[str]:
+    """Столбцы таблицы во внешнем ORDER BY."""
+    aliases = table_aliases(sql)
+    matches = ORDER_BY.findall(sql)
+    if not matches:
+        return []
+    return [
+        column for quoted, bare, column in ORDER_COLUMN.findall(matches[-1])
+        if table in aliases.get(quoted or bare, ())
+    ]
+
+
+def walk(node: dict):
+    """Узлы плана PostgreSQL в глубину."""
+    yield node
+    for child in node.get('Plans', ()):
+        yield from walk(child)
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет эндпоинты каталога горячих запросов (HOT_QUERIES), '
+        'разбирает планы их SQL-запросов (EXPLAIN (ANALYZE, BUFFERS) '
+        'на PostgreSQL, EXPLAIN QUERY PLAN на SQLite) и выводит '
+        'последовательные чтения, индексы из config/db_indexes.py, '
+        'не использованные ни одним запросом, и предлагаемые индексы. '
+        'Запускается на базе, заполненной командой seed_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', default='',
+            help='Почта пользователя для эндпоинтов с авторизацией, '
+                 'по умолчанию - с наибольшим избранным.',
+        )
+        parser.add_argument(
+            '--endpoint', action='append', dest='endpoints', default=[],
+            help='Проверить только эндпоинт с этим именем из каталога. '
+                 'Можно указать несколько.',
+        )
+        parser.add_argument(
+            '--min-rows', type=int, default=1000,
+            help='Полные проходы по таблицам меньше этого числа строк '
+                 'не считаются проблемой.',
+        )
+        parser.add_argument(
+            '--sql', action='store_true',
+            help='Выводить текст запросов с последовательным чтением.',
+        )
+        parser.add_argument(
+            '--host', default='',
+            help='Заголовок Host, по умолчанию первый из ALLOWED_HOSTS.',
+        )
+
+    def handle(self, *args, **options):
+        self.aliases = [DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS]
+        self.models = {
+            model._meta.db_table: model
+            for model in apps.get_models(include_auto_created=True)
+        }
+        self.registered = {member.value for member in ValidateModelName}
+        self.row_counts: dict[str, int] = {}
+        self.min_rows = options['min_rows']
+
+        catalogue = HOT_QUERIES
+        if options['endpoints']:
+            unknown = set(options['endpoints']) - {
+                name for name, _, _ in HOT_QUERIES
+            }
+            if unknown:
+                raise CommandError(
+                    f'Нет в каталоге: {", ".join(sorted(unknown))}.'
+                )
+            catalogue = [
+                entry for entry in HOT_QUERIES
+                if entry[0] in options['endpoints']
+            ]
+        values, user = self.catalogue_values(options['user'])
+        host = options['host'] or next(
+            (host.lstrip('.') for host in settings.ALLOWED_HOSTS
+             if host != '*'),
+            'localhost',
+        )
+
+        explained: list[Explained] = []
+        for name, path, authenticated in catalogue:
+            client = APIClient(HTTP_HOST=host)
+            if authenticated:
+                client.force_authenticate(user)
+            try:
+                path = path.format(**values)
+            except KeyError as error:
+                self.stderr.write(f'{name}: пропущен, в базе нет {error}.')
+                continue
+            explained.extend(self.run_endpoint(client, name, path))
+
+        self.report_queries(explained, options['sql'])
+        self.report_unused(explained)
+        self.report_suggestions(explained)
+
+    # Catalogue >>
+
+    def catalogue_values(self, email: str) -> tuple[dict, User]:
+        """Пользователь и значения фильтров, на которых есть данные."""
+        if email:
+            user = User.objects.filter(email=email).first()
+        else:
+            busiest = (
+                Favorite.objects.values('user')
+                .annotate(count=Count('pk')).order_by('-count').first()
+            )
+            user = busiest and User.objects.filter(pk=busiest['user']).first()
+        if user is None:
+            raise CommandError(
+                'Пользователь не найден: заполните базу командой seed_data '
+                'или укажите --user.'
+            )
+        values = {}
+        tag = (
+            Recipe.tags.through.objects.values('tag__slug')
+            .annotate(count=Count('pk')).order_by('-count').first()
+        )
+        if tag:
+            values['tag'] = tag['tag__slug']
+        author = (
+            Recipe.objects.values('author')
+            .annotate(count=Count('pk')).order_by('-count').first()
+        )
+        if author:
+            values['author'] = author['author']
+        ingredient = (
+            RecipeIngredient.objects.values('ingredient__name')
+            .annotate(count=Count('pk')).order_by('-count').first()
+        )
+        if ingredient:
+            values['prefix'] = ingredient['ingredient__name'][:3]
+        return values, user
+
+    def run_endpoint(
+        self, client: APIClient, name: str, path: str
+    ) -> list[Explained]:
+        """Выполняет эндпоинт и разбирает планы его SELECT-запросов."""
+        with ExitStack() as stack:
+            captured = {
+                alias: stack.enter_context(
+                    CaptureQueriesContext(connections[alias])
+                )
+                for alias in self.aliases
+            }
+            response = client.get(path)
+        if response.status_code >= 400:
+            self.stderr.write(
+                f'{name}: {path} ответил {response.status_code}, '
+                'планы могут не соответствовать рабочей нагрузке.'
+            )
+        explained = []
+        for alias, context in captured.items():
+            for query in context.captured_queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                explained.append(self.explain(name, alias, sql))
+        return explained
+
+    # Explain >>
+
+    def explain(self, endpoint: str, alias: str, sql: str) -> Explained:
+        connection = connections[alias]
+        result = Explained(endpoint, alias, sql)
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + sql
+                )
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                self.parse_postgresql(plan[0], result)
+            elif connection.vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                self.parse_sqlite(cursor.fetchall(), result)
+            else:
+                raise CommandError(
+                    f'База {connection.vendor} не поддерживается.'
+                )
+        return result
+
+    def parse_postgresql(self, plan: dict, result: Explained) -> None:
+        top = plan['Plan']
+        result.milliseconds = plan.get('Execution Time')
+        result.buffers = (
+            top.get('Shared Hit Blocks', 0) + top.get('Shared Read Blocks', 0)
+        )
+        for node in walk(top):
+            if node['Node Type'] in ('Sort', 'Incremental Sort'):
+                result.sorts += 1
+            kind = PG_SCANS.get(node['Node Type'])
+            if kind is None:
+                continue
+            result.scans.append(Scan(
+                table=node.get('Relation Name', ''),
+                kind=kind,
+                index=node.get('Index Name'),
+            ))
+
+    def parse_sqlite(self, rows: list, result: Explained) -> None:
+        aliases = table_aliases(result.sql)
+        seen: dict[str, int] = {}
+        for *_, detail in rows:
+            if detail.startswith('USE TEMP B-TREE'):
+                result.sorts += 1
+                continue
+            match = SQLITE_SCAN.match(detail)
+            if match is None:
+                continue
+            name, index = match.group('name'), match.group('index')
+            if match.group('verb') == 'SEARCH':
+                kind = INDEX
+            else:
+                kind = FULL_INDEX if index else SEQUENTIAL
+            # Таблица индекса однозначна, иначе псевдоним сопоставляется
+            # таблицам по порядку появления в запросе.
+            table = index and self.sqlite_index_table(result.alias, index)
+            if not table:
+                tables = aliases.get(name, [name])
+                table = tables[min(seen.get(name, 0), len(tables) - 1)]
+            seen[name] = seen.get(name, 0) + 1
+            result.scans.append(Scan(table=table, kind=kind, index=index))
+
+    def sqlite_index_table(self, alias: str, index: str) -> Optional[str]:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                "SELECT tbl_name FROM sqlite_master "
+                "WHERE type = 'index' AND name = %s",
+                [index],
+            )
+            row = cursor.fetchone()
+        return row and row[0]
+
+    def row_count(self, table: str) -> int:
+        """Число строк таблицы: оценка PostgreSQL или COUNT(*)."""
+        if table not in self.row_counts:
+            model = self.models.get(table)
+            if model is None:
+                self.row_counts[table] = 0
+            else:
+                queryset = model._default_manager.all()
+                estimate = estimate_count(queryset)
+                self.row_counts[table] = (
+                    queryset.count() if estimate is None else estimate
+                )
+        return self.row_counts[table]
+
+    def is_problem(self, scan: Scan) -> bool:
+        # Полный проход по индексу в SQLite - обычно чтение в порядке
+        # сортировки до LIMIT, его не отличить от прохода целиком.
+        return (
+            scan.kind == SEQUENTIAL
+            and self.row_count(scan.table) >= self.min_rows
+        )
+
+    # Report >>
+
+    def report_queries(self, explained: list[Explained], show_sql: bool):
+        self.stdout.write(
+            f'{"endpoint":<26}{"queries":>8}{"ms":>9}{"buffers":>9}'
+            f'{"sorts":>7}  полные проходы'
+        )
+        for endpoint in dict.fromkeys(item.endpoint for item in explained):
+            items = [item for item in explained if item.endpoint == endpoint]
+            timed = [item.milliseconds for item in items
+                     if item.milliseconds is not None]
+            buffers = [item.buffers for item in items
+                       if item.buffers is not None]
+            problems = sorted({
+                f'{scan.table} ({scan.kind}, {self.row_count(scan.table)})'
+                for item in items for scan in item.scans
+                if self.is_problem(scan)
+            })
+            line = (
+                f'{endpoint:<26}{len(items):>8}'
+                f'{f"{sum(timed):.1f}" if timed else "-":>9}'
+                f'{sum(buffers) if buffers else "-":>9}'
+                f'{sum(item.sorts for item in items):>7}  '
+                f'{", ".join(problems) or "-"}'
+            )
+            self.stdout.write(
+                self.style.WARNING(line) if problems else line
+            )
+            if show_sql:
+                for item in items:
+                    if any(self.is_problem(scan) for scan in item.scans):
+                        self.stdout.write(f'    [{item.alias}] {item.sql}')
+
+    def report_unused(self, explained: list[Explained]) -> None:
+        used = {
+            scan.index for item in explained for scan in item.scans
+            if scan.index
+        }
+        unused = [
+            f'{model._meta.model_name.upper()}: {index.name}'
+            for model in self.models.values()
+            if model._meta.model_name in self.registered
+            for index in self.declared_indexes(model)
+            if index.name not in used
+        ]
+        self.stdout.write(
+            '\nИндексы из INDEXES_FOR_MODELS, не использованные запросами '
+            'каталога (могут быть нужны админке, задачам и записи):'
+        )
+        for line in unused or ['-']:
+            self.stdout.write(f'  {line}')
+
+    def report_suggestions(self, explained: list[Explained]) -> None:
+        suggestions: dict[tuple[str, tuple[str, ...]], set[str]] = {}
+        covered: dict[tuple[str, tuple[str, ...]], set[str]] = {}
+        for item in explained:
+            for scan in item.scans:
+                if not self.is_problem(scan):
+                    continue
+                model = self.models.get(scan.table)
+                if model is None:
+                    continue
+                columns = self.candidate_columns(item.sql, scan.table)
+                if not columns:
+                    continue
+                key = (scan.table, columns)
+                target = (
+                    covered if self.is_covered(model, columns)
+                    else suggestions
+                )
+                target.setdefault(key, set()).add(item.endpoint)
+
+        self.stdout.write('\nПредлагаемые индексы для INDEXES_FOR_MODELS:')
+        if not suggestions:
+            self.stdout.write('  -')
+        for (table, columns), endpoints in sorted(suggestions.items()):
+            model = self.models[table]
+            self.stdout.write(self.style.SUCCESS(
+                f'  {self.registry_key(model)}: '
+                f'models.Index(fields={self.field_names(model, columns)!r})'
+                f'  # {", ".join(sorted(endpoints))}'
+            ))
+        for (table, columns), endpoints in sorted(covered.items()):
+            self.stdout.write(
+                f'  {table}{columns!r}: индекс объявлен, но планировщик '
+                f'выбрал полный проход ({", ".join(sorted(endpoints))}); '
+                'проверьте, что миграции применены, статистику (ANALYZE) '
+                'и селективность условия.'
+            )
+
+    # Suggestions >>
+
+    def candidate_columns(self, sql: str, table: str) -> tuple[str, ...]:
+        """Столбцы предлагаемого индекса: равенства, затем диапазон
+        или сортировка."""
+        columns = {
+            field.column for field in self.models[table]._meta.concrete_fields
+        }
+        equal, ranged = predicate_columns(sql, table)
+        equal = [column for column in equal if column in columns]
+        ranged = [column for column in ranged if column in columns]
+        tail = ranged[:1] or [
+            column for column in order_columns(sql, table)
+            if column in columns and column not in equal
+        ]
+        return tuple(equal + tail)
+
+    def declared_indexes(self, model) -> list:
+        """Индексы модели, включая индексы реестра для таблиц M2M."""
+        meta = model._meta
+        if meta.auto_created and meta.model_name in self.registered:
+            # У таблицы M2M без `through` индексы есть только в реестре.
+            return list(get_indexes_for_model(meta.model_name))
+        return list(meta.indexes)
+
+    def is_covered(self, model, columns: tuple[str, ...]) -> bool:
+        """Есть ли индекс, начинающийся с этих столбцов."""
+        meta = model._meta
+        existing = [(meta.pk.column,)]
+        existing.extend(
+            (field.column,) for field in meta.concrete_fields
+            if field.db_index or field.unique
+        )
+        for index in self.declared_indexes(model):
+            # Частичный индекс покрывает не все строки таблицы.
+            if index.condition is not None:
+                continue
+            existing.append(tuple(
+                meta.get_field(name.lstrip('-')).column
+                for name in index.fields
+            ))
+        for constraint in meta.constraints:
+            fields = getattr(constraint, 'fields', ())
+            if fields:
+                existing.append(tuple(
+                    meta.get_field(name).column for name in fields
+                ))
+        existing.extend(
+            tuple(meta.get_field(name).column for name in fields)
+            for fields in meta.unique_together
+        )
+        return any(
+            indexed[:len(columns)] == columns for indexed in existing
+        )
+
+    @staticmethod
+    def field_names(model, columns: tuple[str, ...]) -> tuple[str, ...]:
+        by_column = {
+            field.column: field.name for field in model._meta.concrete_fields
+        }
+        return tuple(by_column.get(column, column) for column in columns)
+
+    def registry_key(self, model) -> str:
+        name = model._meta.model_name
+        if name in self.registered:
+            return f'ValidateModelName.{name.upper()}'
+        return f'ValidateModelName.{name.upper()} (новая запись)'
@@ -0,0 +1,83 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+User = get_user_model()
+
+DEFAULT_SEARCH: str = 'seed1'
+
+
+class Command(BaseCommand):
+    help = (
+        'Открывает списки всех моделей админки от имени суперпользователя '
+        'и выводит время ответа и число запросов к базе. Запускается '
+        'на базе, заполненной командой seed_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', default='',
+            help='Почта суперпользователя, по умолчанию первый найденный.',
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--search', default=DEFAULT_SEARCH,
+            help='Строка поиска для списков с search_fields.',
+        )
+        parser.add_argument(
+            '--host', default='',
+            help='Заголовок Host, по умолчанию первый из ALLOWED_HOSTS.',
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_superuser=True)
+        if options['user']:
+            users = users.filter(email=options['user'])
+        user = users.order_by('pk').first()
+        if user is None:
+            raise CommandError('Суперпользователь не найден.')
+        host = options['host'] or next(
+            (host.lstrip('.') for host in settings.ALLOWED_HOSTS
+             if host != '*'),
+            'localhost',
+        )
+        client = Client(HTTP_HOST=host)
+        client.force_login(user)
+
+        self.stdout.write(
+            f'{"changelist":<40}{"status":>8}{"median ms":>12}'
+            f'{"max ms":>10}{"queries":>9}'
+        )
+        for model, model_admin in admin.site._registry.items():
+            url = reverse(
+                f'admin:{model._meta.app_label}_{model._meta.model_name}'
+                '_changelist'
+            )
+            name = f'{model._meta.app_label}.{model._meta.model_name}'
+            self.measure(client, name, url, options['repeat'])
+            if model_admin.search_fields:
+                self.measure(
+                    client, f'{name} ?q=', f'{url}?q={options["search"]}',
+                    options['repeat'],
+                )
+
+    def measure(self, client, name: str, url: str, repeat: int) -> None:
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(
+            f'{name:<40}{response.status_code:>8}'
+            f'{statistics.median(timings):>12.1f}{max(timings):>10.1f}'
+            f'{len(queries):>9}'
+        )
@@ -0,0 +1,131 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS: tuple[str, ...] = (
+    '/api/recipes/',
+    '/api/recipes/?page=2&limit=6',
+    '/api/tags/',
+    '/api/ingredients/?name=м',
+)
+WARMUP_REQUESTS: int = 20
+
+
+def percentile(values: list[float], share: float) -> float:
+    """Возвращает перцентиль отсортированного списка."""
+    if not values:
+        return 0.0
+    index = min(int(round(share * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест эндпоинтов чтения: пропускная способность '
+        'и задержки при заданном числе одновременных клиентов. '
+        'Позволяет сравнить несколько развёртываний (например, WSGI и ASGI).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', required=True,
+            help='Развёртывание в виде имя=URL, например '
+                 'wsgi=http://localhost:8000. Можно указать несколько.',
+        )
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Путь для запросов, можно указать несколько. '
+                 'Запросы распределяются по путям по кругу.',
+        )
+        parser.add_argument('--concurrency', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument(
+            '--token', default='',
+            help='Токен для авторизованных запросов.',
+        )
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep or not url:
+                raise CommandError(f'Ожидается имя=URL, получено: {target}')
+            targets.append((name, url.rstrip('/')))
+
+        paths = options['paths'] or DEFAULT_PATHS
+        headers = (
+            {'Authorization': f'Token {options["token"]}'}
+            if options['token'] else {}
+        )
+
+        self.stdout.write(
+            f'{"target":<12}{"rps":>10}{"p50 ms":>10}{"p95 ms":>10}'
+            f'{"p99 ms":>10}{"max ms":>10}{"errors":>8}'
+        )
+        for name, url in targets:
+            result = self.run_target(url, paths, headers, options)
+            self.stdout.write(
+                f'{name:<12}{result["rps"]:>10.1f}'
+                f'{result["p50"]:>10.1f}{result["p95"]:>10.1f}'
+                f'{result["p99"]:>10.1f}{result["max"]:>10.1f}'
+                f'{result["errors"]:>8}'
+            )
+
+    def run_target(self, base_url, paths, headers, options):
+        """Выполняет нагрузку на одно развёртывание и считает метрики."""
+        urls = itertools.cycle([f'{base_url}{path}' for path in paths])
+        total = options['requests']
+        timeout = options['timeout']
+        lock = threading.Lock()
+        issued = itertools.count()
+        latencies: list[float] = []
+        errors = 0
+
+        with requests.Session() as session:
+            for _ in range(WARMUP_REQUESTS):
+                session.get(next(urls), headers=headers, timeout=timeout)
+
+        def client():
+            nonlocal errors
+            local_latencies = []
+            local_errors = 0
+            with requests.Session() as session:
+                while next(issued) < total:
+                    with lock:
+                        url = next(urls)
+                    started = time.perf_counter()
+                    try:
+                        response = session.get(
+                            url, headers=headers, timeout=timeout
+                        )
+                        if response.status_code >= 400:
+                            local_errors += 1
+                    except requests.RequestException:
+                        local_errors += 1
+                    local_latencies.append(
+                        (time.perf_counter() - started) * 1000
+                    )
+            with lock:
+                latencies.extend(local_latencies)
+                errors += local_errors
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            for _ in range(options['concurrency']):
+                pool.submit(client)
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'rps': len(latencies) / elapsed if elapsed else 0.0,
+            'p50': percentile(latencies, 0.50),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'max': latencies[-1] if latencies else 0.0,
+            'errors': errors,
+        }
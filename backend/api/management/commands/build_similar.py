@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.similar import build_all
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает похожие рецепты для всего каталога. '
+        'Рекомендуется запускать раз в сутки.'
+    )
+
+    def handle(self, *args, **options):
+        stats = build_all()
+        self.stdout.write(self.style.SUCCESS(
+            f'Рецептов: {stats["recipes"]}, пар похожих: {stats["pairs"]}.'
+        ))
@@ -0,0 +1,121 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.readers import (
+    parse_recipes_limit, read_ingredients, read_recipes, read_subscriptions,
+)
+from api.renderers import ORJSONRenderer
+from api.serializers import (
+    IngredientSerializer, RecipeSerializer, SubscriptionSerializer,
+)
+from food.models import Ingredient, Recipe
+from users.models import Subscription
+
+User = get_user_model()
+
+CONTEXT_CHARS: int = 60
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает побайтно ответы быстрого чтения (api/readers.py, '
+        'ORJSONRenderer) с ответами сериализаторов DRF и JSONRenderer '
+        'на рецептах, подписках и ингредиентах из базы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=200)
+        parser.add_argument(
+            '--users', type=int, default=20,
+            help='Сколько пользователей с подписками проверить, кроме '
+                 'анонимного.',
+        )
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument(
+            '--host', default='',
+            help='Заголовок Host, по умолчанию первый из ALLOWED_HOSTS.',
+        )
+
+    def handle(self, *args, **options):
+        self.host = options['host'] or next(
+            (host.lstrip('.') for host in settings.ALLOWED_HOSTS
+             if host != '*'),
+            'localhost',
+        )
+        self.failures = 0
+        self.checked = 0
+        users = [AnonymousUser(), *User.objects.filter(
+            pk__in=Subscription.objects.values('user')
+        ).order_by('pk')[:options['users']]]
+        recipes = list(Recipe.objects.order_by('pk')[:options['recipes']])
+
+        for user in users:
+            request = self.request(user)
+            self.compare(
+                f'recipes ({user})',
+                RecipeSerializer(
+                    recipes, many=True, context={'request': request}
+                ).data,
+                read_recipes(request, [recipe.pk for recipe in recipes]),
+            )
+            if not user.is_authenticated:
+                continue
+            subscriptions = Subscription.objects.filter(user=user)
+            for recipes_limit in ('', '3'):
+                request = self.request(user, recipes_limit=recipes_limit)
+                self.compare(
+                    f'subscriptions ({user}, recipes_limit={recipes_limit})',
+                    SubscriptionSerializer(
+                        subscriptions, many=True,
+                        context={'request': request},
+                    ).data,
+                    read_subscriptions(
+                        request,
+                        subscriptions.values_list('author_id', flat=True),
+                        parse_recipes_limit(recipes_limit),
+                    ),
+                )
+
+        ingredients = Ingredient.objects.all()[:options['ingredients']]
+        self.compare(
+            'ingredients',
+            IngredientSerializer(ingredients, many=True).data,
+            read_ingredients(ingredients),
+        )
+
+        summary = f'Проверено: {self.checked}, расхождений: {self.failures}.'
+        if self.failures:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def request(self, user, **params) -> Request:
+        request = Request(
+            APIRequestFactory().get('/', params, HTTP_HOST=self.host)
+        )
+        request.user = user
+        return request
+
+    def compare(self, name: str, expected, actual) -> None:
+        self.checked += 1
+        expected = JSONRenderer().render(expected)
+        actual = ORJSONRenderer().render(actual)
+        if expected == actual:
+            return
+        self.failures += 1
+        position = next(
+            (index for index, (left, right) in enumerate(zip(expected, actual))
+             if left != right),
+            min(len(expected), len(actual)),
+        )
+        start = max(position - CONTEXT_CHARS, 0)
+        end = position + CONTEXT_CHARS
+        self.stderr.write(
+            f'{name}: расхождение с байта {position}\n'
+            f'  DRF:  {expected[start:end]!r}\n'
+            f'  fast: {actual[start:end]!r}'
+        )
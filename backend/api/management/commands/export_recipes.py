@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bulk import export_lines
+
+
+class Command(BaseCommand):
+    help = 'Выгружает все рецепты в файл NDJSON (по рецепту в строке).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Путь к файлу или "-" для вывода в stdout.'
+        )
+        parser.add_argument(
+            '--inline-images', action='store_true',
+            help='Встраивать изображения в base64 вместо ссылок на файлы.',
+        )
+
+    def handle(self, *args, **options):
+        lines = export_lines(inline_images=options['inline_images'])
+        if options['path'] == '-':
+            sys.stdout.writelines(lines)
+            return
+        try:
+            with open(options['path'], 'w', encoding='utf-8') as file:
+                file.writelines(lines)
+        except OSError as error:
+            raise CommandError(f'Не удалось записать файл: {error}')
+        self.stderr.write(self.style.SUCCESS(
+            f'Рецепты выгружены в {options["path"]}.'
+        ))
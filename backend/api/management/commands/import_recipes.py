@@ -0,0 +1,56 @@
+import json
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bulk import IMPORT_BATCH_SIZE, RecipeImporter
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует рецепты из файла NDJSON (по рецепту в строке). '
+        'Формат описан в api/bulk.py.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Путь к файлу или "-" для чтения из stdin.'
+        )
+        parser.add_argument(
+            '--author', required=True,
+            help='Email пользователя, от имени которого создаются рецепты.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(email=options['author'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["author"]} не найден.'
+            )
+
+        importer = RecipeImporter(author, batch_size=options['batch_size'])
+        if options['path'] == '-':
+            report = importer.run(sys.stdin)
+        else:
+            try:
+                with open(options['path'], encoding='utf-8') as file:
+                    report = importer.run(file)
+            except OSError as error:
+                raise CommandError(f'Не удалось прочитать файл: {error}')
+
+        for error in report.errors:
+            self.stderr.write(
+                f'Строка {error["line"]}: '
+                f'{json.dumps(error["errors"], ensure_ascii=False)}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано рецептов: {report.created}, '
+            f'с ошибками: {report.failed}.'
+        ))
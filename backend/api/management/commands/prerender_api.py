@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api.prerender import GROUPS, prerender
+
+
+class Command(BaseCommand):
+    help = (
+        'Сохраняет анонимные ответы популярных страниц API в файлы, '
+        'которые nginx отдаёт без обращения к бэкенду.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--group', action='append', dest='groups', choices=GROUPS,
+            help='Группа страниц, можно указать несколько. '
+                 'По умолчанию - все.',
+        )
+
+    def handle(self, *args, **options):
+        stats = prerender(options['groups'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано: {stats["written"]}, без изменений: '
+            f'{stats["unchanged"]}, удалено: {stats["removed"]}.'
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from api.feed import backfill
+from food.models import TimelineEntry
+from users.models import Subscription
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет ленты подписок по существующим подпискам: '
+        'последние рецепты каждого автора попадают в ленты подписчиков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Предварительно удалить все записи лент.',
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            TimelineEntry.objects.all().delete()
+        created = 0
+        subscriptions = Subscription.objects.values_list(
+            'user_id', 'author_id'
+        ).iterator()
+        for user_id, author_id in subscriptions:
+            created += backfill(user_id, author_id)['entries']
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено записей в ленты: {created}.'
+        ))
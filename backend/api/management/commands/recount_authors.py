@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.counters import recount
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики рецептов и подписчиков пользователей '
+        'и исправляет расходящиеся с таблицами. Нужна после добавления '
+        'счётчиков в существующую базу и после правки данных в обход ORM.'
+    )
+
+    def handle(self, *args, **options):
+        fixed = recount()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено пользователей: {fixed}.'
+        ))
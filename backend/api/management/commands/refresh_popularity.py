@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.popularity import refresh
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает популярность рецептов с затуханием во времени. '
+        'Рекомендуется запускать раз в 10-15 минут.'
+    )
+
+    def handle(self, *args, **options):
+        stats = refresh()
+        self.stdout.write(self.style.SUCCESS(
+            f'Рецептов с оценкой: {stats["scored"]}, '
+            f'обновлено: {stats["updated"]}.'
+        ))
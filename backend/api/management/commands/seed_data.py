@@ -0,0 +1,235 @@
+import random
+import string
+from datetime import timedelta
+from io import BytesIO
+from itertools import islice
+from typing import Iterable, Iterator
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from PIL import Image
+
+from api.counters import recount
+from config.images import ensure_derivatives
+from food.models import (
+    SHORT_CODE_LENGTH, Favorite, FavoriteAdded, Ingredient, Recipe,
+    RecipeIngredient, ShoppingCart, Tag,
+)
+from users.models import Subscription
+
+User = get_user_model()
+
+SEED_IMAGE: str = 'food/recipes/seed.png'
+SEED_IMAGE_SIZE: tuple[int, int] = (640, 480)
+SEED_IMAGE_COLOR: str = '#e8d5b5'
+EVENTS_PERIOD_DAYS: int = 30
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, рецептами, '
+        'избранным, корзинами и подписками для нагрузочных тестов. '
+        'Записи создаются через bulk_create, сигналы не срабатывают: '
+        'производные данные (ленты, похожие рецепты, популярность) '
+        'после заполнения пересчитываются своими командами. Счётчики '
+        'рецептов и подписчиков авторов пересчитываются сразу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--recipes', type=int, default=100_000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites', type=int, default=500_000)
+        parser.add_argument('--carts', type=int, default=200_000)
+        parser.add_argument('--subscriptions', type=int, default=200_000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Начальное значение генератора случайных чисел.',
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        ingredient_ids = list(Ingredient.objects.values_list('pk', flat=True))
+        tag_ids = list(Tag.objects.values_list('pk', flat=True))
+        if len(ingredient_ids) < options['ingredients_per_recipe']:
+            raise CommandError(
+                'Недостаточно ингредиентов, сначала выполните '
+                'load_ingredients.'
+            )
+
+        self.create_image()
+        user_ids = self.create_users(options['users'])
+        recipe_ids = self.create_recipes(options['recipes'], user_ids)
+        self.create_links(
+            recipe_ids, ingredient_ids, tag_ids,
+            options['ingredients_per_recipe'],
+        )
+        created = {
+            'users': len(user_ids),
+            'recipes': len(recipe_ids),
+            'favorites': self.create_events(
+                FavoriteAdded, options['favorites'], user_ids, recipe_ids
+            ),
+            'carts': self.create_events(
+                ShoppingCart, options['carts'], user_ids, recipe_ids
+            ),
+            'subscriptions': self.create_subscriptions(
+                options['subscriptions'], user_ids
+            ),
+        }
+        recount()
+        self.stdout.write(self.style.SUCCESS(f'Создано: {created}.'))
+
+    def create_image(self) -> None:
+        """Создаёт общее для рецептов изображение и его копии."""
+        if not default_storage.exists(SEED_IMAGE):
+            buffer = BytesIO()
+            Image.new('RGB', SEED_IMAGE_SIZE, SEED_IMAGE_COLOR).save(
+                buffer, format='PNG'
+            )
+            default_storage.save(SEED_IMAGE, ContentFile(buffer.getvalue()))
+        ensure_derivatives(SEED_IMAGE)
+
+    def create_users(self, count: int) -> list[int]:
+        start = User.objects.filter(username__startswith='seed').count()
+        password = make_password(None)
+        users = (
+            User(
+                username=f'seed{number}',
+                email=f'seed{number}@example.com',
+                first_name='Seed',
+                last_name=str(number),
+                password=password,
+            )
+            for number in range(start, start + count)
+        )
+        user_ids = []
+        for batch in batched(users, self.batch_size):
+            user_ids += [
+                user.pk for user in User.objects.bulk_create(batch)
+            ]
+        return user_ids
+
+    def short_codes(self, count: int) -> list[str]:
+        """Свободные короткие коды рецептов без повторов."""
+        taken = set(Recipe.objects.values_list('short_code', flat=True))
+        alphabet = string.ascii_letters + string.digits
+        if count > len(alphabet) ** SHORT_CODE_LENGTH - len(taken):
+            raise CommandError(
+                'Свободных коротких кодов меньше, чем рецептов.'
+            )
+        codes = []
+        while len(codes) < count:
+            code = ''.join(self.random.choices(alphabet, k=SHORT_CODE_LENGTH))
+            if code not in taken:
+                taken.add(code)
+                codes.append(code)
+        return codes
+
+    def create_recipes(self, count: int, user_ids: list[int]) -> list[int]:
+        if not user_ids and count:
+            raise CommandError('Рецептам нужны авторы: задайте --users.')
+        recipes = (
+            Recipe(
+                name=f'Рецепт {code}',
+                text='Синтетический рецепт для нагрузочного теста.',
+                cooking_time=self.random.randint(5, 180),
+                image=SEED_IMAGE,
+                author_id=self.random.choice(user_ids),
+                short_code=code,
+            )
+            for code in self.short_codes(count)
+        )
+        recipe_ids = []
+        for batch in batched(recipes, self.batch_size):
+            recipe_ids += [
+                recipe.pk for recipe in Recipe.objects.bulk_create(batch)
+            ]
+        return recipe_ids
+
+    def create_links(
+        self, recipe_ids: list[int], ingredient_ids: list[int],
+        tag_ids: list[int], per_recipe: int,
+    ) -> None:
+        links = (
+            RecipeIngredient(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=self.random.randint(1, 500),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in self.random.sample(ingredient_ids, per_recipe)
+        )
+        for batch in batched(links, self.batch_size):
+            RecipeIngredient.objects.bulk_create(batch)
+        if not tag_ids:
+            return
+        tags = (
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.random.sample(
+                tag_ids, self.random.randint(1, min(2, len(tag_ids)))
+            )
+        )
+        for batch in batched(tags, self.batch_size):
+            Recipe.tags.through.objects.bulk_create(batch)
+
+    def create_events(
+        self, model, count: int, user_ids: list[int], recipe_ids: list[int]
+    ) -> int:
+        """Избранное и корзины: популярность рецептов неравномерна."""
+        if not user_ids or not recipe_ids:
+            return 0
+        now = timezone.now()
+        period = timedelta(days=EVENTS_PERIOD_DAYS)
+        events = (
+            model(
+                user_id=self.random.choice(user_ids),
+                recipe_id=recipe_ids[
+                    int(len(recipe_ids) * self.random.random() ** 3)
+                ],
+                added=now - period * self.random.random(),
+            )
+            for _ in range(count)
+        )
+        before = model.objects.count()
+        for batch in batched(events, self.batch_size):
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            if model is FavoriteAdded:
+                # Само избранное - таблица `favorite` без времени.
+                Favorite.objects.bulk_create(
+                    (
+                        Favorite(user_id=event.user_id,
+                                 recipe_id=event.recipe_id)
+                        for event in batch
+                    ),
+                    ignore_conflicts=True,
+                )
+        return model.objects.count() - before
+
+    def create_subscriptions(self, count: int, user_ids: list[int]) -> int:
+        if len(user_ids) < 2:
+            return 0
+        pairs = (
+            self.random.sample(user_ids, 2) for _ in range(count)
+        )
+        subscriptions = (
+            Subscription(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs
+        )
+        before = Subscription.objects.count()
+        for batch in batched(subscriptions, self.batch_size):
+            Subscription.objects.bulk_create(batch, ignore_conflicts=True)
+        return Subscription.objects.count() - before
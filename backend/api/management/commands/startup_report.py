@@ -0,0 +1,189 @@
+import os
+import re
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Загрузка приложения так же, как её выполняет воркер gunicorn
+# (config/wsgi.py), без открытия соединений с базой.
+STARTUP_CODE: str = (
+    'import django; django.setup()\n'
+    'from django.core.{kind} import get_{kind}_application\n'
+    'get_{kind}_application()\n'
+    'from django.urls import get_resolver\n'
+    'get_resolver().url_patterns\n'
+)
+IMPORT_TIME = re.compile(
+    r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$'
+)
+OTHER: str = 'прочее'
+
+
+@dataclass
+class Module:
+    """Строка вывода `-X importtime`: время в микросекундах."""
+    name: str
+    self_us: int
+    cumulative_us: int
+    level: int
+    children: list['Module'] = field(default_factory=list)
+
+
+def parse_import_times(output: str) -> list[Module]:
+    """Разбирает вывод `-X importtime` в дерево импортов.
+
+    Модуль печатается после всех вложенных, поэтому вложенные копятся
+    в стеке до появления строки уровнем выше.
+    """
+    pending: list[Module] = []
+    for line in output.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        module = Module(
+            name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2
+        )
+        while pending and pending[-1].level > module.level:
+            module.children.insert(0, pending.pop())
+        pending.append(module)
+    return pending
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет время загрузки приложения в отдельном процессе '
+        '(python -X importtime): время импорта по приложениям '
+        'из INSTALLED_APPS вместе с подтянутыми ими библиотеками '
+        'и дерево импортов дольше порога.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--asgi', action='store_true',
+            help='Загружать config.asgi, как воркер uvicorn.',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=50.0,
+            help='Порог медленного импорта, мс.',
+        )
+        parser.add_argument(
+            '--runs', type=int, default=3,
+            help='Число запусков, берётся самый быстрый.',
+        )
+        parser.add_argument(
+            '--budget', type=float, default=0.0,
+            help='Допустимое время загрузки, мс: при превышении команда '
+                 'завершается с ошибкой. 0 - без проверки.',
+        )
+
+    def handle(self, *args, **options):
+        kind = 'asgi' if options['asgi'] else 'wsgi'
+        best = None
+        for _ in range(max(options['runs'], 1)):
+            wall, roots = self.measure(kind)
+            if best is None or wall < best[0]:
+                best = wall, roots
+        wall, roots = best
+        self.threshold_us = options['threshold'] * 1000
+
+        self.packages = sorted(
+            {config.name for config in apps.get_app_configs()}
+            # Ядро Django считается отдельно, а не временем приложения,
+            # которое импортировало его первым.
+            | {settings.ROOT_URLCONF.split('.')[0], 'django'},
+            key=len, reverse=True,
+        )
+        totals: dict[str, int] = {}
+        for root in roots:
+            self.attribute(root, None, totals)
+        imports_us = sum(totals.values())
+
+        self.stdout.write(
+            f'Загрузка {kind}: {wall * 1000:.0f} мс, '
+            f'из них импорт модулей {imports_us / 1000:.0f} мс.\n'
+        )
+        self.stdout.write(f'{"приложение":<32}{"мс":>8}{"%":>7}')
+        for package, spent in sorted(
+            totals.items(), key=lambda item: item[1], reverse=True
+        ):
+            self.stdout.write(
+                f'{package:<32}{spent / 1000:>8.1f}'
+                f'{spent * 100 / imports_us:>7.1f}'
+            )
+
+        slow = [root for root in roots
+                if root.cumulative_us >= self.threshold_us]
+        if slow:
+            self.stdout.write(
+                f'\nИмпорты дольше {options["threshold"]:g} мс:'
+            )
+            for root in slow:
+                self.write_tree(root)
+
+        if options['budget'] and wall * 1000 > options['budget']:
+            raise CommandError(
+                f'Загрузка заняла {wall * 1000:.0f} мс, '
+                f'допустимо {options["budget"]:g} мс.'
+            )
+
+    def measure(self, kind: str) -> tuple[float, list[Module]]:
+        """Загружает приложение в новом интерпретаторе."""
+        environ = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': os.environ.get(
+                'DJANGO_SETTINGS_MODULE', 'config.settings'
+            ),
+        }
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c',
+             STARTUP_CODE.format(kind=kind)],
+            cwd=settings.BASE_DIR, env=environ,
+            capture_output=True, text=True,
+        )
+        wall = time.perf_counter() - started
+        if result.returncode:
+            raise CommandError(
+                'Приложение не загрузилось:\n' + result.stderr[-2000:]
+            )
+        return wall, parse_import_times(result.stderr)
+
+    def owner(self, name: str) -> Optional[str]:
+        """Приложение, которому принадлежит модуль, или None."""
+        for package in self.packages:
+            if name == package or name.startswith(package + '.'):
+                return package
+        return None
+
+    def attribute(
+        self, module: Module, inherited: Optional[str], totals: dict
+    ) -> None:
+        """Относит время модуля к его приложению или к импортировавшему.
+
+        Библиотеки, впервые импортированные модулем приложения,
+        считаются временем этого приложения.
+        """
+        package = self.owner(module.name) or inherited
+        key = package or OTHER
+        totals[key] = totals.get(key, 0) + module.self_us
+        for child in module.children:
+            self.attribute(child, package, totals)
+
+    def write_tree(self, module: Module, depth: int = 0) -> None:
+        package = self.owner(module.name)
+        line = (
+            f'{"  " * depth}{module.name} '
+            f'{module.cumulative_us / 1000:.1f} мс'
+            f'{f" [{package}]" if package else ""}'
+        )
+        self.stdout.write(self.style.WARNING(line) if depth == 0 else line)
+        for child in module.children:
+            if child.cumulative_us >= self.threshold_us:
+                self.write_tree(child, depth + 1)
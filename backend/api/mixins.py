@@ -0,0 +1,75 @@
+"""
+Примеси для представлений API.
+
+ReplicaReadMixin:
+    Чтение безопасными методами (GET, HEAD, OPTIONS) выполняется
+    на реплике базы данных, если она настроена (`config/db_router.py`).
+
+SurrogateKeyMixin:
+    Помечает ответы на чтение суррогатными ключами и выставляет
+    `Cache-Control` для кеширующего прокси (`api/surrogate.py`).
+"""
+from typing import Callable
+
+from api.surrogate import list_keys, set_cache_headers
+from config.db_router import SAFE_METHODS, reset_reads, route_reads_to_replica
+
+
+class ReplicaReadMixin:
+    """Направляет запросы безопасными методами на реплику.
+
+    Аутентификация выполняется до переключения, по основной базе,
+    поэтому только что выданный токен сразу действителен.
+    """
+    _replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            self._replica_token = route_reads_to_replica(request.user)
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self._replica_token is not None:
+                reset_reads(self._replica_token)
+                self._replica_token = None
+
+
+class SurrogateKeyMixin:
+    """Добавляет суррогатные ключи к ответам `list` и `retrieve`.
+
+    `surrogate_collection` - ключ коллекции для списков,
+    `surrogate_item_keys` - функция, возвращающая ключи объекта
+    по его сериализованным данным. Дополнительные ключи списка
+    возвращает `get_surrogate_list_keys`.
+    """
+    surrogate_collection: str
+    surrogate_item_keys: Callable[[dict], set[str]]
+
+    def get_surrogate_list_keys(self) -> set[str]:
+        return set()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if (
+            request.method not in SAFE_METHODS
+            or response.status_code != 200
+            or self.action not in ('list', 'retrieve')
+        ):
+            return response
+        item_keys = type(self).surrogate_item_keys
+        data = response.data
+        if self.action == 'retrieve':
+            keys = item_keys(data)
+        else:
+            items = data['results'] if isinstance(data, dict) else data
+            keys = list_keys(
+                self.surrogate_collection, items, item_keys,
+                self.get_surrogate_list_keys(),
+            )
+        set_cache_headers(request, response, keys)
+        return response
@@ -4,12 +4,103 @@
 Значение пагинации динамично и зависит от заданных параметров
 в переменных окружения проекта.
 """
-from rest_framework.pagination import PageNumberPagination
+import base64
+from typing import Optional
 
-from config.settings import PAGINATION_SIZE
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from config.settings import PAGINATION_SIZE, POPULARITY_MAX_LIMIT
+
+ORDERING_PARAM: str = 'ordering'
+POPULAR: str = 'popular'
+
+Cursor = tuple[float, int]
+
+
+def is_popular_ordering(request) -> bool:
+    """Запрошен ли список (рецептов или авторов) по популярности."""
+    return request.GET.get(ORDERING_PARAM) == POPULAR
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     """Настройка пагинации."""
     page_size = PAGINATION_SIZE
     page_size_query_param = 'limit'
+
+
+class PopularityPagination(BasePagination):
+    """Рецепты по убыванию популярности, страницы листаются курсором.
+
+    Курсор хранит `(popularity, id)` последнего рецепта страницы,
+    и следующая страница читается по индексу с этого места, поэтому
+    стоимость не зависит от глубины. Ответ - `{"next", "results"}`,
+    повреждённый курсор даёт 400, как в ленте.
+    """
+    page_size = PAGINATION_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = POPULARITY_MAX_LIMIT
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Некорректный курсор.'
+
+    def encode_cursor(self, cursor: Cursor) -> str:
+        popularity, recipe_id = cursor
+        return base64.urlsafe_b64encode(
+            f'{popularity!r}|{recipe_id}'.encode()
+        ).decode()
+
+    def decode_cursor(self, request) -> Optional[Cursor]:
+        value = request.query_params.get(self.cursor_query_param)
+        if not value:
+            return None
+        try:
+            popularity, recipe_id = (
+                base64.urlsafe_b64decode(value.encode()).decode().split('|')
+            )
+            return float(popularity), int(recipe_id)
+        except (UnicodeError, ValueError):
+            raise ValidationError(
+                {self.cursor_query_param: self.invalid_cursor_message}
+            )
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by('-popularity', '-pk')
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            popularity, recipe_id = cursor
+            queryset = queryset.filter(
+                Q(popularity__lt=popularity)
+                | Q(popularity=popularity, pk__lt=recipe_id)
+            )
+        page = list(queryset[:page_size + 1])
+        self.next_cursor = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_cursor = (page[-1].popularity, page[-1].pk)
+        return page
+
+    def get_next_link(self) -> Optional[str]:
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.next_cursor),
+        )
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
@@ -0,0 +1,228 @@
+"""
+Подбор рецептов по ингредиентам, которые есть у пользователя.
+
+Каждый процесс держит в памяти обратный индекс: для ингредиента -
+отсортированный массив NumPy с номерами рецептов, в которые он входит,
+и число ингредиентов каждого рецепта. Запрос складывает массивы
+выбранных ингредиентов через `np.bincount` и получает для каждого
+рецепта число совпавших и недостающих ингредиентов без обращения к базе.
+
+Изменения рецептов процесс, который их записал, применяет сразу
+(после коммита перечитывает ингредиенты изменённых рецептов в «дельту»
+поверх индекса). Остальные процессы узнают о них по счётчику версий
+в кеше и перестраивают индекс в фоновом потоке не чаще, чем раз
+в `PANTRY_REBUILD_INTERVAL` секунд, продолжая отвечать по старому.
+При нескольких воркерах кеш должен быть общим (`CACHE_BACKEND`);
+с кешем в памяти процесса (`LocMemCache` по умолчанию) счётчик чужих
+изменений не видит, и индекс перестраивается только по возрасту -
+не реже раза в `PANTRY_MAX_AGE` секунд.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from food.models import RecipeIngredient
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY: str = 'pantry:version'
+
+
+@dataclass
+class PantryMatch:
+    """Рецепты, отсортированные по числу недостающих ингредиентов."""
+    recipe_ids: np.ndarray
+    matched: np.ndarray
+    missing: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.recipe_ids)
+
+
+class PantryIndex:
+    """Обратный индекс ингредиент -> рецепты текущего процесса."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        self._built_at = 0.0
+        self.version: Optional[int] = None
+        self.recipe_ids = np.empty(0, dtype=np.int64)
+        self.sizes = np.empty(0, dtype=np.int32)
+        self.ingredient_ids = np.empty(0, dtype=np.int64)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.postings = np.empty(0, dtype=np.int32)
+        # Рецепты, изменённые после построения: id -> ингредиенты
+        # (None - рецепт удалён).
+        self.delta: dict[int, Optional[frozenset[int]]] = {}
+
+    # Build >>
+
+    def build(self) -> None:
+        """Строит индекс заново одним запросом."""
+        version = cache.get(VERSION_KEY, 0)
+        pairs = np.array(
+            list(RecipeIngredient.objects.values_list(
+                'recipe_id', 'ingredient_id'
+            )),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        recipe_ids, rows = np.unique(pairs[:, 0], return_inverse=True)
+        ingredient_ids, columns = np.unique(pairs[:, 1], return_inverse=True)
+        order = np.lexsort((rows, columns))
+        indptr = np.searchsorted(
+            columns[order], np.arange(len(ingredient_ids) + 1)
+        )
+        sizes = np.bincount(rows, minlength=len(recipe_ids))
+        with self._lock:
+            self.recipe_ids = recipe_ids
+            self.sizes = sizes.astype(np.int32)
+            self.ingredient_ids = ingredient_ids
+            self.indptr = indptr
+            self.postings = rows[order].astype(np.int32)
+            self.delta = {}
+            self.version = version
+            self._built_at = time.monotonic()
+        logger.info(
+            f'Индекс ингредиентов построен: рецептов {len(recipe_ids)}, '
+            f'связей {len(pairs)}.'
+        )
+
+    def _rebuild_in_background(self) -> None:
+        try:
+            self.build()
+        except Exception:
+            logger.exception('Не удалось перестроить индекс ингредиентов.')
+        finally:
+            self._rebuilding = False
+
+    def ensure_fresh(self) -> None:
+        """Строит индекс при первом обращении и обновляет устаревший."""
+        if self.version is None:
+            with _build_lock:
+                if self.version is None:
+                    self.build()
+            return
+        age = time.monotonic() - self._built_at
+        stale = (
+            cache.get(VERSION_KEY, 0) != self.version
+            or len(self.delta) > settings.PANTRY_MAX_DELTA
+            or age >= settings.PANTRY_MAX_AGE
+        )
+        if (
+            stale
+            and not self._rebuilding
+            and age >= settings.PANTRY_REBUILD_INTERVAL
+        ):
+            self._rebuilding = True
+            threading.Thread(
+                target=self._rebuild_in_background, daemon=True
+            ).start()
+
+    # Updates >>
+
+    def apply(self, recipe_ids: Iterable[int]) -> None:
+        """Перечитывает ингредиенты рецептов в дельту индекса."""
+        recipe_ids = set(recipe_ids)
+        ingredients: dict[int, set[int]] = {}
+        for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+            recipe__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id'):
+            ingredients.setdefault(recipe_id, set()).add(ingredient_id)
+        try:
+            version = cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, 1, timeout=None)
+            version = 1
+        with self._lock:
+            for recipe_id in recipe_ids:
+                found = ingredients.get(recipe_id)
+                self.delta[recipe_id] = frozenset(found) if found else None
+            # Если версию никто больше не менял, индекс остаётся свежим.
+            if self.version is not None and version == self.version + 1:
+                self.version = version
+
+    # Search >>
+
+    def match(
+        self, ingredient_ids: Iterable[int], max_missing: Optional[int] = None
+    ) -> PantryMatch:
+        """Ранжирует рецепты с хотя бы одним из ингредиентов.
+
+        Сначала рецепты, где недостаёт меньше ингредиентов, затем
+        с большим числом совпадений, затем более новые.
+        """
+        query = np.unique(np.fromiter(ingredient_ids, dtype=np.int64))
+        with self._lock:
+            recipe_ids, sizes = self.recipe_ids, self.sizes
+            known = self.ingredient_ids
+            indptr, postings = self.indptr, self.postings
+            delta = dict(self.delta)
+
+        columns = np.searchsorted(known, query)
+        valid = columns < len(known)
+        columns = columns[valid][known[columns[valid]] == query[valid]]
+        rows = np.concatenate(
+            [postings[indptr[column]:indptr[column + 1]]
+             for column in columns]
+            or [np.empty(0, dtype=np.int32)]
+        )
+        matched = np.bincount(rows, minlength=len(recipe_ids))
+        if delta:
+            # Изменённые рецепты считаются по дельте.
+            changed = np.fromiter(delta, dtype=np.int64)
+            positions = np.searchsorted(recipe_ids, changed)
+            inside = positions < len(recipe_ids)
+            stale = positions[inside][
+                recipe_ids[positions[inside]] == changed[inside]
+            ]
+            matched[stale] = 0
+        candidates = np.flatnonzero(matched)
+        found_ids = recipe_ids[candidates]
+        found_matched = matched[candidates]
+        found_missing = sizes[candidates] - found_matched
+
+        if delta:
+            wanted = set(query.tolist())
+            extra = [
+                (recipe_id, len(ingredients & wanted),
+                 len(ingredients - wanted))
+                for recipe_id, ingredients in delta.items()
+                if ingredients and ingredients & wanted
+            ]
+            if extra:
+                extra_ids, extra_matched, extra_missing = map(
+                    np.array, zip(*extra)
+                )
+                found_ids = np.concatenate((found_ids, extra_ids))
+                found_matched = np.concatenate((found_matched, extra_matched))
+                found_missing = np.concatenate((found_missing, extra_missing))
+
+        if max_missing is not None:
+            keep = found_missing <= max_missing
+            found_ids = found_ids[keep]
+            found_matched = found_matched[keep]
+            found_missing = found_missing[keep]
+        order = np.lexsort((-found_ids, -found_matched, found_missing))
+        return PantryMatch(
+            recipe_ids=found_ids[order],
+            matched=found_matched[order],
+            missing=found_missing[order],
+        )
+
+
+_build_lock = threading.Lock()
+pantry_index = PantryIndex()
+
+
+def recipes_changed(*recipe_ids: int) -> None:
+    """Обновляет индекс после коммита изменений ингредиентов рецептов."""
+    if recipe_ids:
+        transaction.on_commit(lambda: pantry_index.apply(recipe_ids))
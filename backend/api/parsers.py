@@ -0,0 +1,39 @@
+"""
+Содержит парсеры запросов, используемые в API.
+"""
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+
+class MultiPartJSONParser(MultiPartParser):
+    """
+    Multipart-парсер с поддержкой вложенных структур.
+
+    Файлы Django сохраняет во временные файлы по мере чтения запроса,
+    не загружая их в память целиком. Поля формы, перечисленные
+    в `json_fields`, могут передаваться как JSON-строка
+    (`ingredients=[{"id": 1, "amount": 10}]`) или повторяющимся
+    ключом (`tags=1&tags=2`). Остальные поля возвращаются
+    как одиночные значения.
+    """
+    json_fields: tuple[str, ...] = ('ingredients', 'tags')
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        result = super().parse(stream, media_type, parser_context)
+        data = {}
+        for key, values in result.data.lists():
+            if key not in self.json_fields:
+                data[key] = values[-1]
+                continue
+            if len(values) == 1 and values[0][:1] in ('[', '{'):
+                try:
+                    data[key] = json.loads(values[0])
+                except ValueError as exc:
+                    raise ParseError(f'Некорректный JSON в поле {key}: {exc}')
+            else:
+                data[key] = values
+        # DRF объединяет данные и файлы через `dict.update`, поэтому файлы
+        # тоже передаются обычным словарём, а не `MultiValueDict`.
+        return DataAndFiles(data, dict(result.files.items()))
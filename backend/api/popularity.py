@@ -0,0 +1,120 @@
+"""
+Популярность рецептов с затуханием во времени.
+
+Каждое добавление рецепта в избранное даёт `POPULARITY_FAVORITE_WEIGHT`,
+в корзину - `POPULARITY_CART_WEIGHT`, и вклад события уменьшается вдвое
+каждые `POPULARITY_HALF_LIFE` часов. Сумма хранится в индексированном
+поле `Recipe.popularity`, по которому список рецептов сортируется
+с `ordering=popular` без подсчёта избранного при каждом запросе.
+
+Оценки пересчитывает команда `refresh_popularity` (по cron раз
+в 10-15 минут). События старше `HORIZON_HALF_LIVES` периодов
+полураспада не учитываются, остальные база группирует по часам.
+
+Время добавления в избранное хранится в `FavoriteAdded`. Перед расчётом
+команда сверяет его с таблицей `favorite`: записям, добавленным в обход
+сигналов (до обновления, массовой вставкой, из админки), ставит текущее
+время, а записи удалённого избранного удаляет.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from api.feed import batched
+from api.surrogate import POPULAR, schedule_purge
+from food.models import Favorite, FavoriteAdded, Recipe, ShoppingCart
+
+logger = logging.getLogger(__name__)
+
+# Вклад события старше 20 периодов полураспада меньше одной миллионной.
+HORIZON_HALF_LIVES: int = 20
+SCORE_DIGITS: int = 6
+WRITE_BATCH_SIZE: int = 1000
+
+
+def sync_favorite_times(now: datetime) -> dict[str, int]:
+    """Сверяет `FavoriteAdded` с таблицей избранного."""
+    def same_pair(model):
+        return Exists(model.objects.filter(
+            user=OuterRef('user'), recipe=OuterRef('recipe')
+        ))
+
+    missing = (
+        Favorite.objects.filter(~same_pair(FavoriteAdded))
+        .values_list('user_id', 'recipe_id')
+        .iterator(chunk_size=WRITE_BATCH_SIZE)
+    )
+    added = 0
+    for batch in batched(missing, WRITE_BATCH_SIZE):
+        added += len(FavoriteAdded.objects.bulk_create(
+            (
+                FavoriteAdded(user_id=user_id, recipe_id=recipe_id, added=now)
+                for user_id, recipe_id in batch
+            ),
+            ignore_conflicts=True,
+        ))
+    removed, _ = FavoriteAdded.objects.filter(
+        ~same_pair(Favorite)
+    ).delete()
+    return {'added': added, 'removed': removed}
+
+
+def compute_scores(now: datetime) -> dict[int, float]:
+    """Считает оценки рецептов с событиями за горизонт."""
+    half_life = timedelta(hours=settings.POPULARITY_HALF_LIFE)
+    since = now - half_life * HORIZON_HALF_LIVES
+    scores: dict[int, float] = defaultdict(float)
+    for model, weight in (
+        (FavoriteAdded, settings.POPULARITY_FAVORITE_WEIGHT),
+        (ShoppingCart, settings.POPULARITY_CART_WEIGHT),
+    ):
+        events = (
+            model.objects.filter(added__gte=since)
+            .annotate(hour=TruncHour('added'))
+            .values_list('recipe_id', 'hour')
+            .annotate(count=Count('pk'))
+            .order_by()
+        )
+        for recipe_id, hour, count in events:
+            scores[recipe_id] += (
+                weight * count * 0.5 ** ((now - hour) / half_life)
+            )
+    return {
+        recipe_id: round(score, SCORE_DIGITS)
+        for recipe_id, score in scores.items()
+    }
+
+
+def refresh() -> dict[str, int]:
+    """Пересчитывает популярность и записывает изменившиеся оценки."""
+    now = timezone.now()
+    synced = sync_favorite_times(now)
+    scores = compute_scores(now)
+    current = dict(
+        Recipe.objects.filter(popularity__gt=0)
+        .values_list('pk', 'popularity')
+    )
+    changed = [
+        Recipe(pk=recipe_id, popularity=scores.get(recipe_id, 0))
+        for recipe_id in current.keys() | scores.keys()
+        if current.get(recipe_id, 0) != scores.get(recipe_id, 0)
+    ]
+    with transaction.atomic():
+        Recipe.objects.bulk_update(
+            changed, ['popularity'], batch_size=WRITE_BATCH_SIZE
+        )
+        if changed:
+            schedule_purge(POPULAR)
+    stats = {
+        'scored': len(scores),
+        'updated': len(changed),
+        'favorite_times': synced,
+    }
+    logger.info(f'Популярность рецептов пересчитана: {stats}.')
+    return stats
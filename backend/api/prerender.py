@@ -0,0 +1,205 @@
+"""
+Предварительная отрисовка популярных публичных страниц API в файлы.
+
+Анонимные ответы для первых страниц списка рецептов, первой страницы
+фильтра по каждому тегу, `/api/tags/` и `/api/ingredients/` сохраняются
+в `PRERENDER_ROOT`, откуда их отдаёт nginx без обращения к бэкенду
+(см. `nginx/nginx.conf`). Имя файла - строка запроса с префиксом `_`:
+
+    <PRERENDER_ROOT>/api/recipes/_page=1&limit=6.json
+    <PRERENDER_ROOT>/api/recipes/_.json  (без параметров)
+
+Рядом лежит сжатая копия `.json.gz` с максимальной степенью сжатия
+(`config/compression.py`), nginx отдаёт её клиентам, принимающим gzip.
+Копия `.json.br` пишется только при `PRERENDER_BROTLI`: стандартный
+образ nginx не умеет её отдавать. Файл переписывается атомарно
+(`os.replace`) и только если ответ изменился, файлы исчезнувших страниц
+и отключённых сжатых копий удаляются. Пересборку запускает задача
+`prerender.api`, её ставят в очередь сигналы из `api/signals.py`
+при изменении рецептов, тегов, ингредиентов, профилей авторов
+и после создания копий изображений.
+"""
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.test import RequestFactory
+
+from config.compression import BROTLI, FILE_SUFFIXES, compress
+from config.db_router import read_from_primary
+from food.models import Tag
+from jobs.queue import enqueue
+
+logger = logging.getLogger(__name__)
+
+RECIPES: str = 'recipes'
+TAGS: str = 'tags'
+INGREDIENTS: str = 'ingredients'
+GROUPS: tuple[str, ...] = (RECIPES, TAGS, INGREDIENTS)
+
+PATHS: dict[str, str] = {
+    RECIPES: '/api/recipes/',
+    TAGS: '/api/tags/',
+    INGREDIENTS: '/api/ingredients/',
+}
+
+
+def schedule_prerender(*groups: str) -> None:
+    """Ставит пересборку страниц групп в очередь, если она включена.
+
+    Задачи откладываются на `PRERENDER_DELAY` секунд, и серия изменений
+    приводит к одной пересборке.
+    """
+    if not settings.PRERENDER_API:
+        return
+    for group in groups:
+        enqueue(
+            'prerender.api',
+            {'groups': [group]},
+            delay=settings.PRERENDER_DELAY,
+            unique_key=f'prerender:{group}',
+        )
+
+
+def queries(group: str) -> list[str]:
+    """Строки запроса страниц группы, которые нужно отрисовать."""
+    if group != RECIPES:
+        return ['']
+    limit = settings.PAGINATION_SIZE
+    pages = [''] + [
+        f'page={page}&limit={limit}'
+        for page in range(1, settings.PRERENDER_RECIPE_PAGES + 1)
+    ]
+    pages += [
+        f'page=1&limit={limit}&tags={slug}'
+        for slug in Tag.objects.values_list('slug', flat=True)
+    ]
+    return pages
+
+
+def file_path(path: str, query: str) -> Path:
+    return Path(settings.PRERENDER_ROOT) / path.lstrip('/') / f'_{query}.json'
+
+
+def write_atomic(path: Path, content: bytes) -> bool:
+    """Записывает файл через переименование временного.
+
+    Читатель видит либо старый, либо новый файл целиком.
+    Возвращает False, если содержимое не изменилось.
+    """
+    try:
+        if path.read_bytes() == content:
+            return False
+    except FileNotFoundError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temp_name = tempfile.mkstemp(
+        dir=path.parent, prefix='.', suffix='.tmp'
+    )
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(content)
+        # mkstemp создаёт файл с правами 0600, nginx не смог бы его прочитать.
+        os.chmod(temp_name, 0o644)
+        os.replace(temp_name, path)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+    return True
+
+
+def file_suffixes() -> dict[str, str]:
+    """Расширения сжатых копий, которые нужно писать, по кодировкам."""
+    if settings.PRERENDER_BROTLI:
+        return FILE_SUFFIXES
+    return {
+        encoding: suffix
+        for encoding, suffix in FILE_SUFFIXES.items()
+        if encoding != BROTLI
+    }
+
+
+def write_compressed(path: Path, content: bytes, changed: bool) -> None:
+    """Обновляет сжатые копии файла, если он изменился или копии нет."""
+    for encoding, suffix in file_suffixes().items():
+        variant = path.with_name(path.name + suffix)
+        if changed or not variant.exists():
+            write_atomic(variant, compress(content, encoding, best=True))
+
+
+def source_path(path: Path) -> Path:
+    """Файл страницы, для сжатой копии - её исходный `.json`."""
+    return path if path.suffix == '.json' else path.with_suffix('')
+
+
+class Renderer:
+    """Выполняет анонимные GET-запросы к представлениям API."""
+
+    def __init__(self, base_url: Optional[str] = None) -> None:
+        from api.views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+        url = urlsplit(base_url or settings.PRERENDER_BASE_URL)
+        self.factory = RequestFactory(
+            HTTP_HOST=url.netloc, HTTP_ACCEPT='application/json'
+        )
+        self.secure = url.scheme == 'https'
+        # Пересборка не должна расходовать лимит запросов.
+        self.views = {
+            RECIPES: RecipeViewSet.as_view(
+                {'get': 'list'}, throttle_classes=[]
+            ),
+            TAGS: TagViewSet.as_view({'get': 'list'}, throttle_classes=[]),
+            INGREDIENTS: IngredientViewSet.as_view(
+                {'get': 'list'}, throttle_classes=[]
+            ),
+        }
+
+    def render(self, group: str, query: str) -> Optional[bytes]:
+        """Возвращает тело ответа или None, если страницы нет."""
+        request = self.factory.get(
+            f'{PATHS[group]}?{query}' if query else PATHS[group],
+            secure=self.secure,
+        )
+        response = self.views[group](request)
+        if response.status_code != 200:
+            return None
+        response.render()
+        return response.content
+
+
+def prerender(groups: Optional[Iterable[str]] = None) -> dict[str, int]:
+    """Обновляет файлы страниц групп. Возвращает число изменений."""
+    stats = {'written': 0, 'unchanged': 0, 'removed': 0}
+    renderer = Renderer()
+    suffixes = {'.json', *file_suffixes().values()}
+    # Реплика может ещё не получить изменение, ради которого
+    # запущена пересборка, а устаревший файл остался бы надолго.
+    with read_from_primary():
+        for group in groups or GROUPS:
+            written = set()
+            for query in queries(group):
+                content = renderer.render(group, query)
+                if content is None:
+                    continue
+                path = file_path(PATHS[group], query)
+                written.add(path)
+                changed = write_atomic(path, content)
+                write_compressed(path, content, changed)
+                if changed:
+                    stats['written'] += 1
+                else:
+                    stats['unchanged'] += 1
+            directory = file_path(PATHS[group], '').parent
+            for path in directory.glob('_*.json*'):
+                if (
+                    source_path(path) not in written
+                    or path.suffix not in suffixes
+                ):
+                    path.unlink(missing_ok=True)
+                    stats['removed'] += 1
+    logger.info(f'Страницы API отрисованы: {stats}.')
+    return stats
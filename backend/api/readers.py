@@ -0,0 +1,298 @@
+"""
+Быстрое чтение рецептов, подписок и ингредиентов без `ModelSerializer`.
+
+Словари ответа собираются напрямую из строк `values()`: на страницу
+рецептов приходится три запроса (рецепты с авторами и флагами, теги,
+ингредиенты) и никакой работы полей DRF на каждый объект.
+
+Порядок ключей берётся из `Meta.fields` соответствующего сериализатора
+один раз при объявлении класса, значения форматируются так же,
+как в сериализаторе, поэтому JSON совпадает побайтно. Совпадение
+проверяют тесты `api/tests/test_readers.py`, а на данных из базы -
+команда `check_readers`; сериализаторы остаются источником
+схемы и используются для записи и в браузерном API.
+"""
+from collections import defaultdict
+from typing import Any, Callable, Iterable, Optional, Union
+
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, F, OuterRef, Window
+from django.db.models.functions import RowNumber
+from rest_framework.serializers import ALL_FIELDS
+
+from api.serializers import (
+    CustomUserReadSerializer, IngredientSerializer, RecipeIngredientSerializer,
+    RecipeSerializer, ShortRecipeSerializer, TagSerializer, image_variants,
+)
+from food.models import Favorite, Recipe, RecipeIngredient, ShoppingCart
+from users.models import Subscription
+
+User = get_user_model()
+
+Row = dict[str, Any]
+Source = Union[str, Callable[[Row, Any], Any]]
+
+
+def file_url(name: str, storage, request=None) -> Optional[str]:
+    """Ссылка на файл, как у `ImageField` в DRF."""
+    if not name:
+        return None
+    url = storage.url(name)
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def image_field(model, column: str) -> tuple[Source, Source]:
+    """Источники полей изображения и его уменьшенных копий."""
+    storage = model._meta.get_field(column).storage
+
+    def url(row: Row, request) -> Optional[str]:
+        return file_url(row[column], storage, request)
+
+    def variants(row: Row, request) -> list[dict[str, Any]]:
+        return image_variants(row[column], storage, request)
+
+    return url, variants
+
+
+class RowReader:
+    """Собирает ответ сериализатора `serializer_class` из строки `values()`.
+
+    `sources` сопоставляет полю ответа ключ строки или функцию
+    `(row, request)`; поля без записи читаются из одноимённого ключа.
+    """
+    serializer_class: type
+    sources: dict[str, Source] = {}
+    fields: tuple[tuple[str, Source], ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        meta = cls.serializer_class.Meta
+        names = meta.fields
+        if names == ALL_FIELDS:
+            names = [field.name for field in meta.model._meta.concrete_fields]
+        cls.fields = tuple(
+            (name, cls.sources.get(name, name)) for name in names
+        )
+
+    @classmethod
+    def read(cls, row: Row, request=None) -> dict[str, Any]:
+        return {
+            name: source(row, request) if callable(source) else row[source]
+            for name, source in cls.fields
+        }
+
+
+_avatar, _avatar_variants = image_field(User, 'avatar')
+_image, _image_variants = image_field(Recipe, 'image')
+
+
+class UserReader(RowReader):
+    serializer_class = CustomUserReadSerializer
+    sources = {
+        'pk': 'id',
+        'avatar': _avatar,
+        'avatar_variants': _avatar_variants,
+    }
+
+
+class TagReader(RowReader):
+    serializer_class = TagSerializer
+
+
+class IngredientReader(RowReader):
+    serializer_class = IngredientSerializer
+
+
+class RecipeIngredientReader(RowReader):
+    serializer_class = RecipeIngredientSerializer
+
+
+class ShortRecipeReader(RowReader):
+    serializer_class = ShortRecipeSerializer
+    sources = {'image': _image, 'image_variants': _image_variants}
+
+
+class RecipeReader(RowReader):
+    serializer_class = RecipeSerializer
+    sources = {
+        **ShortRecipeReader.sources,
+        # Имена полей модели, поэтому аннотации называются иначе.
+        'is_favorited': '_is_favorited',
+        'is_in_shopping_cart': '_is_in_shopping_cart',
+    }
+
+
+USER_COLUMNS: tuple[str, ...] = (
+    'id', 'username', 'first_name', 'last_name', 'email', 'avatar',
+    'recipes_count', 'subscribers_count',
+)
+RECIPE_COLUMNS: tuple[str, ...] = (
+    'id', 'name', 'author_id', 'image', 'cooking_time', 'text',
+)
+SHORT_RECIPE_COLUMNS: tuple[str, ...] = (
+    'id', 'author_id', 'name', 'image', 'cooking_time',
+)
+AUTHOR_COLUMNS: tuple[str, ...] = tuple(
+    f'author__{column}' for column in USER_COLUMNS[1:]
+)
+INGREDIENT_COLUMNS: tuple[str, ...] = ('id', 'name', 'measurement_unit')
+
+
+def _flag(model, user, **lookups) -> Exists:
+    return Exists(model.objects.filter(user=user, **lookups))
+
+
+def read_users(request, user_ids: Iterable[int]) -> dict[int, dict]:
+    """Пользователи с флагом подписки текущего пользователя по id."""
+    queryset = User.objects.filter(pk__in=user_ids)
+    if request.user.is_authenticated:
+        queryset = queryset.annotate(
+            is_subscribed=_flag(
+                Subscription, request.user, author=OuterRef('pk')
+            )
+        )
+        rows = queryset.values(*USER_COLUMNS, 'is_subscribed')
+    else:
+        rows = [
+            {**row, 'is_subscribed': False}
+            for row in queryset.values(*USER_COLUMNS)
+        ]
+    return {row['id']: UserReader.read(row, request) for row in rows}
+
+
+def read_recipes(request, recipe_ids: Iterable[int]) -> list[dict]:
+    """Рецепты в порядке `recipe_ids`, как их отдаёт `RecipeSerializer`.
+
+    Отсутствующие в базе id (рецепт успели удалить) пропускаются.
+    """
+    recipe_ids = list(recipe_ids)
+    queryset = Recipe.objects.filter(pk__in=recipe_ids)
+    columns = (*RECIPE_COLUMNS, *AUTHOR_COLUMNS)
+    if request.user.is_authenticated:
+        queryset = queryset.annotate(
+            _is_favorited=_flag(
+                Favorite, request.user, recipe=OuterRef('pk')
+            ),
+            _is_in_shopping_cart=_flag(
+                ShoppingCart, request.user, recipe=OuterRef('pk')
+            ),
+            _author_is_subscribed=_flag(
+                Subscription, request.user, author=OuterRef('author')
+            ),
+        )
+        rows = queryset.values(
+            *columns, '_is_favorited', '_is_in_shopping_cart',
+            '_author_is_subscribed',
+        )
+    else:
+        rows = [
+            {
+                **row,
+                '_is_favorited': False,
+                '_is_in_shopping_cart': False,
+                '_author_is_subscribed': False,
+            }
+            for row in queryset.values(*columns)
+        ]
+    recipes = {row['id']: row for row in rows}
+    if not recipes:
+        return []
+
+    tags = defaultdict(list)
+    for recipe_id, *values in (
+        Recipe.tags.through.objects.filter(recipe__in=list(recipes))
+        .order_by('tag__name')
+        .values_list('recipe_id', 'tag_id', 'tag__name', 'tag__slug')
+    ):
+        tags[recipe_id].append(
+            TagReader.read(dict(zip(('id', 'name', 'slug'), values)))
+        )
+    ingredients = defaultdict(list)
+    for recipe_id, *values in (
+        RecipeIngredient.objects.filter(recipe__in=list(recipes))
+        .values_list(
+            'recipe_id', 'ingredient_id', 'ingredient__name',
+            'ingredient__measurement_unit', 'amount',
+        )
+    ):
+        ingredients[recipe_id].append(RecipeIngredientReader.read(
+            dict(zip(('id', 'name', 'measurement_unit', 'amount'), values))
+        ))
+    authors = {}
+    for row in recipes.values():
+        if row['author_id'] not in authors:
+            authors[row['author_id']] = UserReader.read({
+                'id': row['author_id'],
+                **{
+                    column: row[f'author__{column}']
+                    for column in USER_COLUMNS[1:]
+                },
+                'is_subscribed': row['_author_is_subscribed'],
+            }, request)
+
+    results = []
+    for recipe_id in recipe_ids:
+        row = recipes.get(recipe_id)
+        if row is None:
+            continue
+        row['author'] = authors[row['author_id']]
+        row['tags'] = tags[recipe_id]
+        row['ingredients'] = ingredients[recipe_id]
+        results.append(RecipeReader.read(row, request))
+    return results
+
+
+def parse_recipes_limit(value: Optional[str]) -> Optional[int]:
+    """Разбирает `recipes_limit` так же, как `SubscriptionSerializer`."""
+    if not value:
+        return None
+    limit = int(value)
+    if limit < 0:
+        raise ValueError('Negative indexing is not supported.')
+    return limit
+
+
+def read_subscriptions(
+    request, author_ids: Iterable[int], recipes_limit: Optional[int] = None
+) -> list[dict]:
+    """Подписки в порядке `author_ids`, как у `SubscriptionSerializer`.
+
+    Последние рецепты каждого автора выбираются одним запросом
+    с `ROW_NUMBER()` по автору, а не запросом на каждую подписку,
+    их число берётся из счётчика автора.
+    """
+    author_ids = list(author_ids)
+    authors = read_users(request, author_ids)
+    recipes = Recipe.objects.filter(author__in=author_ids)
+    if recipes_limit is not None:
+        recipes = recipes.annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F('author_id'),
+                order_by=F('pub_date').desc(),
+            )
+        ).filter(position__lte=recipes_limit)
+    latest = defaultdict(list)
+    for row in recipes.order_by('-pub_date').values(*SHORT_RECIPE_COLUMNS):
+        # Как и в сериализаторе, ссылки на изображения относительные.
+        latest[row['author_id']].append(ShortRecipeReader.read(row))
+
+    results = []
+    for author_id in author_ids:
+        count = authors[author_id]['recipes_count']
+        if recipes_limit is not None:
+            count = min(count, recipes_limit)
+        results.append({
+            **authors[author_id],
+            'recipes': latest[author_id],
+            'recipes_count': count,
+        })
+    return results
+
+
+def read_ingredients(queryset) -> list[dict]:
+    """Ингредиенты, как их отдаёт `IngredientSerializer`."""
+    return [
+        IngredientReader.read(row)
+        for row in queryset.values(*INGREDIENT_COLUMNS)
+    ]
@@ -0,0 +1,42 @@
+"""
+Рендерер JSON на orjson.
+
+`ORJSONRenderer` отдаёт те же байты, что и `JSONRenderer` DRF
+с настройками проекта (`UNICODE_JSON`, `COMPACT_JSON`), но кодирует
+в C-расширении orjson. Типы, которые orjson не знает (`Decimal`,
+ленивые строки перевода и т. п.), передаются кодировщику DRF.
+С отступами (браузерный API, `; indent=`) и при ошибке кодирования
+ответ рендерит `JSONRenderer`.
+"""
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+OPTIONS: int = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+LINE_SEPARATOR: bytes = '\u2028'.encode()
+PARAGRAPH_SEPARATOR: bytes = '\u2029'.encode()
+
+_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    """`JSONRenderer`, кодирующий ответ через orjson."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_default, option=OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Как и JSONRenderer, экранируем разделители строк для JavaScript.
+        return ret.replace(LINE_SEPARATOR, b'\\u2028').replace(
+            PARAGRAPH_SEPARATOR, b'\\u2029'
+        )
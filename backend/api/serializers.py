@@ -1,24 +1,33 @@
 """
 Хранит сериализаторы, используемые для работы API.
 """
-import base64
-import binascii
 from typing import Any, Union
+from urllib.parse import urlsplit
 
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import UploadedFile
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserSerializer
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework.relations import MANY_RELATION_KWARGS
 from rest_framework.validators import UniqueTogetherValidator
 
+from api.pantry import recipes_changed
+from api.prerender import RECIPES, schedule_prerender
+from api.similar import schedule_update as schedule_similar_update
+from api.surrogate import recipe_key, schedule_purge
+from api.uploads import (
+    check_uploaded_image, decode_base64_image, is_same_image,
+)
 from api.validators import (
     MAX_COOKING_TIME, MIN_COOKING_TIME, MIN_VALUE_INGREDIENT,
 )
+from config.images import WEBP, derivative_names, variants_ready
 from food.models import Ingredient, Recipe, RecipeIngredient, Tag
-from users.models import Subscription
+from users.models import COUNTER_FIELDS, Subscription
 
 User = get_user_model()
 
@@ -32,25 +41,31 @@ class Base64ImageField(serializers.ImageField):
 
     Позволяет принимать изображения в формате Base64,
     декодировать их и сохранять как файлы.
+    Также принимает файлы, загруженные через `multipart/form-data`.
     """
 
-    def to_internal_value(self, data: Union[str, ContentFile]) -> Any:
+    def to_internal_value(self, data: Union[str, UploadedFile]) -> Any:
         """
-        Преобразует данные из формата Base64 в объект ContentFile.
+        Преобразует данные из формата Base64 во временный файл.
 
         Если данные представляют собой строку, начинающуюся с 'data:image',
         она рассматривается как изображение в формате Base64.
         Строка разделяется на формат и содержимое изображения,
-        затем содержимое декодируется и сохраняется в объекте ContentFile.
+        затем содержимое порциями декодируется во временный файл.
+        Файлы из multipart-запроса передаются дальше без перекодирования.
+        Ссылка на текущее изображение при обновлении пропускается.
 
         Args:
-            data: Строка данных, представляющая изображение в формате Base64.
+            data: Строка данных, представляющая изображение в формате Base64,
+                или загруженный файл.
 
         Returns:
             Вызывает родительский метод, передав в него изображение
-            в виде объекта ContentFile.
+            в виде загруженного файла.
         """
-        if isinstance(data, str) and data.startswith('data:image'):
+        if isinstance(data, UploadedFile):
+            check_uploaded_image(data)
+        elif isinstance(data, str) and data.startswith('data:image'):
             try:
                 format, imgstr = data.split(';base64,', maxsplit=1)
                 if not imgstr:
@@ -62,16 +77,14 @@ class Base64ImageField(serializers.ImageField):
                     'Неверный формат изображения: ожидается base64.'
                 )
 
-            ext = format.split('/')[-1]
-
-            try:
-                decoded_img = base64.b64decode(imgstr)
-            except binascii.Error:
-                raise serializers.ValidationError(
-                    'Некорректные данные base64. Проверьте входные данные.'
-                )
-
-            data = ContentFile(decoded_img, name=f'temp.{ext}')
+            content_type = format.split(':')[-1]
+            ext = content_type.split('/')[-1]
+            data = decode_base64_image(
+                imgstr, name=f'temp.{ext}', content_type=content_type
+            )
+        elif isinstance(data, str) and self._is_current_image(data):
+            # Клиент вернул ссылку на текущее изображение: оно не меняется.
+            raise serializers.SkipField()
         else:
             raise serializers.ValidationError(
                 'Полученные данные не являются строкой с изображением.'
@@ -79,17 +92,137 @@ class Base64ImageField(serializers.ImageField):
 
         return super().to_internal_value(data)
 
+    def _is_current_image(self, url: str) -> bool:
+        """Проверяет, указывает ли ссылка на текущее изображение объекта."""
+        instance = getattr(self.parent, 'instance', None)
+        current = getattr(instance, self.source, None)
+        return bool(current) and urlsplit(url).path == urlsplit(
+            current.url
+        ).path
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Поле со ссылками на уменьшенные копии изображения.
+
+    Возвращает список копий по возрастанию ширины, каждая - в исходном
+    формате (`url`) и в WebP (`webp`). Пока фоновая задача не создала
+    копии, список пуст и клиент показывает оригинал.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value) -> list[dict[str, Any]]:
+        return image_variants(
+            value.name, value.storage, self.context.get('request')
+        )
+
+
+def image_variants(name, storage, request=None) -> list[dict[str, Any]]:
+    """Ссылки на уменьшенные копии изображения `name` (`ImageVariantsField`).
+    """
+    if not name or not variants_ready(name, storage):
+        return []
+
+    variants = []
+    for width, names in derivative_names(name).items():
+        variant: dict[str, Any] = {'width': width}
+        for ext, derivative in names.items():
+            url = storage.url(derivative)
+            variant[WEBP if ext == WEBP else 'url'] = (
+                request.build_absolute_uri(url) if request else url
+            )
+        variants.append(variant)
+    return variants
+
+
+class BatchPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Поле первичного ключа, проверяющее набор значений одним запросом.
+
+    Перед проверкой списка родитель вызывает `prefetch()`, и объекты
+    берутся из загруженного словаря вместо отдельного запроса на каждый id.
+    Сообщения об ошибках те же, что у `PrimaryKeyRelatedField`.
+    При `many=True` список проверяет `BatchManyRelatedField`.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BatchManyRelatedField(**list_kwargs)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._prefetched: Union[dict, None] = None
+
+    def to_pk(self, data):
+        """Приводит значение к типу первичного ключа без запроса к базе."""
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        if isinstance(data, bool):
+            raise TypeError
+        return self.get_queryset().model._meta.pk.get_prep_value(data)
+
+    def prefetch(self, values) -> None:
+        """Загружает объекты для всех корректных значений одним запросом.
+
+        Если в контексте переданы заранее загруженные объекты
+        (`preloaded`: {модель: {pk: объект}}), запрос не выполняется.
+        """
+        preloaded = self.context.get('preloaded', {}).get(
+            self.get_queryset().model
+        )
+        if preloaded is not None:
+            self._prefetched = preloaded
+            return
+        pks = set()
+        for value in values:
+            try:
+                pks.add(self.to_pk(value))
+            except (TypeError, ValueError, ValidationError):
+                continue
+        self._prefetched = self.get_queryset().in_bulk(pks)
+
+    def to_internal_value(self, data):
+        if self._prefetched is None:
+            return super().to_internal_value(data)
+        try:
+            pk = self.to_pk(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in self._prefetched:
+            self.fail('does_not_exist', pk_value=data)
+        return self._prefetched[pk]
+
+
+class BatchManyRelatedField(serializers.ManyRelatedField):
+    """Список первичных ключей, проверяемый одним запросом `IN`."""
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str) and hasattr(data, '__iter__'):
+            self.child_relation.prefetch(data)
+        return super().to_internal_value(data)
+
 
 # User >>
 
 class CustomUserReadSerializer(UserSerializer):
     """Сериализатор кастомного пользователя."""
     avatar = Base64ImageField(required=False, allow_null=True)
+    avatar_variants = ImageVariantsField(source='avatar')
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta(UserSerializer.Meta):
         model = User
-        fields = UserSerializer.Meta.fields + ('id', 'avatar', 'is_subscribed')
+        fields = UserSerializer.Meta.fields + (
+            'id', 'avatar', 'avatar_variants', 'is_subscribed',
+            'recipes_count', 'subscribers_count',
+        )
 
     def get_is_subscribed(self, obj):
         request = self.context.get('request')
@@ -154,8 +287,11 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         )
 
         recipes = instance.author.recipes.all()
+        # Число рецептов - из счётчика автора, без запроса COUNT.
+        recipes_count = instance.author.recipes_count
         if recipes_limit:
             recipes = recipes[:int(recipes_limit)]
+            recipes_count = min(recipes_count, int(recipes_limit))
 
         author_data = CustomUserReadSerializer(
             instance.author, context=self.context
@@ -164,7 +300,7 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         return {
             **author_data,   # type: ignore
             'recipes': ShortRecipeSerializer(recipes, many=True).data,
-            'recipes_count': recipes.count()
+            'recipes_count': recipes_count,
         }
 
 
@@ -201,9 +337,20 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class CreateRecipeIngredientListSerializer(serializers.ListSerializer):
+    """Список ингредиентов рецепта, id которых проверяются одним запросом."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.child.fields['id'].prefetch(
+                item.get('id') for item in data if isinstance(item, dict)
+            )
+        return super().to_internal_value(data)
+
+
 class CreateRecipeIngredientSerializer(serializers.ModelSerializer):
     """Сериализатор данных для сохранения ингредиентов в рецепт."""
-    id = serializers.PrimaryKeyRelatedField(
+    id = BatchPrimaryKeyRelatedField(
         queryset=Ingredient.objects.all(),
         error_messages={'does_not_exist': 'Ингредиент с таким ID не найден.'}
     )
@@ -222,15 +369,18 @@ class CreateRecipeIngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'amount')
+        list_serializer_class = CreateRecipeIngredientListSerializer
 
 
 # Recipe >>
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
     """Краткий сериализатор рецепта, используется в подписках."""
+    image_variants = ImageVariantsField(source='image')
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
 class RecipeSerializer(serializers.ModelSerializer):
@@ -238,6 +388,7 @@ class RecipeSerializer(serializers.ModelSerializer):
     author = CustomUserReadSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     image = Base64ImageField()
+    image_variants = ImageVariantsField(source='image')
     ingredients = RecipeIngredientSerializer(
         source='recipeingredient_set', many=True, read_only=True
     )
@@ -252,6 +403,7 @@ class RecipeSerializer(serializers.ModelSerializer):
             'author',
             'tags',
             'image',
+            'image_variants',
             'cooking_time',
             'ingredients',
             'text',
@@ -299,7 +451,7 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         },
     )
     image = Base64ImageField(use_url=True)
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BatchPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all(),
         error_messages={'does_not_exist': 'Тег с таким ID не найден.'}
@@ -352,6 +504,48 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             ]
         )
 
+    def _update_ingredients(self, recipe, ingredients):
+        """Приводит ингредиенты рецепта к новому списку минимумом запросов.
+
+        Добавляет новые, меняет количество у изменившихся
+        и удаляет исчезнувшие строки, не трогая остальные.
+        """
+        current = {
+            row.ingredient_id: row
+            for row in RecipeIngredient.objects.filter(recipe=recipe)
+        }
+        amounts = {
+            ingredient['id'].pk: ingredient['amount']
+            for ingredient in ingredients
+        }
+        removed = [
+            row.pk for ingredient_id, row in current.items()
+            if ingredient_id not in amounts
+        ]
+        if removed:
+            RecipeIngredient.objects.filter(pk__in=removed).delete()
+
+        changed = []
+        for ingredient_id, amount in amounts.items():
+            row = current.get(ingredient_id)
+            if row is not None and row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+
+        added = [
+            ingredient for ingredient in ingredients
+            if ingredient['id'].pk not in current
+        ]
+        self._create_ingredients(recipe, added)
+        if removed or changed or added:
+            # Массовые операции не отправляют сигналы моделей.
+            schedule_prerender(RECIPES)
+            schedule_purge(recipe_key(recipe.pk))
+            schedule_similar_update(recipe.pk)
+            recipes_changed(recipe.pk)
+
     def _add_ingredients_and_tags(self, recipe, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
@@ -369,17 +563,50 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             text=validated_data.pop('text'),
             cooking_time=validated_data.pop('cooking_time')
         )
+        # Ответ показывает автора с уже увеличенным счётчиком рецептов.
+        author.refresh_from_db(fields=COUNTER_FIELDS)
         self._add_ingredients_and_tags(recipe, validated_data)
         return recipe
 
     @transaction.atomic
     def update(self, instance, validated_data):
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        validated_data = self._add_ingredients_and_tags(
-            instance, validated_data
-        )
-        return super().update(instance, validated_data)
+        """Обновляет только изменившиеся поля и строки связей.
+
+        Изображение с тем же содержимым, что и сохранённое, не перезаписывается.
+        `tags.set()` сам добавляет и удаляет только различающиеся теги.
+        """
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
+        image = validated_data.pop('image', None)
+
+        update_fields = []
+        for field, value in validated_data.items():
+            if getattr(instance, field) != value:
+                setattr(instance, field, value)
+                update_fields.append(field)
+        if image is not None and not is_same_image(instance.image, image):
+            instance.image = image
+            update_fields.append('image')
+        if update_fields:
+            instance.save(update_fields=update_fields)
+
+        if ingredients is not None:
+            self._update_ingredients(instance, ingredients)
+        if tags is not None:
+            instance.tags.set(tags)
+        # Связи могли быть загружены до изменения.
+        if hasattr(instance, '_prefetched_objects_cache'):
+            instance._prefetched_objects_cache.clear()
+        return instance
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance],
+            'tags',
+            Prefetch(
+                'recipeingredient_set',
+                queryset=RecipeIngredient.objects.select_related('ingredient'),
+            ),
+        )
         serializer = RecipeSerializer(instance, context=self.context)
         return serializer.data
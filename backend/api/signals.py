@@ -0,0 +1,387 @@
+"""
+Содержит обработчики сигналов моделей, используемые API.
+
+Подключается в `ApiConfig.ready()`.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_save,
+)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api import counters, surrogate
+from api.authentication import CACHED_USER_FIELDS, token_cache
+from api.feed import remove_author
+from api.pantry import recipes_changed
+from api.prerender import INGREDIENTS, RECIPES, TAGS, schedule_prerender
+from api.similar import schedule_update as schedule_similar
+from api.surrogate import schedule_purge
+from config.images import derivatives_created, schedule_derivatives
+from food.models import (
+    Favorite, FavoriteAdded, Ingredient, Recipe, RecipeIngredient, Tag,
+)
+from jobs.queue import enqueue
+from users.models import Subscription
+
+User = get_user_model()
+
+# Поля пользователя, которые выводятся в рецептах.
+AUTHOR_FIELDS: frozenset[str] = frozenset(
+    {'email', 'username', 'first_name', 'last_name', 'avatar'}
+)
+
+# Поля пользователя, изменение которых сбрасывает кеш токенов:
+# хранимые в нём и пароль.
+TOKEN_CACHE_FIELDS: frozenset[str] = frozenset(
+    {*CACHED_USER_FIELDS, 'password'}
+)
+
+
+# Images >>
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance, update_fields=None, **kwargs):
+    """Запускает создание уменьшенных копий фотографии рецепта."""
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    if instance.image:
+        schedule_derivatives(instance.image.name)
+
+
+@receiver(pre_save, sender=User)
+def user_avatar_loaded(sender, instance, update_fields=None, **kwargs):
+    """Запоминает аватар из базы, чтобы узнать о его замене."""
+    if instance._state.adding or (
+        update_fields is not None and 'avatar' not in update_fields
+    ):
+        return
+    instance._saved_avatar = (
+        User.objects.filter(pk=instance.pk)
+        .values_list('avatar', flat=True).first()
+    ) or ''
+
+
+@receiver(post_save, sender=User)
+def user_avatar_saved(sender, instance, created, **kwargs):
+    """Создаёт копии нового аватара и удаляет копии прежнего.
+
+    Сохранения без поля `avatar` (вход с `last_login`) и с прежним
+    аватаром задач не ставят.
+    """
+    previous = instance.__dict__.pop('_saved_avatar', None)
+    if not created and previous is None:
+        return
+    current = instance.avatar.name or ''
+    if previous == current:
+        return
+    if current:
+        schedule_derivatives(current)
+    if previous:
+        enqueue('images.delete_derivatives', {'name': previous})
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_image_deleted(sender, instance, **kwargs):
+    """Удаляет уменьшенные копии фотографии удалённого рецепта."""
+    if instance.image:
+        enqueue('images.delete_derivatives', {'name': instance.image.name})
+
+
+# Token cache >>
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Сбрасывает кеш удалённого токена (выход через djoser)."""
+    key = instance.key
+    transaction.on_commit(lambda: token_cache.invalidate([key]))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields, **kwargs):
+    """Сбрасывает кеш токенов изменённого пользователя.
+
+    Покрывает деактивацию, смену прав и пароля. Сохранение только полей,
+    которых в кеше нет (`last_login` при каждом входе), его не трогает.
+    """
+    if created:
+        return
+    if update_fields is not None and not (
+        TOKEN_CACHE_FIELDS & set(update_fields)
+    ):
+        return
+    keys = list(
+        Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
+    transaction.on_commit(lambda: token_cache.invalidate(keys))
+
+
+# Prerendered pages >>
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_changed(sender, **kwargs):
+    """Пересобирает страницы списка рецептов."""
+    schedule_prerender(RECIPES)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        schedule_prerender(RECIPES)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    """Пересобирает список тегов и рецепты, включая страницы фильтров."""
+    schedule_prerender(TAGS, RECIPES)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    schedule_prerender(INGREDIENTS, RECIPES)
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields=None, **kwargs):
+    """Пересобирает рецепты, если изменился профиль их автора."""
+    if created or not settings.PRERENDER_API:
+        return
+    if update_fields is not None and not AUTHOR_FIELDS & set(update_fields):
+        return
+    if Recipe.objects.filter(author=instance).exists():
+        schedule_prerender(RECIPES)
+
+
+@receiver(derivatives_created)
+def image_derivatives_created(sender, name, **kwargs):
+    """Пересобирает рецепты: страницы сохранены без копий изображений."""
+    schedule_prerender(RECIPES)
+
+
+# Surrogate keys >>
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved_purge(sender, instance, created, **kwargs):
+    """Сбрасывает ответы с рецептом, а для нового - и списки рецептов."""
+    keys = [surrogate.recipe_key(instance.pk)]
+    if created:
+        # У автора меняется число рецептов.
+        keys += [surrogate.RECIPES, surrogate.author_key(instance.author_id)]
+    schedule_purge(*keys)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted_purge(sender, instance, **kwargs):
+    schedule_purge(
+        surrogate.recipe_key(instance.pk),
+        surrogate.RECIPES,
+        surrogate.author_key(instance.author_id),
+    )
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_changed_purge(sender, instance, **kwargs):
+    schedule_purge(surrogate.recipe_key(instance.recipe_id))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed_purge(sender, instance, action, **kwargs):
+    """Сбрасывает рецепт и списки: меняется состав фильтров по тегам."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        schedule_purge(surrogate.recipe_key(instance.pk), surrogate.RECIPES)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed_purge(sender, instance, **kwargs):
+    schedule_purge(surrogate.tag_key(instance.pk), surrogate.TAGS)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed_purge(sender, instance, **kwargs):
+    schedule_purge(
+        surrogate.ingredient_key(instance.pk), surrogate.INGREDIENTS
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved_purge(
+    sender, instance, created, update_fields=None, **kwargs
+):
+    if created:
+        schedule_purge(surrogate.USERS)
+    elif update_fields is None or AUTHOR_FIELDS & set(update_fields):
+        schedule_purge(surrogate.author_key(instance.pk))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted_purge(sender, instance, **kwargs):
+    schedule_purge(surrogate.author_key(instance.pk), surrogate.USERS)
+
+
+# Author counters >>
+
+@receiver(pre_save, sender=Recipe)
+def recipe_author_loaded(sender, instance, update_fields=None, **kwargs):
+    """Запоминает автора из базы: в админке рецепт можно передать."""
+    if instance._state.adding or (
+        update_fields is not None and 'author' not in update_fields
+    ):
+        return
+    instance._saved_author_id = (
+        Recipe.objects.filter(pk=instance.pk)
+        .values_list('author_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved_count(sender, instance, created, **kwargs):
+    if created:
+        counters.add(counters.RECIPES, instance.author_id, 1)
+        return
+    previous = instance.__dict__.pop('_saved_author_id', None)
+    if previous is not None and previous != instance.author_id:
+        counters.add(counters.RECIPES, previous, -1)
+        counters.add(counters.RECIPES, instance.author_id, 1)
+        schedule_purge(
+            surrogate.author_key(previous),
+            surrogate.author_key(instance.author_id),
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted_count(sender, instance, **kwargs):
+    counters.add(counters.RECIPES, instance.author_id, -1)
+
+
+def subscribers_changed(author_id: int) -> None:
+    """Сбрасывает карточки автора, в том числе в его рецептах."""
+    schedule_purge(surrogate.author_key(author_id))
+    if (
+        settings.PRERENDER_API
+        and Recipe.objects.filter(author_id=author_id).exists()
+    ):
+        schedule_prerender(RECIPES)
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created_count(sender, instance, created, **kwargs):
+    if created:
+        counters.add(counters.SUBSCRIBERS, instance.author_id, 1)
+        subscribers_changed(instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted_count(sender, instance, **kwargs):
+    counters.add(counters.SUBSCRIBERS, instance.author_id, -1)
+    subscribers_changed(instance.author_id)
+
+
+# Feed >>
+
+@receiver(post_save, sender=Recipe)
+def recipe_created_fan_out(sender, instance, created, **kwargs):
+    """Раскладывает новый рецепт по лентам подписчиков автора."""
+    if created:
+        enqueue('feed.fan_out', {'recipe_ids': [instance.pk]})
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(sender, instance, created, **kwargs):
+    if created:
+        enqueue('feed.backfill', {
+            'user_id': instance.user_id,
+            'author_id': instance.author_id,
+        })
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    """Убирает рецепты автора из ленты отписавшегося пользователя.
+
+    Если после отписки автор опустился до порога популярности, его
+    рецепты раскладываются по лентам остальных подписчиков. Выполняется
+    после `subscription_deleted_count`, уменьшившего счётчик.
+    """
+    remove_author(instance.user_id, instance.author_id)
+    author_id = instance.author_id
+    if User.objects.filter(
+        pk=author_id,
+        subscribers_count=settings.FEED_FANOUT_MAX_SUBSCRIBERS,
+    ).exists():
+        enqueue(
+            'feed.materialize',
+            {'author_id': author_id},
+            delay=settings.FEED_POPULAR_CACHE_TTL,
+            unique_key=f'feed-materialize:{author_id}',
+        )
+
+
+# Similar recipes >>
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_changed_similar(sender, instance, **kwargs):
+    schedule_similar(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed_similar(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        schedule_similar(instance.pk)
+
+
+# Pantry index >>
+
+@receiver(post_save, sender=Recipe)
+def recipe_created_pantry(sender, instance, created, **kwargs):
+    if created:
+        recipes_changed(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted_pantry(sender, instance, **kwargs):
+    recipes_changed(instance.pk)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_changed_pantry(sender, instance, origin=None, **kwargs):
+    # При каскадном удалении рецепта хватает сигнала самого рецепта.
+    if not isinstance(origin, Recipe):
+        recipes_changed(instance.recipe_id)
+
+
+# Popularity >>
+
+@receiver(m2m_changed, sender=Favorite)
+def favorite_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Ведёт время добавления в избранное для популярности.
+
+    `reverse` - изменение со стороны пользователя (`user.favorites`).
+    """
+    owner = 'user' if reverse else 'recipe'
+    other = 'recipe' if reverse else 'user'
+    if action == 'post_add':
+        FavoriteAdded.objects.bulk_create(
+            (
+                FavoriteAdded(**{owner: instance, f'{other}_id': pk})
+                for pk in pk_set
+            ),
+            ignore_conflicts=True,
+        )
+    elif action == 'post_remove':
+        FavoriteAdded.objects.filter(
+            **{owner: instance, f'{other}__in': pk_set}
+        ).delete()
+    elif action == 'post_clear':
+        FavoriteAdded.objects.filter(**{owner: instance}).delete()
@@ -0,0 +1,265 @@
+"""
+Похожие рецепты по общим ингредиентам и тегам.
+
+Рецепт представляется разреженным вектором признаков: ингредиенты
+и теги с весами IDF (редкий ингредиент говорит о сходстве больше, чем
+соль), теги дополнительно умножаются на `SIMILAR_TAG_WEIGHT`. Сходство -
+косинус между векторами. Для каждого рецепта `SIMILAR_TOP_K` ближайших
+соседей сохраняются в `SimilarRecipe`, и эндпоинт читает их одним
+запросом по индексу.
+
+Векторы хранятся в виде CSR-массивов NumPy, кандидаты на сходство
+берутся из обратного индекса признак -> рецепты, поэтому каждый рецепт
+сравнивается только с рецептами, имеющими с ним общие признаки.
+Признаки, встречающиеся больше чем в `SIMILAR_MAX_FEATURE_SHARE`
+рецептов большого каталога, не учитываются, как стоп-слова.
+
+Полный пересчёт выполняет команда `build_similar` (раз в сутки),
+после изменения рецепта задача `similar.update` пересчитывает списки
+соседей самого рецепта и рецептов из его нового списка. Процесс
+воркера держит индекс в памяти и при изменении читает из базы только
+признаки изменённых рецептов, подставляя их в индекс вместо старых.
+Правки, применённые другими воркерами, он видит после полной
+перестройки не реже раза в `SIMILAR_INDEX_MAX_AGE` секунд.
+"""
+import logging
+import math
+import threading
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from food.models import Recipe, RecipeIngredient, SimilarRecipe
+from jobs.queue import enqueue
+
+logger = logging.getLogger(__name__)
+
+# Стоп-признаки отбрасываются только в каталогах не меньше этого размера.
+MIN_RECIPES_FOR_STOP_FEATURES: int = 1000
+WRITE_BATCH_SIZE: int = 5000
+
+# Индекс процесса воркера для `update`.
+_index: Optional['FeatureIndex'] = None
+_index_lock = threading.Lock()
+
+
+class FeatureIndex:
+    """Разреженная матрица рецепт × признак и обратный индекс к ней.
+
+    Строится из пар (рецепт, признак); признак - код ингредиента
+    (`id * 2`) или тега (`id * 2 + 1`), см. `feature_keys`.
+    """
+
+    def __init__(self, pair_recipes: np.ndarray, pair_keys: np.ndarray) -> None:
+        self.pair_recipes = pair_recipes
+        self.pair_keys = pair_keys
+        self.recipe_ids, recipe_rows = np.unique(
+            pair_recipes, return_inverse=True
+        )
+        keys, features = np.unique(pair_keys, return_inverse=True)
+        # CSR: признаки рецепта `row` - features[indptr[row]:indptr[row + 1]].
+        order = np.argsort(recipe_rows, kind='stable')
+        self.features = features[order]
+        self.indptr = np.searchsorted(
+            recipe_rows[order], np.arange(len(self.recipe_ids) + 1)
+        )
+        # CSC: рецепты признака `f` - rows[f_indptr[f]:f_indptr[f + 1]].
+        order = np.argsort(features, kind='stable')
+        self.posting_rows = recipe_rows[order]
+        self.posting_indptr = np.searchsorted(
+            features[order], np.arange(len(keys) + 1)
+        )
+
+        count = len(self.recipe_ids)
+        frequency = np.bincount(features, minlength=len(keys))
+        weights = np.log((count + 1) / (frequency + 1)) + 1
+        weights[keys % 2 == 1] *= settings.SIMILAR_TAG_WEIGHT
+        if count >= MIN_RECIPES_FOR_STOP_FEATURES:
+            weights[
+                frequency > settings.SIMILAR_MAX_FEATURE_SHARE * count
+            ] = 0
+        self.weights = weights
+        squared = np.bincount(
+            recipe_rows, weights=weights[features] ** 2, minlength=count,
+        )
+        self.norms = np.sqrt(squared)
+        self.built_at = time.monotonic()
+
+    @staticmethod
+    def feature_keys(
+        recipe_ids: Optional[Iterable[int]] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Читает пары (рецепт, признак) всех или указанных рецептов."""
+        ingredients = RecipeIngredient.objects.all()
+        tags = Recipe.tags.through.objects.all()
+        if recipe_ids is not None:
+            ingredients = ingredients.filter(recipe__in=recipe_ids)
+            tags = tags.filter(recipe__in=recipe_ids)
+        ingredient_pairs = np.array(
+            list(ingredients.values_list('recipe_id', 'ingredient_id')),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        tag_pairs = np.array(
+            list(tags.values_list('recipe_id', 'tag_id')),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        # Ингредиенты и теги кодируются в одном пространстве.
+        return (
+            np.concatenate((ingredient_pairs[:, 0], tag_pairs[:, 0])),
+            np.concatenate(
+                (ingredient_pairs[:, 1] * 2, tag_pairs[:, 1] * 2 + 1)
+            ),
+        )
+
+    @classmethod
+    def build(cls) -> 'FeatureIndex':
+        """Строит индекс по всем рецептам двумя запросами."""
+        return cls(*cls.feature_keys())
+
+    def patched(self, recipe_ids: Iterable[int]) -> 'FeatureIndex':
+        """Индекс, в котором признаки рецептов перечитаны из базы.
+
+        Запросы затрагивают только эти рецепты; остальные пары берутся
+        из текущего индекса, веса IDF пересчитываются по всем.
+        """
+        recipe_ids = list(recipe_ids)
+        pair_recipes, pair_keys = self.feature_keys(recipe_ids)
+        keep = ~np.isin(self.pair_recipes, recipe_ids)
+        return type(self)(
+            np.concatenate((self.pair_recipes[keep], pair_recipes)),
+            np.concatenate((self.pair_keys[keep], pair_keys)),
+        )
+
+    def row(self, recipe_id: int) -> Optional[int]:
+        row = int(np.searchsorted(self.recipe_ids, recipe_id))
+        if row < len(self.recipe_ids) and self.recipe_ids[row] == recipe_id:
+            return row
+        return None
+
+    def neighbours(self, row: int, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Возвращает строки `k` ближайших рецептов и косинусы до них."""
+        features = self.features[self.indptr[row]:self.indptr[row + 1]]
+        features = features[self.weights[features] > 0]
+        if not len(features) or not self.norms[row]:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        starts = self.posting_indptr[features]
+        lengths = self.posting_indptr[features + 1] - starts
+        # Строки всех рецептов, имеющих общие признаки, и вклад
+        # каждого общего признака в скалярное произведение.
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        candidates = self.posting_rows[np.arange(lengths.sum()) + offsets]
+        contributions = np.repeat(self.weights[features] ** 2, lengths)
+
+        rows, inverse = np.unique(candidates, return_inverse=True)
+        dots = np.bincount(inverse, weights=contributions)
+        keep = rows != row
+        rows, dots = rows[keep], dots[keep]
+        scores = dots / (self.norms[row] * self.norms[rows])
+        if len(rows) > k:
+            top = np.argpartition(-scores, k)[:k]
+            rows, scores = rows[top], scores[top]
+        # При равном сходстве выше более новый рецепт.
+        order = np.lexsort((-self.recipe_ids[rows], -scores))
+        return rows[order], scores[order]
+
+    def similar_recipes(
+        self, rows: Iterable[int], k: int
+    ) -> list[SimilarRecipe]:
+        similar = []
+        for row in rows:
+            recipe_id = int(self.recipe_ids[row])
+            neighbours, scores = self.neighbours(row, k)
+            similar.extend(
+                SimilarRecipe(
+                    recipe_id=recipe_id,
+                    similar_id=int(self.recipe_ids[neighbour]),
+                    score=float(score),
+                    rank=rank,
+                )
+                for rank, (neighbour, score) in enumerate(
+                    zip(neighbours, scores), start=1
+                )
+                if score > 0 and not math.isnan(score)
+            )
+        return similar
+
+
+def build_all() -> dict[str, int]:
+    """Пересчитывает соседей всех рецептов."""
+    index = FeatureIndex.build()
+    similar = index.similar_recipes(
+        range(len(index.recipe_ids)), settings.SIMILAR_TOP_K
+    )
+    with transaction.atomic():
+        SimilarRecipe.objects.all().delete()
+        SimilarRecipe.objects.bulk_create(
+            similar, batch_size=WRITE_BATCH_SIZE
+        )
+    stats = {'recipes': len(index.recipe_ids), 'pairs': len(similar)}
+    logger.info(f'Похожие рецепты пересчитаны: {stats}.')
+    return stats
+
+
+def current_index(recipe_ids: Iterable[int]) -> FeatureIndex:
+    """Индекс процесса с перечитанными признаками изменённых рецептов."""
+    global _index
+    if (
+        _index is None
+        or time.monotonic() - _index.built_at
+        >= settings.SIMILAR_INDEX_MAX_AGE
+    ):
+        _index = FeatureIndex.build()
+    else:
+        _index = _index.patched(recipe_ids)
+    return _index
+
+
+def update(recipe_ids: list[int]) -> dict[str, int]:
+    """Задача: пересчитывает соседей изменившихся рецептов.
+
+    Соседи изменившегося рецепта тоже пересчитываются, чтобы он мог
+    попасть в их списки.
+    """
+    k = settings.SIMILAR_TOP_K
+    with _index_lock:
+        index = current_index(recipe_ids)
+    rows = {
+        row for row in map(index.row, recipe_ids) if row is not None
+    }
+    for row in list(rows):
+        neighbours, _ = index.neighbours(row, k)
+        rows.update(int(neighbour) for neighbour in neighbours)
+    similar = index.similar_recipes(sorted(rows), k)
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(
+            recipe__in=[int(index.recipe_ids[row]) for row in rows]
+        ).delete()
+        SimilarRecipe.objects.filter(recipe__in=recipe_ids).delete()
+        SimilarRecipe.objects.bulk_create(
+            similar, batch_size=WRITE_BATCH_SIZE
+        )
+    return {'recipes': len(rows), 'pairs': len(similar)}
+
+
+def schedule_update(*recipe_ids: int) -> None:
+    """Ставит пересчёт соседей рецептов в очередь.
+
+    Для одного рецепта повторные изменения в течение
+    `SIMILAR_UPDATE_DELAY` секунд приводят к одному пересчёту.
+    """
+    if len(recipe_ids) == 1:
+        enqueue(
+            'similar.update',
+            {'recipe_ids': list(recipe_ids)},
+            delay=settings.SIMILAR_UPDATE_DELAY,
+            unique_key=f'similar:{recipe_ids[0]}',
+        )
+    elif recipe_ids:
+        enqueue(
+            'similar.update',
+            {'recipe_ids': list(recipe_ids)},
+            delay=settings.SIMILAR_UPDATE_DELAY,
+        )
@@ -0,0 +1,243 @@
+"""
+Суррогатные ключи ответов API и сброс кеша обратного прокси.
+
+Ответы на чтение рецептов, тегов, ингредиентов и пользователей получают
+заголовок `SURROGATE_KEY_HEADER` с ключами объектов, из которых собраны:
+
+    Surrogate-Key: author-7 ingredient-15 recipe-42 recipes tag-3
+
+Ключи коллекций (`recipes`, `tags`, `ingredients`, `users`) ставятся
+на списки и сбрасываются, когда меняется их состав. Список рецептов
+по популярности дополнительно помечается `recipes-popular` и сбрасывается
+после пересчёта популярности.
+
+Длина заголовка ограничена `SURROGATE_KEY_MAX_LENGTH` байтами: nginx
+и Varnish отвергают ответ с заголовками больше своего буфера (4-8 КБ).
+Список, ключи объектов которого не помещаются (ингредиенты без
+пагинации, большой `limit`), помечается только ключом коллекции,
+если она сбрасывается при изменении любого своего объекта (теги,
+ингредиенты), а иначе не кешируется прокси. При изменении
+моделей сигналы из `api/signals.py` ставят задачу `surrogate.purge`,
+которая передаёт ключи бэкенду сброса `SURROGATE_PURGE_BACKEND`:
+
+    api.surrogate.HttpPurgeBackend - запрос к прокси (Varnish xkey, Fastly);
+    api.surrogate.FilePurgeBackend - дописывает ключи строкой в файл;
+    api.surrogate.MemoryPurgeBackend - список в памяти процесса, для тестов.
+
+Пока бэкенд сброса не задан, `Cache-Control` не выставляется. С ним
+анонимные ответы получают `s-maxage=SURROGATE_PROXY_TTL`: прокси хранит
+их, пока не придёт сброс, а ответы на запросы с токеном - `private`.
+"""
+import hashlib
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.module_loading import import_string
+
+from jobs.queue import enqueue
+
+RECIPES: str = 'recipes'
+TAGS: str = 'tags'
+INGREDIENTS: str = 'ingredients'
+USERS: str = 'users'
+POPULAR: str = 'recipes-popular'
+
+# Коллекции, ключ которых сбрасывается при изменении любого объекта.
+PURGED_WITH_ITEMS: frozenset[str] = frozenset({TAGS, INGREDIENTS})
+
+
+def recipe_key(pk: int) -> str:
+    return f'recipe-{pk}'
+
+
+def author_key(pk: int) -> str:
+    return f'author-{pk}'
+
+
+def tag_key(pk: int) -> str:
+    return f'tag-{pk}'
+
+
+def ingredient_key(pk: int) -> str:
+    return f'ingredient-{pk}'
+
+
+# Keys of serialized data >>
+
+def user_keys(data: dict) -> set[str]:
+    return {author_key(data['id'])}
+
+
+def tag_keys(data: dict) -> set[str]:
+    return {tag_key(data['id'])}
+
+
+def ingredient_keys(data: dict) -> set[str]:
+    return {ingredient_key(data['id'])}
+
+
+def recipe_keys(data: dict) -> set[str]:
+    keys = {recipe_key(data['id'])}
+    if data.get('author'):
+        keys |= user_keys(data['author'])
+    for tag in data.get('tags', ()):
+        keys |= tag_keys(tag)
+    for ingredient in data.get('ingredients', ()):
+        keys |= ingredient_keys(ingredient)
+    return keys
+
+
+def header_value(keys: Iterable[str]) -> str:
+    return ' '.join(sorted(keys))
+
+
+def list_keys(
+    collection: str,
+    items: Iterable[dict],
+    item_keys: Callable,
+    extra: Iterable[str] = (),
+) -> set[str]:
+    """Ключи списка: коллекция, все объекты страницы и `extra`.
+
+    Если заголовок получился бы длиннее `SURROGATE_KEY_MAX_LENGTH`,
+    остаётся только ключ коллекции из `PURGED_WITH_ITEMS`, а для
+    остальных коллекций - пустой набор: такой ответ прокси не хранит.
+    """
+    keys = {collection, *extra}
+    for item in items:
+        keys |= item_keys(item)
+    if len(header_value(keys)) <= settings.SURROGATE_KEY_MAX_LENGTH:
+        return keys
+    if collection in PURGED_WITH_ITEMS:
+        return {collection, *extra}
+    return set()
+
+
+def set_cache_headers(request, response, keys: Iterable[str]) -> None:
+    """Помечает ответ ключами и разрешает прокси хранить анонимные ответы.
+
+    Ответ без ключей или со слишком длинным для прокси заголовком
+    остаётся без заголовка и помечается `private`: сбросить его
+    из кеша было бы нечем.
+    """
+    value = header_value(keys)
+    bounded = 0 < len(value) <= settings.SURROGATE_KEY_MAX_LENGTH
+    if bounded:
+        response[settings.SURROGATE_KEY_HEADER] = value
+    if not purge_enabled():
+        return
+    patch_vary_headers(response, ('Authorization',))
+    if 'HTTP_AUTHORIZATION' in request.META or not bounded:
+        patch_cache_control(response, private=True, max_age=0)
+    else:
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.SURROGATE_BROWSER_TTL,
+            s_maxage=settings.SURROGATE_PROXY_TTL,
+        )
+
+
+# Purge backends >>
+
+class PurgeBackend:
+    """Сбрасывает ответы с заданными ключами из кеша прокси."""
+
+    def purge(self, keys: list[str]) -> None:
+        raise NotImplementedError
+
+
+class MemoryPurgeBackend(PurgeBackend):
+    """Запоминает сброшенные ключи в памяти процесса."""
+
+    def __init__(self) -> None:
+        self.purged: list[list[str]] = []
+
+    def purge(self, keys: list[str]) -> None:
+        self.purged.append(sorted(keys))
+
+
+class FilePurgeBackend(PurgeBackend):
+    """Дописывает ключи строкой в `SURROGATE_PURGE_FILE`."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = Path(path or settings.SURROGATE_PURGE_FILE)
+
+    def purge(self, keys: list[str]) -> None:
+        with self.path.open('a', encoding='utf-8') as file:
+            file.write(' '.join(sorted(keys)) + '\n')
+
+
+class HttpPurgeBackend(PurgeBackend):
+    """Отправляет ключи прокси HTTP-запросом.
+
+    Ключи передаются через пробел в заголовке `SURROGATE_PURGE_HEADER`
+    запроса `SURROGATE_PURGE_METHOD` на `SURROGATE_PURGE_URL`. Например,
+    для Varnish с vmod xkey - `PURGE` с заголовком `xkey-purge`,
+    для Fastly - `POST` на `/service/<id>/purge` с `Surrogate-Key`
+    и токеном в `SURROGATE_PURGE_HEADERS`.
+    """
+
+    def __init__(self) -> None:
+        self.url = settings.SURROGATE_PURGE_URL
+        self.method = settings.SURROGATE_PURGE_METHOD
+        self.header = settings.SURROGATE_PURGE_HEADER
+        self.headers = settings.SURROGATE_PURGE_HEADERS
+        self.batch_size = settings.SURROGATE_PURGE_BATCH_SIZE
+        self.timeout = settings.SURROGATE_PURGE_TIMEOUT
+
+    def purge(self, keys: list[str]) -> None:
+        # Нужен только воркеру задач: веб-воркеры не тратят время
+        # на импорт requests при старте.
+        import requests
+
+        keys = sorted(keys)
+        for start in range(0, len(keys), self.batch_size):
+            batch = keys[start:start + self.batch_size]
+            response = requests.request(
+                self.method,
+                self.url,
+                headers={**self.headers, self.header: ' '.join(batch)},
+                timeout=self.timeout,
+            )
+            # Ошибка прокси приводит к повтору задачи.
+            response.raise_for_status()
+
+
+_backends: dict[str, PurgeBackend] = {}
+
+
+def purge_enabled() -> bool:
+    return bool(settings.SURROGATE_PURGE_BACKEND)
+
+
+def get_purge_backend() -> PurgeBackend:
+    """Возвращает экземпляр бэкенда сброса, общий для процесса."""
+    path = settings.SURROGATE_PURGE_BACKEND
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
+
+
+def schedule_purge(*keys: str) -> None:
+    """Ставит сброс ключей в очередь после коммита текущей транзакции.
+
+    Одинаковые наборы ключей, ещё ожидающие в очереди, не дублируются.
+    """
+    if not purge_enabled() or not keys:
+        return
+    keys_list = sorted(set(keys))
+    digest = hashlib.sha1(' '.join(keys_list).encode()).hexdigest()
+    enqueue(
+        'surrogate.purge',
+        {'keys': keys_list},
+        unique_key=f'surrogate:{digest}',
+    )
+
+
+def purge(keys: list[str]) -> dict[str, Any]:
+    """Задача сброса: передаёт ключи бэкенду."""
+    get_purge_backend().purge(keys)
+    return {'purged': len(keys)}
@@ -0,0 +1,22 @@
+"""
+Регистрирует фоновые задачи API.
+
+Модуль подключается автоматически приложением `jobs`.
+"""
+from api.feed import backfill, fan_out, materialize
+from api.popularity import refresh as refresh_popularity
+from api.prerender import prerender
+from api.similar import update as update_similar
+from api.surrogate import purge
+from config.images import delete_derivatives, ensure_derivatives
+from jobs.queue import task
+
+task('images.ensure_derivatives')(ensure_derivatives)
+task('images.delete_derivatives')(delete_derivatives)
+task('prerender.api')(prerender)
+task('surrogate.purge')(purge)
+task('feed.fan_out')(fan_out)
+task('feed.backfill')(backfill)
+task('feed.materialize')(materialize)
+task('similar.update')(update_similar)
+task('popularity.refresh')(refresh_popularity)
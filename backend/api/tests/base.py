@@ -0,0 +1,103 @@
+"""
+Общие данные тестов API: небольшой каталог рецептов с подписками,
+избранным и корзиной.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from food.models import Ingredient, Recipe, RecipeIngredient, ShoppingCart, Tag
+from jobs.models import Job
+from jobs.queue import get_task
+from users.models import Subscription
+
+User = get_user_model()
+
+
+def create_user(username: str, **fields) -> User:
+    return User.objects.create_user(
+        email=f'{username}@example.com',
+        username=username,
+        first_name=username.title(),
+        last_name='Тестов',
+        password='password-1234',
+        **fields,
+    )
+
+
+def create_recipe(author, name: str, ingredients, tags=(), **fields):
+    """Рецепт с ингредиентами `{ингредиент: количество}` и тегами."""
+    recipe = Recipe.objects.create(
+        author=author,
+        name=name,
+        text=f'Как приготовить {name}.',
+        cooking_time=fields.pop('cooking_time', 10),
+        image=fields.pop('image', f'food/recipes/{name}.png'),
+        **fields,
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=amount)
+        for ingredient, amount in ingredients.items()
+    )
+    recipe.tags.set(tags)
+    return recipe
+
+
+def run_jobs(*names: str) -> None:
+    """Выполняет ожидающие задачи с именами `names`, как воркер."""
+    for job in Job.objects.filter(
+        task__in=names, status=Job.Status.PENDING
+    ).order_by('pk'):
+        get_task(job.task)(**job.payload)
+        job.delete()
+
+
+class CatalogTestCase(TestCase):
+    """Три автора, пять рецептов, подписки, избранное и корзина."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = create_user('alice')
+        cls.bob = create_user('bob')
+        cls.carol = create_user('carol', avatar='avatars/carol.png')
+
+        cls.breakfast = Tag.objects.create(name='Завтрак', slug='breakfast')
+        cls.dinner = Tag.objects.create(name='Ужин', slug='dinner')
+        cls.flour, cls.egg, cls.milk, cls.salt, cls.cheese = (
+            Ingredient.objects.create(name=name, measurement_unit=unit)
+            for name, unit in (
+                ('мука', 'г'), ('яйцо', 'шт.'), ('молоко', 'мл'),
+                ('соль', 'по вкусу'), ('сыр', 'г'),
+            )
+        )
+
+        cls.pancakes = create_recipe(
+            cls.bob, 'Блины',
+            {cls.flour: 200, cls.egg: 2, cls.milk: 500, cls.salt: 1},
+            [cls.breakfast],
+        )
+        cls.omelette = create_recipe(
+            cls.bob, 'Омлет', {cls.egg: 3, cls.milk: 50, cls.salt: 1},
+            [cls.breakfast, cls.dinner],
+        )
+        cls.syrniki = create_recipe(
+            cls.carol, 'Сырники', {cls.cheese: 300, cls.egg: 1, cls.flour: 50},
+            [cls.breakfast],
+        )
+        cls.pasta = create_recipe(
+            cls.carol, 'Паста', {cls.flour: 300, cls.egg: 3}, [cls.dinner],
+        )
+        cls.toast = create_recipe(
+            cls.alice, 'Гренки', {cls.milk: 100, cls.egg: 1},
+        )
+
+        Subscription.objects.create(user=cls.alice, author=cls.bob)
+        Subscription.objects.create(user=cls.alice, author=cls.carol)
+        Subscription.objects.create(user=cls.bob, author=cls.carol)
+        cls.pancakes.is_favorited.add(cls.alice)
+        ShoppingCart.objects.create(user=cls.alice, recipe=cls.pasta)
+
+    def client_for(self, user) -> APIClient:
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
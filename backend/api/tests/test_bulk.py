@@ -0,0 +1,72 @@
+"""
+Импорт рецептов из NDJSON (`api/bulk.py`).
+"""
+import base64
+import json
+import tempfile
+from io import BytesIO
+from pathlib import Path
+from unittest import mock
+
+from django.db import IntegrityError
+from django.test import override_settings
+from PIL import Image
+
+from api.bulk import RecipeImporter
+from api.tests.base import CatalogTestCase
+from food.models import Recipe, RecipeIngredient
+
+
+def image_uri() -> str:
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8)).save(buffer, format='PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+def recipe_line(name: str) -> str:
+    return json.dumps({
+        'name': name,
+        'text': 'Смешать и запечь.',
+        'cooking_time': 20,
+        'image': image_uri(),
+        'tags': ['breakfast'],
+        'ingredients': [{'name': 'яйцо', 'amount': 2}],
+    })
+
+
+class ImportTest(CatalogTestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media = Path(media.name)
+        enabled = override_settings(MEDIA_ROOT=media.name)
+        enabled.enable()
+        self.addCleanup(enabled.disable)
+
+    def images(self) -> list[Path]:
+        return [path for path in self.media.rglob('*') if path.is_file()]
+
+    def test_import(self):
+        report = RecipeImporter(self.alice).run(
+            [recipe_line('Запеканка'), recipe_line('Кекс')]
+        )
+        self.assertEqual((report.created, report.failed), (2, 0))
+        self.assertEqual(
+            Recipe.objects.filter(name__in=['Запеканка', 'Кекс']).count(), 2
+        )
+        self.assertEqual(len(self.images()), 2)
+
+    def test_failed_batch_deletes_images(self):
+        with mock.patch.object(
+            RecipeIngredient.objects, 'bulk_create',
+            side_effect=IntegrityError('duplicate key'),
+        ):
+            report = RecipeImporter(self.alice).run(
+                [recipe_line('Запеканка'), recipe_line('Кекс')]
+            )
+        self.assertEqual((report.created, report.failed), (0, 2))
+        self.assertFalse(Recipe.objects.filter(name='Запеканка').exists())
+        self.assertEqual(self.images(), [])
@@ -0,0 +1,56 @@
+"""
+Счётчики рецептов и подписчиков автора (`api/counters.py`).
+"""
+from api import counters
+from api.tests.base import CatalogTestCase, create_recipe
+from users.models import User
+
+
+class CountersTest(CatalogTestCase):
+
+    def counts(self, user) -> tuple[int, int]:
+        user.refresh_from_db(fields=('recipes_count', 'subscribers_count'))
+        return user.recipes_count, user.subscribers_count
+
+    def test_initial(self):
+        self.assertEqual(self.counts(self.alice), (1, 0))
+        self.assertEqual(self.counts(self.bob), (2, 1))
+        self.assertEqual(self.counts(self.carol), (2, 2))
+
+    def test_recipes(self):
+        recipe = create_recipe(self.alice, 'Суп', {self.salt: 1})
+        self.assertEqual(self.counts(self.alice), (2, 0))
+        recipe.delete()
+        self.assertEqual(self.counts(self.alice), (1, 0))
+
+    def test_recipe_moved_to_another_author(self):
+        self.toast.author = self.bob
+        self.toast.save()
+        self.assertEqual(self.counts(self.alice), (0, 0))
+        self.assertEqual(self.counts(self.bob), (3, 1))
+
+    def test_subscriptions_through_api(self):
+        client = self.client_for(self.bob)
+        url = f'/api/users/{self.alice.pk}/subscribe/'
+        self.assertEqual(client.post(url).status_code, 201)
+        self.assertEqual(self.counts(self.alice), (1, 1))
+        self.assertEqual(client.delete(url).status_code, 204)
+        self.assertEqual(self.counts(self.alice), (1, 0))
+
+    def test_shown_in_profile(self):
+        data = self.client.get(f'/api/users/{self.carol.pk}/').json()
+        self.assertEqual(
+            (data['recipes_count'], data['subscribers_count']), (2, 2)
+        )
+
+    def test_not_below_zero(self):
+        counters.add(counters.SUBSCRIBERS, self.alice.pk, -5)
+        self.assertEqual(self.counts(self.alice), (1, 0))
+
+    def test_recount(self):
+        User.objects.filter(pk=self.bob.pk).update(
+            recipes_count=10, subscribers_count=0
+        )
+        self.assertEqual(counters.recount(), 1)
+        self.assertEqual(self.counts(self.bob), (2, 1))
+        self.assertEqual(counters.recount(), 0)
@@ -0,0 +1,110 @@
+"""
+Лента подписок: раскладка рецептов (`feed.fan_out`, `feed.backfill`),
+чтение популярных авторов напрямую и листание курсором.
+"""
+from django.core.cache import cache
+from django.test import override_settings
+
+from api.feed import decode_cursor, encode_cursor, feed_page
+from api.tests.base import CatalogTestCase, create_recipe, run_jobs
+from food.models import TimelineEntry
+from users.models import Subscription
+
+FEED_URL = '/api/recipes/feed/'
+FEED_TASKS = ('feed.fan_out', 'feed.backfill', 'feed.materialize')
+
+
+class FeedTest(CatalogTestCase):
+
+    def setUp(self):
+        # Список популярных авторов кешируется и зависит от настроек
+        # теста: раскладка из `setUpTestData` и сам тест считают его заново.
+        cache.clear()
+        run_jobs(*FEED_TASKS)
+        cache.clear()
+
+    def feed_ids(self, user, **params) -> list[int]:
+        response = self.client_for(user).get(FEED_URL, params)
+        self.assertEqual(response.status_code, 200)
+        return [data['id'] for data in response.json()['results']]
+
+    def test_backfill_on_subscribe(self):
+        self.assertEqual(
+            self.feed_ids(self.alice),
+            [self.pasta.pk, self.syrniki.pk, self.omelette.pk,
+             self.pancakes.pk],
+        )
+        self.assertEqual(
+            self.feed_ids(self.bob), [self.pasta.pk, self.syrniki.pk]
+        )
+
+    def test_fan_out_new_recipe(self):
+        soup = create_recipe(self.carol, 'Суп', {self.salt: 1})
+        run_jobs(*FEED_TASKS)
+        self.assertEqual(self.feed_ids(self.bob)[0], soup.pk)
+        self.assertEqual(self.feed_ids(self.alice)[0], soup.pk)
+        self.assertNotIn(soup.pk, self.feed_ids(self.carol))
+
+    def test_unsubscribe_removes_author(self):
+        self.client_for(self.alice).delete(
+            f'/api/users/{self.bob.pk}/subscribe/'
+        )
+        self.assertEqual(
+            self.feed_ids(self.alice), [self.pasta.pk, self.syrniki.pk]
+        )
+
+    def test_cursor_pages(self):
+        client = self.client_for(self.alice)
+        seen, url = [], FEED_URL + '?limit=3'
+        while url:
+            page = client.get(url).json()
+            seen += [data['id'] for data in page['results']]
+            url = page['next']
+        self.assertEqual(seen, self.feed_ids(self.alice, limit=100))
+        self.assertEqual(len(seen), 4)
+
+    @override_settings(FEED_MAX_LIMIT=2)
+    def test_limit_is_clamped(self):
+        self.assertEqual(len(self.feed_ids(self.alice, limit=1000)), 2)
+        self.assertEqual(len(self.feed_ids(self.alice, limit=0)), 1)
+
+    def test_invalid_cursor(self):
+        response = self.client_for(self.alice).get(
+            FEED_URL, {'cursor': 'not-a-cursor'}
+        )
+        self.assertEqual(response.status_code, 400)
+        with self.assertRaises(ValueError):
+            decode_cursor('bm90LWEtY3Vyc29y')
+
+    def test_cursor_round_trip(self):
+        _, cursor = feed_page(self.alice, None, 1)
+        self.assertEqual(decode_cursor(encode_cursor(cursor)), cursor)
+
+    def test_anonymous(self):
+        self.assertEqual(self.client.get(FEED_URL).status_code, 401)
+
+    @override_settings(FEED_FANOUT_MAX_SUBSCRIBERS=1)
+    def test_popular_author_read_directly(self):
+        # У carol два подписчика: её рецепты не раскладываются,
+        # а читаются из таблицы рецептов.
+        soup = create_recipe(self.carol, 'Суп', {self.salt: 1})
+        run_jobs(*FEED_TASKS)
+        self.assertFalse(
+            TimelineEntry.objects.filter(recipe=soup).exists()
+        )
+        self.assertEqual(self.feed_ids(self.bob)[0], soup.pk)
+        ids = self.feed_ids(self.alice, limit=100)
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertIn(soup.pk, ids)
+        self.assertIn(self.pancakes.pk, ids)
+
+    @override_settings(FEED_FANOUT_MAX_SUBSCRIBERS=1)
+    def test_materialize_after_unsubscribe(self):
+        soup = create_recipe(self.carol, 'Суп', {self.salt: 1})
+        run_jobs(*FEED_TASKS)
+        Subscription.objects.get(user=self.alice, author=self.carol).delete()
+        cache.clear()
+        run_jobs(*FEED_TASKS)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.bob, recipe=soup).exists()
+        )
@@ -0,0 +1,116 @@
+"""
+Подбор рецептов по ингредиентам (`api/pantry.py`) и эндпоинт
+/api/recipes/pantry/.
+"""
+from api.pantry import PantryIndex, pantry_index
+from api.tests.base import CatalogTestCase
+from food.models import RecipeIngredient
+
+PANTRY_URL = '/api/recipes/pantry/'
+
+
+class PantryIndexTest(CatalogTestCase):
+
+    def setUp(self):
+        self.index = PantryIndex()
+        self.index.build()
+
+    def ranking(self, ingredients, max_missing=None):
+        match = self.index.match(
+            [ingredient.pk for ingredient in ingredients], max_missing
+        )
+        return list(zip(
+            match.recipe_ids.tolist(),
+            match.matched.tolist(),
+            match.missing.tolist(),
+        ))
+
+    def test_ranking(self):
+        self.assertEqual(
+            self.ranking([self.egg, self.milk, self.salt]),
+            [
+                (self.omelette.pk, 3, 0),
+                (self.toast.pk, 2, 0),
+                (self.pancakes.pk, 3, 1),
+                (self.pasta.pk, 1, 1),
+                (self.syrniki.pk, 1, 2),
+            ],
+        )
+
+    def test_max_missing(self):
+        self.assertEqual(
+            [pk for pk, _, _ in self.ranking(
+                [self.egg, self.milk, self.salt], max_missing=0
+            )],
+            [self.omelette.pk, self.toast.pk],
+        )
+
+    def test_unknown_and_repeated_ingredients(self):
+        self.assertEqual(
+            self.ranking([self.cheese, self.cheese]),
+            [(self.syrniki.pk, 1, 2)],
+        )
+        self.assertEqual(len(self.index.match([10 ** 9])), 0)
+
+    def test_changed_recipe_in_delta(self):
+        RecipeIngredient.objects.create(
+            recipe=self.toast, ingredient=self.salt, amount=1
+        )
+        self.index.apply([self.toast.pk])
+        self.assertEqual(
+            self.ranking([self.egg, self.milk, self.salt])[:2],
+            [(self.toast.pk, 3, 0), (self.omelette.pk, 3, 0)],
+        )
+
+    def test_deleted_recipe_in_delta(self):
+        pk = self.pasta.pk
+        self.pasta.delete()
+        self.index.apply([pk])
+        self.assertNotIn(
+            pk, [found for found, _, _ in self.ranking([self.flour])]
+        )
+
+
+class PantryViewTest(CatalogTestCase):
+
+    def setUp(self):
+        pantry_index.build()
+
+    def test_results(self):
+        response = self.client.get(PANTRY_URL, {
+            'ingredients': f'{self.egg.pk},{self.milk.pk}',
+            'max_missing': 1,
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(
+            [
+                (recipe['id'], recipe['matched_count'],
+                 recipe['missing_count'])
+                for recipe in data['results']
+            ],
+            [
+                (self.toast.pk, 2, 0),
+                (self.omelette.pk, 2, 1),
+                (self.pasta.pk, 1, 1),
+            ],
+        )
+
+    def test_repeated_parameter(self):
+        response = self.client.get(
+            f'{PANTRY_URL}?ingredients={self.cheese.pk}'
+            f'&ingredients={self.flour.pk}&limit=1'
+        )
+        data = response.json()
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(data['results'][0]['id'], self.syrniki.pk)
+
+    def test_invalid(self):
+        for params in ({}, {'ingredients': 'egg'}, {
+            'ingredients': self.egg.pk, 'max_missing': 'many',
+        }):
+            with self.subTest(params=params):
+                self.assertEqual(
+                    self.client.get(PANTRY_URL, params).status_code, 400
+                )
@@ -0,0 +1,59 @@
+"""
+Список рецептов по популярности (`?ordering=popular`).
+"""
+from unittest import mock
+
+from api.pagination import PopularityPagination
+from api.tests.base import CatalogTestCase
+from food.models import Recipe
+
+RECIPES_URL = '/api/recipes/'
+POPULAR = {'ordering': 'popular'}
+
+
+class PopularListTest(CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for recipe, popularity in (
+            (cls.pancakes, 3.0), (cls.omelette, 1.0), (cls.syrniki, 3.0),
+            (cls.pasta, 0.5), (cls.toast, 0),
+        ):
+            Recipe.objects.filter(pk=recipe.pk).update(popularity=popularity)
+
+    def test_order_and_cursor(self):
+        seen, url = [], RECIPES_URL + '?ordering=popular&limit=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            self.assertEqual(set(page), {'next', 'results'})
+            seen += [data['id'] for data in page['results']]
+            url = page['next']
+        self.assertEqual(seen, [
+            self.syrniki.pk, self.pancakes.pk, self.omelette.pk,
+            self.pasta.pk, self.toast.pk,
+        ])
+
+    def test_filters_apply(self):
+        response = self.client.get(
+            RECIPES_URL, {**POPULAR, 'author': self.bob.pk}
+        )
+        self.assertEqual(
+            [data['id'] for data in response.json()['results']],
+            [self.pancakes.pk, self.omelette.pk],
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            RECIPES_URL, {**POPULAR, 'cursor': 'broken'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'cursor': 'Некорректный курсор.'})
+
+    @mock.patch.object(PopularityPagination, 'max_page_size', 2)
+    def test_limit_is_clamped(self):
+        response = self.client.get(RECIPES_URL, {**POPULAR, 'limit': 1000})
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertIsNotNone(response.json()['next'])
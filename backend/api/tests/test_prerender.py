@@ -0,0 +1,58 @@
+"""
+Готовые страницы API для nginx (`api/prerender.py`).
+"""
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from PIL import Image
+
+from api.prerender import RECIPES, TAGS, prerender
+from api.tests.base import CatalogTestCase
+from config.images import ensure_derivatives
+from jobs.models import Job
+
+
+class PrerenderTest(CatalogTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        enabled = override_settings(
+            PRERENDER_API=True, PRERENDER_ROOT=self.root
+        )
+        enabled.enable()
+        self.addCleanup(enabled.disable)
+        Job.objects.filter(task='prerender.api').delete()
+
+    def files(self) -> set[str]:
+        return {path.name for path in (self.root / 'api/tags').iterdir()}
+
+    def test_brotli_disabled_by_default(self):
+        prerender([TAGS])
+        self.assertEqual(self.files(), {'_.json', '_.json.gz'})
+
+    def test_brotli_copies_removed_when_disabled(self):
+        with override_settings(PRERENDER_BROTLI=True):
+            prerender([TAGS])
+        self.assertIn('_.json.br', self.files())
+        stats = prerender([TAGS])
+        self.assertEqual(self.files(), {'_.json', '_.json.gz'})
+        self.assertEqual(stats['removed'], 1)
+
+    def test_derivatives_schedule_prerender(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        buffer = BytesIO()
+        Image.new('RGB', (400, 300)).save(buffer, format='PNG')
+        with override_settings(MEDIA_ROOT=media.name):
+            name = default_storage.save(
+                'food/recipes/photo.png', ContentFile(buffer.getvalue())
+            )
+            ensure_derivatives(name)
+        job = Job.objects.get(task='prerender.api')
+        self.assertEqual(job.payload, {'groups': [RECIPES]})
@@ -0,0 +1,87 @@
+"""
+Ответы быстрого чтения (`api/readers.py`, `ORJSONRenderer`) совпадают
+побайтно с ответами сериализаторов DRF и `JSONRenderer`.
+"""
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.readers import (
+    parse_recipes_limit, read_ingredients, read_recipes, read_subscriptions,
+)
+from api.renderers import ORJSONRenderer
+from api.serializers import (
+    IngredientSerializer, RecipeSerializer, SubscriptionSerializer,
+)
+from api.tests.base import CatalogTestCase
+from food.models import Ingredient, Recipe
+from users.models import Subscription
+
+
+class ReadersTest(CatalogTestCase):
+
+    def request(self, user, **params) -> Request:
+        request = Request(APIRequestFactory().get('/', params))
+        request.user = user
+        return request
+
+    def assertSameJSON(self, expected, actual):
+        self.assertEqual(
+            JSONRenderer().render(expected), ORJSONRenderer().render(actual)
+        )
+
+    def test_recipe_list(self):
+        recipes = list(Recipe.objects.all())
+        for user in (AnonymousUser(), self.alice, self.bob):
+            with self.subTest(user=user):
+                request = self.request(user)
+                self.assertSameJSON(
+                    RecipeSerializer(
+                        recipes, many=True, context={'request': request}
+                    ).data,
+                    read_recipes(request, [recipe.pk for recipe in recipes]),
+                )
+
+    def test_recipe_detail(self):
+        request = self.request(self.alice)
+        for pk in (self.pancakes.pk, self.pasta.pk, self.toast.pk):
+            recipe = Recipe.objects.get(pk=pk)
+            with self.subTest(recipe=recipe.name):
+                self.assertSameJSON(
+                    RecipeSerializer(
+                        recipe, context={'request': request}
+                    ).data,
+                    read_recipes(request, [recipe.pk])[0],
+                )
+
+    def test_recipe_order_follows_ids(self):
+        ids = [self.toast.pk, self.pancakes.pk, self.pasta.pk]
+        results = read_recipes(self.request(AnonymousUser()), ids)
+        self.assertEqual([data['id'] for data in results], ids)
+
+    def test_subscriptions(self):
+        subscriptions = Subscription.objects.filter(user=self.alice)
+        for recipes_limit in ('', '1', '0'):
+            with self.subTest(recipes_limit=recipes_limit):
+                request = self.request(
+                    self.alice, recipes_limit=recipes_limit
+                )
+                self.assertSameJSON(
+                    SubscriptionSerializer(
+                        subscriptions, many=True,
+                        context={'request': request},
+                    ).data,
+                    read_subscriptions(
+                        request,
+                        subscriptions.values_list('author_id', flat=True),
+                        parse_recipes_limit(recipes_limit),
+                    ),
+                )
+
+    def test_ingredients(self):
+        ingredients = Ingredient.objects.all()
+        self.assertSameJSON(
+            IngredientSerializer(ingredients, many=True).data,
+            read_ingredients(ingredients),
+        )
@@ -0,0 +1,61 @@
+"""
+Похожие рецепты: полный пересчёт, обновление после изменения рецепта
+и эндпоинт /api/recipes/{id}/similar/.
+"""
+from api import similar
+from api.tests.base import CatalogTestCase, create_recipe, run_jobs
+from food.models import SimilarRecipe
+
+
+class SimilarTest(CatalogTestCase):
+
+    def setUp(self):
+        similar._index = None
+        similar.build_all()
+
+    def similar_ids(self, recipe) -> list[int]:
+        response = self.client.get(f'/api/recipes/{recipe.pk}/similar/')
+        self.assertEqual(response.status_code, 200)
+        return [data['id'] for data in response.json()]
+
+    def test_nearest_first(self):
+        self.assertEqual(self.similar_ids(self.omelette)[0], self.pancakes.pk)
+        self.assertEqual(self.similar_ids(self.pancakes)[0], self.omelette.pk)
+
+    def test_only_recipes_with_common_features(self):
+        soup = create_recipe(self.alice, 'Суп', {self.salt: 1})
+        lonely = create_recipe(self.alice, 'Чай', {})
+        similar.build_all()
+        self.assertEqual(self.similar_ids(lonely), [])
+        self.assertEqual(
+            set(self.similar_ids(soup)), {self.pancakes.pk, self.omelette.pk}
+        )
+
+    def test_ranks_and_scores(self):
+        rows = list(
+            SimilarRecipe.objects.filter(recipe=self.omelette)
+            .order_by('rank').values_list('rank', 'score')
+        )
+        self.assertEqual(
+            [rank for rank, _ in rows], list(range(1, len(rows) + 1))
+        )
+        scores = [score for _, score in rows]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertTrue(all(0 < score <= 1 + 1e-9 for score in scores))
+
+    def test_update_after_change(self):
+        twin = create_recipe(
+            self.alice, 'Омлет с молоком',
+            {self.egg: 2, self.milk: 100, self.salt: 1},
+            [self.breakfast, self.dinner],
+        )
+        self.assertEqual(self.similar_ids(twin), [])
+        run_jobs('similar.update')
+        self.assertEqual(self.similar_ids(twin)[0], self.omelette.pk)
+        self.assertEqual(self.similar_ids(self.omelette)[0], twin.pk)
+
+    def test_not_found(self):
+        for pk in ('abc', '999999'):
+            with self.subTest(pk=pk):
+                response = self.client.get(f'/api/recipes/{pk}/similar/')
+                self.assertEqual(response.status_code, 404)
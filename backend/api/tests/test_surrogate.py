@@ -0,0 +1,63 @@
+"""
+Сброс ответов по суррогатным ключам (`api/surrogate.py`).
+"""
+import tempfile
+from pathlib import Path
+
+from django.test import override_settings
+
+from api import surrogate
+from api.surrogate import FilePurgeBackend, get_purge_backend, schedule_purge
+from api.tests.base import CatalogTestCase, run_jobs
+from food.models import Tag
+from jobs.models import Job
+
+MEMORY_BACKEND = 'api.surrogate.MemoryPurgeBackend'
+
+
+@override_settings(SURROGATE_PURGE_BACKEND=MEMORY_BACKEND)
+class PurgeTest(CatalogTestCase):
+
+    def setUp(self):
+        surrogate._backends.clear()
+        Job.objects.filter(task='surrogate.purge').delete()
+
+    def purged(self) -> list[list[str]]:
+        run_jobs('surrogate.purge')
+        return get_purge_backend().purged
+
+    def test_tag_change(self):
+        self.breakfast.name = 'Поздний завтрак'
+        self.breakfast.save()
+        self.assertEqual(
+            self.purged(), [sorted([f'tag-{self.breakfast.pk}', 'tags'])]
+        )
+
+    def test_subscription_purges_author(self):
+        self.client_for(self.bob).post(
+            f'/api/users/{self.alice.pk}/subscribe/'
+        )
+        self.assertIn([f'author-{self.alice.pk}'], self.purged())
+
+    def test_same_keys_queued_once(self):
+        schedule_purge('recipe-1', 'recipes')
+        schedule_purge('recipes', 'recipe-1', 'recipe-1')
+        self.assertEqual(
+            Job.objects.filter(task='surrogate.purge').count(), 1
+        )
+        self.assertEqual(self.purged(), [['recipe-1', 'recipes']])
+
+    @override_settings(SURROGATE_PURGE_BACKEND='')
+    def test_disabled(self):
+        Tag.objects.create(name='Обед', slug='lunch')
+        self.assertFalse(Job.objects.filter(task='surrogate.purge').exists())
+
+    def test_file_backend(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'purge.log'
+            backend = FilePurgeBackend(str(path))
+            backend.purge(['tags', 'tag-2'])
+            backend.purge(['recipes'])
+            self.assertEqual(
+                path.read_text(encoding='utf-8'), 'tag-2 tags\nrecipes\n'
+            )
@@ -0,0 +1,128 @@
+"""
+Корзины жетонов в общей памяти (`api/throttling.py`).
+"""
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import RequestFactory, SimpleTestCase
+
+from api import throttling
+from api.throttling import PROBES, BucketTable, TokenBucketThrottle
+
+
+class Clock:
+    """Подменяет `time.monotonic` в модуле корзин."""
+
+    def __init__(self, test, now: float = 1000.0) -> None:
+        self.now = now
+        patcher = mock.patch.object(
+            throttling.time, 'monotonic', lambda: self.now
+        )
+        patcher.start()
+        test.addCleanup(patcher.stop)
+
+
+class BucketTableTest(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = str(Path(directory.name) / 'throttle')
+        self.clock = Clock(self)
+
+    def table(self, slots: int = 64) -> BucketTable:
+        return BucketTable(self.path, slots)
+
+    def test_burst_then_wait(self):
+        table = self.table()
+        waits = [table.consume('client', 3, 1.0) for _ in range(4)]
+        self.assertEqual(waits[:3], [0, 0, 0])
+        self.assertAlmostEqual(waits[3], 1.0)
+
+    def test_refill(self):
+        table = self.table()
+        for _ in range(3):
+            table.consume('client', 3, 0.5)
+        self.assertGreater(table.consume('client', 3, 0.5), 0)
+        self.clock.now += 2
+        self.assertEqual(table.consume('client', 3, 0.5), 0)
+        self.assertGreater(table.consume('client', 3, 0.5), 0)
+
+    def test_keys_are_independent(self):
+        table = self.table()
+        table.consume('first', 1, 1.0)
+        self.assertGreater(table.consume('first', 1, 1.0), 0)
+        self.assertEqual(table.consume('second', 1, 1.0), 0)
+
+    def test_shared_between_processes(self):
+        # Второй экземпляр на том же файле - как другой воркер.
+        first, second = self.table(), self.table()
+        first.consume('client', 2, 1.0)
+        first.consume('client', 2, 1.0)
+        self.assertGreater(second.consume('client', 2, 1.0), 0)
+
+    def test_full_window_evicts_earliest_refill(self):
+        # Одна ячейка-окно: все ключи попадают в одни PROBES ячеек.
+        table = self.table(slots=1)
+        for number in range(PROBES):
+            table.consume(f'key-{number}', 1, 1.0 / (number + 1))
+        # Новый ключ занимает ячейку key-0, восстанавливающуюся быстрее.
+        self.assertEqual(table.consume('newcomer', 1, 1.0), 0)
+        self.assertEqual(table.consume('key-0', 1, 1.0), 0)
+        self.assertGreater(table.consume(f'key-{PROBES - 1}', 1, 1.0), 0)
+
+
+class Throttle(TokenBucketThrottle):
+    rate = '2/min'
+
+    def get_cache_key(self, request, view):
+        return self.get_ident(request)
+
+
+class TokenBucketThrottleTest(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        table = BucketTable(str(Path(directory.name) / 'throttle'), 64)
+        patcher = mock.patch.object(throttling, 'get_table', lambda: table)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        Clock(self)
+        self.factory = RequestFactory()
+
+    def request(self, client_ip: str):
+        return self.factory.get(
+            '/', REMOTE_ADDR='172.18.0.2',
+            HTTP_X_FORWARDED_FOR=f'{client_ip}, 172.18.0.1',
+        )
+
+    @mock.patch.object(throttling.api_settings, 'NUM_PROXIES', 2)
+    def test_limit_per_client(self):
+        throttle = Throttle()
+        allowed = [
+            throttle.allow_request(self.request('203.0.113.7'), None)
+            for _ in range(3)
+        ]
+        self.assertEqual(allowed, [True, True, False])
+        self.assertAlmostEqual(throttle.wait(), 30.0)
+        self.assertTrue(
+            Throttle().allow_request(self.request('203.0.113.8'), None)
+        )
+
+    @mock.patch.object(throttling, '_hops_warned', False)
+    def test_warns_once_when_hops_are_missing(self):
+        request = self.factory.get('/', REMOTE_ADDR='172.18.0.2')
+        with self.assertLogs(throttling.logger, 'WARNING') as logs:
+            throttling.check_forwarded_hops(request, 2)
+            throttling.check_forwarded_hops(request, 2)
+        self.assertEqual(len(logs.records), 1)
+
+    @mock.patch.object(throttling, '_hops_warned', False)
+    def test_no_warning_with_full_chain(self):
+        with self.assertNoLogs(throttling.logger, 'WARNING'):
+            throttling.check_forwarded_hops(self.request('203.0.113.7'), 2)
+            throttling.check_forwarded_hops(
+                self.factory.get('/', REMOTE_ADDR='8.8.8.8'), 2
+            )
@@ -0,0 +1,208 @@
+"""
+Ограничение частоты запросов корзинами жетонов в общей памяти.
+
+Состояние корзин хранится в файле `THROTTLE_FILE`, отображённом
+в память (`mmap`) всеми воркерами узла, поэтому лимит общий для них
+и не требует обращения к кешу. По умолчанию файл лежит в `/dev/shm`
+и не пишется на диск.
+
+Файл - хеш-таблица из `THROTTLE_SLOTS` ячеек `(хеш ключа, жетоны,
+время обновления, время полного восстановления)`. Ключ ищется
+в окне из `PROBES` соседних ячеек; если его нет, занимается ячейка
+с уже восстановившейся корзиной (она неотличима от новой), а при её
+отсутствии - ячейка, которая восстановится раньше всех. Окно
+блокируется `fcntl.lockf` между процессами и `threading.Lock` между
+потоками одного процесса, проверка занимает единицы микросекунд.
+
+Лимиты задаются как в DRF, `DEFAULT_THROTTLE_RATES`: `'120/min'` -
+корзина на 120 жетонов, пополняется на 120 в минуту равномерно.
+
+Анонимный клиент определяется по X-Forwarded-For с учётом
+`THROTTLE_NUM_PROXIES`. Если прокси передал меньше адресов, чем
+ожидается, ключом становится адрес прокси и все клиенты делят одну
+корзину - об этом процесс один раз пишет предупреждение в лог.
+"""
+import fcntl
+import hashlib
+import ipaddress
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import (
+    AnonRateThrottle, ScopedRateThrottle, SimpleRateThrottle, UserRateThrottle,
+)
+
+logger = logging.getLogger(__name__)
+
+SHOPPING_CART: str = 'shopping_cart'
+
+PROBES: int = 8
+# Хеш ключа, жетоны, время обновления, время полного восстановления.
+SLOT = struct.Struct('<Qddd')
+
+
+def key_hash(key: str) -> int:
+    """64-битный хеш ключа, 0 означает пустую ячейку."""
+    value = int.from_bytes(
+        hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little'
+    )
+    return value or 1
+
+
+class BucketTable:
+    """Таблица корзин жетонов в файле, отображённом в память."""
+
+    def __init__(self, path: str, slots: int) -> None:
+        self.slots = slots
+        size = (slots + PROBES - 1) * SLOT.size
+        self.descriptor = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self.descriptor).st_size < size:
+            os.ftruncate(self.descriptor, size)
+        self.map = mmap.mmap(self.descriptor, size)
+        self.thread_lock = threading.Lock()
+
+    def consume(self, key: str, capacity: int, rate: float) -> float:
+        """Берёт жетон из корзины ключа.
+
+        Возвращает 0, если жетон был, иначе - сколько секунд ждать
+        следующего.
+        """
+        hashed = key_hash(key)
+        start = (hashed % self.slots) * SLOT.size
+        length = PROBES * SLOT.size
+        now = time.monotonic()
+        with self.thread_lock:
+            fcntl.lockf(self.descriptor, fcntl.LOCK_EX, length, start)
+            try:
+                found = self._find(hashed, start)
+                if found is None:
+                    offset = self._free_slot(start, now)
+                    tokens, updated = capacity, now
+                else:
+                    offset, tokens, updated = found
+                tokens = min(
+                    capacity, tokens + max(now - updated, 0.0) * rate
+                )
+                if tokens >= 1:
+                    tokens -= 1
+                    wait = 0.0
+                else:
+                    wait = (1 - tokens) / rate
+                SLOT.pack_into(
+                    self.map, offset,
+                    hashed, tokens, now, now + (capacity - tokens) / rate,
+                )
+            finally:
+                fcntl.lockf(self.descriptor, fcntl.LOCK_UN, length, start)
+        return wait
+
+    def _find(self, hashed: int, start: int):
+        """Смещение, жетоны и время обновления корзины ключа или None."""
+        for offset in range(start, start + PROBES * SLOT.size, SLOT.size):
+            stored, tokens, updated, _ = SLOT.unpack_from(self.map, offset)
+            if stored == hashed:
+                return offset, tokens, updated
+        return None
+
+    def _free_slot(self, start: int, now: float) -> int:
+        """Ячейка для нового ключа: свободная или восстановившаяся раньше.
+        """
+        best, best_full_at = start, None
+        for offset in range(start, start + PROBES * SLOT.size, SLOT.size):
+            stored, _, _, full_at = SLOT.unpack_from(self.map, offset)
+            if stored == 0 or full_at <= now:
+                return offset
+            if best_full_at is None or full_at < best_full_at:
+                best, best_full_at = offset, full_at
+        return best
+
+
+_table: Optional[BucketTable] = None
+_table_lock = threading.Lock()
+
+
+def get_table() -> BucketTable:
+    """Таблица корзин процесса, открывается при первом запросе."""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = BucketTable(
+                    settings.THROTTLE_FILE, settings.THROTTLE_SLOTS
+                )
+    return _table
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """`SimpleRateThrottle` с корзиной жетонов в общей памяти.
+
+    Разрешает всплеск до `num_requests` запросов, дальше - не чаще
+    `num_requests / duration` в секунду. Ключи и лимиты те же,
+    что у стандартных классов DRF.
+    """
+
+    def allow_request(self, request, view) -> bool:
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.wait_time = get_table().consume(
+            self.key, self.num_requests, self.num_requests / self.duration
+        )
+        return self.wait_time == 0
+
+    def wait(self) -> float:
+        return self.wait_time
+
+    def get_ident(self, request) -> str:
+        check_forwarded_hops(request, api_settings.NUM_PROXIES)
+        return super().get_ident(request)
+
+
+_hops_warned = False
+
+
+def check_forwarded_hops(request, num_proxies: Optional[int]) -> None:
+    """Предупреждает, если клиентский IP подменён адресом прокси.
+
+    Признак: запрос пришёл с частного адреса (прокси в docker-сети),
+    а в X-Forwarded-For меньше адресов, чем `THROTTLE_NUM_PROXIES`.
+    """
+    global _hops_warned
+    if _hops_warned or not num_proxies:
+        return
+    remote_addr = request.META.get('REMOTE_ADDR', '')
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    hops = len(forwarded.split(',')) if forwarded else 0
+    try:
+        private = ipaddress.ip_address(remote_addr).is_private
+    except ValueError:
+        return
+    if private and hops < num_proxies:
+        _hops_warned = True
+        logger.warning(
+            f'X-Forwarded-For содержит {hops} адрес(ов) при '
+            f'THROTTLE_NUM_PROXIES={num_proxies}: анонимные клиенты '
+            f'делят одну корзину. Передайте X-Forwarded-For во внешнем '
+            f'прокси или уменьшите THROTTLE_NUM_PROXIES.'
+        )
+
+
+class AnonBucketThrottle(AnonRateThrottle, TokenBucketThrottle):
+    """Анонимные запросы, ключ - IP-адрес, лимит `anon`."""
+
+
+class UserBucketThrottle(UserRateThrottle, TokenBucketThrottle):
+    """Запросы с токеном, ключ - id пользователя, лимит `user`."""
+
+
+class ScopedBucketThrottle(ScopedRateThrottle, TokenBucketThrottle):
+    """Отдельный лимит представлений с `throttle_scope`."""
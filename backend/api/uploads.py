@@ -0,0 +1,161 @@
+"""
+Содержит инструменты для потоковой обработки загружаемых изображений.
+
+Base64-строка декодируется порциями во временный файл, поэтому в памяти
+одновременно находится только одна порция декодированных данных.
+Ограничения на размер и разрешение изображения проверяются как можно раньше:
+размер - по мере декодирования, разрешение - по заголовку файла,
+без полного декодирования пикселей.
+"""
+import binascii
+import hashlib
+import string
+from typing import IO, Optional
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from PIL import Image, UnidentifiedImageError
+from rest_framework import serializers
+
+# Кратно 4, чтобы каждая порция декодировалась независимо.
+BASE64_CHUNK_SIZE: int = 64 * 1024
+# Сколько первых байт файла достаточно для чтения заголовка изображения.
+IMAGE_HEADER_PROBE_SIZE: int = 256 * 1024
+
+_WHITESPACE_TABLE = str.maketrans('', '', string.whitespace)
+
+
+class Base64UploadedFile(TemporaryUploadedFile):
+    """Временный файл с декодированным изображением.
+
+    В отличие от файлов multipart-запроса, такой файл не регистрируется
+    в запросе, и Django не закрывает его после ответа. Поэтому файл
+    закрывается при удалении объекта: если хранилище уже переместило его,
+    `close()` подавляет ошибку удаления.
+    """
+
+    def __del__(self):
+        self.close()
+
+
+def read_image_size(file: IO[bytes]) -> Optional[tuple[int, int]]:
+    """Возвращает разрешение изображения, прочитав только его заголовок.
+
+    Если заголовок не удалось распознать (например, файл записан
+    не полностью), возвращает None. Позиция в файле сохраняется.
+    """
+    position = file.tell()
+    file.seek(0)
+    try:
+        with Image.open(file) as image:
+            return image.size
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError):
+        return None
+    finally:
+        file.seek(position)
+
+
+def check_image_size(size: int) -> None:
+    """Проверяет, что размер файла не превышает допустимый."""
+    if size > settings.IMAGE_MAX_UPLOAD_SIZE:
+        raise serializers.ValidationError(
+            'Размер изображения не должен превышать '
+            f'{settings.IMAGE_MAX_UPLOAD_SIZE // 1024} КБ.'
+        )
+
+
+def check_image_dimensions(dimensions: Optional[tuple[int, int]]) -> None:
+    """Проверяет, что разрешение изображения не превышает допустимое."""
+    if dimensions is None:
+        return
+    if max(dimensions) > settings.IMAGE_MAX_DIMENSION:
+        raise serializers.ValidationError(
+            'Разрешение изображения не должно превышать '
+            f'{settings.IMAGE_MAX_DIMENSION} пикселей по большей стороне.'
+        )
+
+
+def check_uploaded_image(file: UploadedFile) -> None:
+    """Проверяет ограничения для файла, загруженного через multipart."""
+    check_image_size(file.size or 0)
+    check_image_dimensions(read_image_size(file))
+
+
+def decode_base64_image(data: str, name: str, content_type: str):
+    """Декодирует base64-строку порциями во временный файл.
+
+    Размер проверяется после каждой порции, разрешение - как только
+    записанных данных хватает для чтения заголовка изображения.
+
+    Returns:
+        Объект `Base64UploadedFile`, готовый к передаче в `ImageField`.
+    """
+    upload = Base64UploadedFile(name, content_type, 0, None)
+    written = 0
+    dimensions = None
+    remainder = ''
+    try:
+        for start in range(0, len(data), BASE64_CHUNK_SIZE):
+            chunk = remainder + data[
+                start:start + BASE64_CHUNK_SIZE
+            ].translate(_WHITESPACE_TABLE)
+            usable = len(chunk) - len(chunk) % 4
+            chunk, remainder = chunk[:usable], chunk[usable:]
+            if not chunk:
+                continue
+
+            decoded = binascii.a2b_base64(chunk)
+            written += len(decoded)
+            check_image_size(written)
+            upload.write(decoded)
+
+            if dimensions is None and written <= IMAGE_HEADER_PROBE_SIZE:
+                upload.flush()
+                dimensions = read_image_size(upload.file)
+                check_image_dimensions(dimensions)
+
+        if remainder:
+            raise binascii.Error('Incorrect padding')
+        if not written:
+            raise serializers.ValidationError(
+                'Изображение не может быть пустым.'
+            )
+        upload.flush()
+        if dimensions is None:
+            check_image_dimensions(read_image_size(upload.file))
+    except binascii.Error:
+        upload.close()
+        raise serializers.ValidationError(
+            'Некорректные данные base64. Проверьте входные данные.'
+        )
+    except serializers.ValidationError:
+        upload.close()
+        raise
+
+    upload.seek(0)
+    upload.size = written
+    return upload
+
+
+def file_digest(file: File) -> str:
+    """Считает SHA-256 содержимого файла, читая его порциями."""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def is_same_image(current, upload: File) -> bool:
+    """Проверяет, совпадает ли загруженный файл с сохранённым изображением.
+
+    Содержимое сравнивается, только если совпадают размеры файлов.
+    """
+    if not current or not current.storage.exists(current.name):
+        return False
+    if current.size != upload.size:
+        return False
+    with current.storage.open(current.name, 'rb') as stored:
+        return file_digest(stored) == file_digest(upload)
@@ -1,36 +1,56 @@
 """
 Хранит представления, используемые для работы API.
 """
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.http import HttpResponse
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.serializers import UserCreateSerializer
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import (
-    AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly,
+    AllowAny, IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly,
 )
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
+from api import surrogate
+from api.bulk import NDJSON_CONTENT_TYPE, RecipeImporter, export_lines
+from api.feed import decode_cursor, encode_cursor, feed_page
 from api.filters import IngredientFilter, RecipeFilter
-from api.pagination import CustomPageNumberPagination
+from api.mixins import ReplicaReadMixin, SurrogateKeyMixin
+from api.pagination import (
+    CustomPageNumberPagination, PopularityPagination, is_popular_ordering,
+)
+from api.pantry import pantry_index
+from api.parsers import MultiPartJSONParser
+from api.readers import (
+    parse_recipes_limit, read_ingredients, read_recipes, read_subscriptions,
+)
 from api.serializers import (
     CreateRecipeSerializer, CustomUserReadSerializer, IngredientSerializer,
     RecipeSerializer, SubscriptionCreateSerializer, SubscriptionSerializer,
     TagSerializer,
 )
-from food.models import Ingredient, Recipe, RecipeIngredient, Tag
-from users.models import Subscription
+from api.throttling import SHOPPING_CART
+from food.models import (
+    Ingredient, Recipe, RecipeIngredient, SimilarRecipe, Tag,
+)
+from users.models import COUNTER_FIELDS, Subscription
 
 User = get_user_model()
 
 
 # User Views >>
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(SurrogateKeyMixin, ReplicaReadMixin, UserViewSet):
     """Представление для модели пользователя."""
+    surrogate_collection = surrogate.USERS
+    surrogate_item_keys = surrogate.user_keys
     queryset = User.objects.all()
     pagination_class = LimitOffsetPagination
 
@@ -40,6 +60,22 @@ class CustomUserViewSet(UserViewSet):
             self.permission_classes = [IsAuthenticated]
         return super().get_permissions()
 
+    def get_instance(self):
+        """Текущий пользователь, прочитанный из базы одним запросом.
+
+        `request.user` из кеша токенов загружен только для проверки прав:
+        остальные поля дочитывались бы по одному.
+        """
+        return User.objects.get(pk=self.request.user.pk)
+
+    def get_queryset(self):
+        """С `ordering=popular` авторы идут по убыванию числа подписчиков.
+        """
+        queryset = super().get_queryset()
+        if self.action == 'list' and is_popular_ordering(self.request):
+            queryset = queryset.order_by('-subscribers_count', '-pk')
+        return queryset
+
     def get_serializer_class(self):
         """Выбор сериализатора в зависимости от действия."""
         if self.action == 'me':
@@ -61,13 +97,14 @@ class CustomUserViewSet(UserViewSet):
     )
     def me(self, request):
         """Возвращает информацию о текущем пользователе."""
-        serializer = self.get_serializer(request.user)
+        serializer = self.get_serializer(self.get_instance())
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(
         methods=['PUT'],
         detail=False,
         permission_classes=[IsAuthenticated],
+        parser_classes=[JSONParser, MultiPartParser],
         url_path='me/avatar',
     )
     def avatar(self, request):
@@ -94,11 +131,20 @@ class CustomUserViewSet(UserViewSet):
     )
     def subscriptions(self, request):
         """Получение списка подписок текущего пользователя."""
+        subscriptions = Subscription.objects.filter(user=request.user)
+        if is_popular_ordering(request):
+            subscriptions = subscriptions.order_by(
+                '-author__subscribers_count', '-author_id'
+            )
         page = self.paginate_queryset(
-            Subscription.objects.filter(user=request.user)
+            subscriptions.values_list('author_id', flat=True)
+        )
+        recipes_limit = parse_recipes_limit(
+            request.query_params.get('recipes_limit')
+        )
+        return self.get_paginated_response(
+            read_subscriptions(request, page, recipes_limit)
         )
-        serializer = self.get_serializer(page, many=True)
-        return self.get_paginated_response(serializer.data)
 
     @action(
         detail=True,
@@ -124,9 +170,12 @@ class CustomUserViewSet(UserViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        subscription = Subscription.objects.create(
-            user=request.user, author=author
-        )
+        # Вместе с подпиской меняется счётчик подписчиков автора.
+        with transaction.atomic():
+            subscription = Subscription.objects.create(
+                user=request.user, author=author
+            )
+            author.refresh_from_db(fields=COUNTER_FIELDS)
         serializer = self.get_serializer(subscription)
 
         response = Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -154,8 +203,12 @@ class CustomUserViewSet(UserViewSet):
 
 # Tag Views >>
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(
+    SurrogateKeyMixin, ReplicaReadMixin, viewsets.ReadOnlyModelViewSet
+):
     """Представление для модели тега."""
+    surrogate_collection = surrogate.TAGS
+    surrogate_item_keys = surrogate.tag_keys
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
@@ -164,8 +217,12 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
 
 # Ingredient Views >>
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+    SurrogateKeyMixin, ReplicaReadMixin, viewsets.ReadOnlyModelViewSet
+):
     """Представление для модели ингредиента."""
+    surrogate_collection = surrogate.INGREDIENTS
+    surrogate_item_keys = surrogate.ingredient_keys
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     search_fields = ['^name']
@@ -173,17 +230,28 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticatedOrReadOnly]
     pagination_class = None  # Убрать пагинацию
 
+    def list(self, request, *args, **kwargs):
+        return Response(
+            read_ingredients(self.filter_queryset(self.get_queryset()))
+        )
+
 
 # Recipe Views >>
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    SurrogateKeyMixin, ReplicaReadMixin, viewsets.ModelViewSet
+):
     """Представление для модели рецепта."""
+    surrogate_collection = surrogate.RECIPES
+    surrogate_item_keys = surrogate.recipe_keys
     queryset = Recipe.objects.all()
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
     pagination_class = CustomPageNumberPagination
     permission_classes = [IsAuthenticatedOrReadOnly]
+    parser_classes = [JSONParser, MultiPartJSONParser]
+    throttle_scope = None
 
     def get_serializer_class(self):
         """Возвращает соответствующий сериализатор в зависимости от действия.
@@ -192,6 +260,34 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return CreateRecipeSerializer
         return RecipeSerializer
 
+    @property
+    def paginator(self):
+        """С `ordering=popular` список листается по ключу популярности."""
+        if (
+            not hasattr(self, '_paginator')
+            and self.action == 'list'
+            and is_popular_ordering(self.request)
+        ):
+            self._paginator = PopularityPagination()
+        return super().paginator
+
+    def get_surrogate_list_keys(self) -> set[str]:
+        if is_popular_ordering(self.request):
+            return {surrogate.POPULAR}
+        return set()
+
+    def list(self, request, *args, **kwargs):
+        """Страница выбирается по id, ответ собирает `read_recipes`."""
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset.only('pk', 'popularity'))
+        return self.get_paginated_response(
+            read_recipes(request, [recipe.pk for recipe in page])
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        recipe = self.get_object()
+        return Response(read_recipes(request, [recipe.pk])[0])
+
     def perform_create(self, serializer):
         """Создание рецепта с указанием автора."""
         serializer.save(author=self.request.user)
@@ -274,11 +370,144 @@ class RecipeViewSet(viewsets.ModelViewSet):
         short_link = request.build_absolute_uri(f'/s/{recipe.short_code}')
         return Response({'short-link': short_link}, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['get'])
+    def pantry(self, request):
+        """Рецепты, для которых у пользователя есть больше ингредиентов.
+
+        Ингредиенты передаются в `ingredients` (через запятую или
+        несколькими параметрами), `max_missing` ограничивает число
+        недостающих. Сначала идут рецепты, где недостаёт меньше.
+        """
+        try:
+            ingredient_ids = [
+                int(value)
+                for values in request.query_params.getlist('ingredients')
+                for value in values.split(',') if value
+            ]
+            max_missing = request.query_params.get('max_missing')
+            max_missing = int(max_missing) if max_missing else None
+        except ValueError:
+            return Response(
+                {'detail': 'Ожидаются целые числа.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not ingredient_ids:
+            return Response(
+                {'ingredients': 'Укажите хотя бы один ингредиент.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        pantry_index.ensure_fresh()
+        match = pantry_index.match(ingredient_ids, max_missing)
+        page = self.paginate_queryset(range(len(match)))
+        recipe_ids = [int(match.recipe_ids[position]) for position in page]
+        results = read_recipes(request, recipe_ids)
+        found = {data['id'] for data in results}
+        positions = [
+            position for position, pk in zip(page, recipe_ids) if pk in found
+        ]
+        for position, data in zip(positions, results):
+            data['matched_count'] = int(match.matched[position])
+            data['missing_count'] = int(match.missing[position])
+        return self.get_paginated_response(results)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Похожие рецепты, заранее рассчитанные `api/similar.py`."""
+        recipe = self.get_object()
+        recipe_ids = list(
+            SimilarRecipe.objects.filter(recipe=recipe)
+            .order_by('rank')
+            .values_list('similar_id', flat=True)
+        )
+        return Response(read_recipes(request, recipe_ids))
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated],
+    )
+    def feed(self, request):
+        """Лента рецептов авторов, на которых подписан пользователь.
+
+        Листается курсором из поля `next`, размер страницы - `limit`.
+        """
+        cursor = request.query_params.get('cursor')
+        try:
+            cursor = decode_cursor(cursor) if cursor else None
+        except ValueError as error:
+            return Response(
+                {'cursor': str(error)}, status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = int(request.query_params['limit'])
+        except (KeyError, ValueError):
+            limit = settings.PAGINATION_SIZE
+        limit = min(max(limit, 1), settings.FEED_MAX_LIMIT)
+
+        recipe_ids, next_cursor = feed_page(request.user, cursor, limit)
+        next_link = None
+        if next_cursor is not None:
+            next_link = replace_query_param(
+                request.build_absolute_uri(), 'cursor',
+                encode_cursor(next_cursor),
+            )
+        return Response({
+            'next': next_link,
+            'results': read_recipes(request, recipe_ids),
+        })
+
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[IsAdminUser],
+        url_path='import',
+    )
+    def import_recipes(self, request):
+        """Импорт рецептов из NDJSON от имени текущего пользователя.
+
+        Тело запроса читается построчно, без загрузки целиком в память.
+        """
+        report = RecipeImporter(author=request.user).run(
+            request.stream or ()
+        )
+        return Response(
+            report.as_dict(),
+            status=(
+                status.HTTP_201_CREATED if report.created
+                else status.HTTP_400_BAD_REQUEST
+            ),
+        )
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAdminUser],
+        url_path='export',
+    )
+    def export_recipes(self, request):
+        """Потоковый экспорт всех рецептов в NDJSON.
+
+        С параметром `inline_images=1` изображения встраиваются в base64.
+        """
+        inline_images = request.query_params.get('inline_images') in (
+            '1', 'true',
+        )
+        response = StreamingHttpResponse(
+            export_lines(request=request, inline_images=inline_images),
+            content_type=NDJSON_CONTENT_TYPE,
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="recipes.ndjson"'
+        )
+        return response
+
     @action(
         detail=False,
         methods=['get'],
         permission_classes=[IsAuthenticated],
-        url_path='download_shopping_cart'
+        url_path='download_shopping_cart',
+        throttle_scope=SHOPPING_CART,
     )
     def download_shopping_cart(self, request):
         """Генерация и скачивание списка покупок в формате .txt"""
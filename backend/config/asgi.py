@@ -10,7 +10,18 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 import os
 
 from django.core.asgi import get_asgi_application
+from django.urls import get_resolver
+
+from config.db_pool.pool import warm_up
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# URLconf со всеми представлениями и сериализаторами импортируется сразу,
+# а не на первом запросе; при preload_app - один раз в мастере gunicorn.
+get_resolver().url_patterns
+
+# Соединения с базой данных открываются при старте воркера,
+# а не на первом запросе.
+warm_up()
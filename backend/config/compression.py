@@ -0,0 +1,147 @@
+"""
+Сжатие ответов gzip и brotli.
+
+`CompressionMiddleware` сжимает ответы с типом из
+`COMPRESSION_CONTENT_TYPES` и телом не короче `COMPRESSION_MIN_LENGTH`
+байт. Кодировка выбирается по `Accept-Encoding` с учётом `q`, при равном
+весе предпочитается brotli. Всем таким ответам, сжатым или нет,
+добавляется `Vary: Accept-Encoding`, чтобы кеши не отдали сжатое тело
+клиенту, который его не принимает.
+
+Сжатые тела ответов, одинаковых для всех клиентов (без токена и без
+`Cache-Control: private`), хранятся в кеше `COMPRESSION_CACHE` под хешем
+содержимого: популярные ответы (первые страницы рецептов, список
+ингредиентов) сжимаются один раз, пока не изменятся. Ответы конкретному
+пользователю почти не повторяются и сжимаются без кеша. По умолчанию
+это отдельный `LocMemCache` процесса: обращение к общему кешу по сети
+дороже сжатия нескольких килобайт. Предварительно отрисованные
+страницы (`api/prerender.py`) сжимаются с максимальной степенью сразу
+в файлы рядом с `.json`, их отдаёт nginx.
+"""
+import gzip
+import hashlib
+from typing import Optional
+
+import brotli
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+BROTLI: str = 'br'
+GZIP: str = 'gzip'
+# Порядок - предпочтение сервера при равном весе в Accept-Encoding.
+ENCODINGS: tuple[str, ...] = (BROTLI, GZIP)
+FILE_SUFFIXES: dict[str, str] = {BROTLI: '.br', GZIP: '.gz'}
+
+GZIP_MAX_LEVEL: int = 9
+BROTLI_MAX_QUALITY: int = 11
+
+
+def accepted_encodings(header: str) -> dict[str, float]:
+    """Разбирает `Accept-Encoding` в словарь {кодировка: q}."""
+    encodings = {}
+    for item in header.split(','):
+        name, *params = item.split(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        encodings[name] = quality
+    return encodings
+
+
+def negotiate(header: str) -> Optional[str]:
+    """Кодировка ответа по `Accept-Encoding` или None, если сжимать нельзя.
+    """
+    accepted = accepted_encodings(header)
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(content: bytes, encoding: str, best: bool = False) -> bytes:
+    """Сжимает тело. `best` - максимальная степень, для файлов."""
+    if encoding == BROTLI:
+        return brotli.compress(
+            content,
+            mode=brotli.MODE_TEXT,
+            quality=(
+                BROTLI_MAX_QUALITY if best
+                else settings.COMPRESSION_BROTLI_QUALITY
+            ),
+        )
+    return gzip.compress(
+        content,
+        compresslevel=GZIP_MAX_LEVEL if best else settings.COMPRESSION_GZIP_LEVEL,
+        mtime=0,
+    )
+
+
+def cached_compress(content: bytes, encoding: str) -> bytes:
+    """Сжатое тело из кеша, при промахе сжимает и сохраняет."""
+    cache = caches[settings.COMPRESSION_CACHE]
+    digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+    key = f'compressed:{encoding}:{digest}'
+    compressed = cache.get(key)
+    if compressed is None:
+        compressed = compress(content, encoding)
+        cache.set(key, compressed, settings.COMPRESSION_CACHE_TIMEOUT)
+    return compressed
+
+
+def is_shared(request, response) -> bool:
+    """Ответ одинаков для всех клиентов и может повториться."""
+    if 'HTTP_AUTHORIZATION' in request.META:
+        return False
+    cache_control = response.get('Cache-Control', '').lower()
+    return 'private' not in cache_control and 'no-store' not in cache_control
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Сжимает ответы gzip или brotli по `Accept-Encoding`.
+
+    Потоковые ответы (выгрузка рецептов, список покупок) и ответы,
+    уже имеющие `Content-Encoding`, не трогает.
+    """
+
+    def process_response(self, request, response):
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or response.get('Content-Type', '').split(';')[0].strip()
+            not in settings.COMPRESSION_CONTENT_TYPES
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.COMPRESSION_MIN_LENGTH:
+            return response
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        compressed = (
+            cached_compress(response.content, encoding)
+            if is_shared(request, response)
+            else compress(response.content, encoding)
+        )
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        # Сжатое тело отличается побайтно, сильный ETag становится слабым.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+        response['Content-Encoding'] = encoding
+        return response
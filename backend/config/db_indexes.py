@@ -4,6 +4,15 @@
 Возвращает подходящий вариант индексации для принятой в главную функцию модели.
 Использует константы из настроек для определения выбранной базы данных.
 
+Реестр покрывает и промежуточные таблицы связей многие-ко-многим:
+явная модель `ShoppingCart` подключает индексы в `Meta`, как обычные
+модели, а таблицы, созданные Django для `ManyToManyField` без `through`
+(`recipe_tags`), не имеют своей `Meta` и не попадают
+в миграции - их индексы создаёт `create_m2m_indexes` после `migrate`.
+Варианты под базы данных различаются: `INCLUDE` (покрывающие индексы)
+есть только в PostgreSQL, в SQLite вместо него - составной индекс;
+частичные индексы (`condition`) поддерживают обе.
+
 Комментарий:
     По факту этот модуль несёт в себе избыточный функционал для проекта.
 
@@ -20,8 +29,10 @@ import logging
 from enum import Enum
 from typing import TypeAlias
 
-from django.contrib.postgres.indexes import BrinIndex
-from django.db import models
+from django.apps import apps
+from django.contrib.postgres.indexes import BrinIndex, OpClass
+from django.db import DEFAULT_DB_ALIAS, connections, models
+from django.db.models.functions import Cast, Upper
 
 from config.settings import DATABASE_NAME, POSTGRESQL, SQLITE
 
@@ -37,15 +48,44 @@ class ValidateModelName(Enum):
 
     Пример:
         MODEL = 'model'
+
+    Для таблицы, созданной Django для `ManyToManyField`, имя модели -
+    `<модель>_<поле>`, например `recipe_tags` для `Recipe.tags`.
+    Индексам таких таблиц и индексам с `include` или `condition`
+    нужно явное имя.
     """
     SUBSCRIPTION = 'subscription'
     TAG = 'tag'
     INGREDIENT = 'ingredient'
     RECIPE = 'recipe'
     RECIPEINGREDIENT = 'recipeingredient'
+    JOB = 'job'
+    USER = 'user'
+    TIMELINEENTRY = 'timelineentry'
+    SIMILARRECIPE = 'similarrecipe'
+    FAVORITEADDED = 'favoriteadded'
+    SHOPPINGCART = 'shoppingcart'
+    RECIPE_TAGS = 'recipe_tags'
 
 
 Indexes: TypeAlias = tuple[models.Index | BrinIndex, ...]
+
+
+def prefix_search_index(field: str, name: str) -> models.Index:
+    """Индекс PostgreSQL для поиска по началу строки без учёта регистра.
+
+    Повторяет выражение, в которое Django превращает `istartswith`
+    (поиск `^field` в админке): `UPPER(field::text) LIKE UPPER('...%')`.
+    """
+    return models.Index(
+        OpClass(
+            Upper(Cast(field, output_field=models.TextField())),
+            name='text_pattern_ops',
+        ),
+        name=name,
+    )
+
+
 INDEXES_FOR_MODELS: dict[ValidateModelName, dict[str, Indexes]] = {
 
     ValidateModelName.SUBSCRIPTION: {
@@ -69,12 +109,14 @@ INDEXES_FOR_MODELS: dict[ValidateModelName, dict[str, Indexes]] = {
     ValidateModelName.INGREDIENT: {
         POSTGRESQL: (
             models.Index(fields=('name',)),
+            prefix_search_index('name', 'ingredient_name_prefix'),
         ),
         SQLITE: (
             models.Index(fields=('name',)),
         ),
     },
 
+    # Сортировка `ordering=popular` листается по ключу (popularity, id).
     ValidateModelName.RECIPE: {
         POSTGRESQL: (
             BrinIndex(
@@ -84,10 +126,19 @@ INDEXES_FOR_MODELS: dict[ValidateModelName, dict[str, Indexes]] = {
                 pages_per_range=8,
             ),
             models.Index(fields=('name',)),
+            models.Index(
+                name='recipe_popularity',
+                fields=('-popularity', '-id'),
+            ),
+            prefix_search_index('name', 'recipe_name_prefix'),
         ),
         SQLITE: (
             models.Index(fields=('pub_date',)),
             models.Index(fields=('name',)),
+            models.Index(
+                name='recipe_popularity',
+                fields=('-popularity', '-id'),
+            ),
         ),
     },
 
@@ -102,6 +153,121 @@ INDEXES_FOR_MODELS: dict[ValidateModelName, dict[str, Indexes]] = {
         ),
     },
 
+    # Поиск пользователей в админке и автодополнении по началу
+    # имени пользователя и почты. Обычные индексы уже есть у этих
+    # полей как у уникальных.
+    # Авторы по популярности (`ordering=popular`) - по счётчику
+    # подписчиков в строке пользователя.
+    ValidateModelName.USER: {
+        POSTGRESQL: (
+            prefix_search_index('username', 'user_username_prefix'),
+            prefix_search_index('email', 'user_email_prefix'),
+            models.Index(
+                name='user_subscribers',
+                fields=('-subscribers_count', '-id'),
+            ),
+        ),
+        SQLITE: (
+            models.Index(
+                name='user_subscribers',
+                fields=('-subscribers_count', '-id'),
+            ),
+        ),
+    },
+
+    ValidateModelName.JOB: {
+        POSTGRESQL: (
+            models.Index(fields=('status', 'run_at')),
+            models.Index(fields=('unique_key', 'status')),
+        ),
+        SQLITE: (
+            models.Index(fields=('status', 'run_at')),
+            models.Index(fields=('unique_key', 'status')),
+        ),
+    },
+
+    # Лента читается по (user, pub_date, recipe) в обратном порядке,
+    # а при отписке записи удаляются по (user, author).
+    ValidateModelName.TIMELINEENTRY: {
+        POSTGRESQL: (
+            models.Index(
+                name='timeline_user_pub_date',
+                fields=('user', '-pub_date', '-recipe'),
+            ),
+            models.Index(fields=('user', 'author')),
+        ),
+        SQLITE: (
+            models.Index(
+                name='timeline_user_pub_date',
+                fields=('user', '-pub_date', '-recipe'),
+            ),
+            models.Index(fields=('user', 'author')),
+        ),
+    },
+
+    ValidateModelName.SIMILARRECIPE: {
+        POSTGRESQL: (
+            models.Index(fields=('recipe', 'rank')),
+        ),
+        SQLITE: (
+            models.Index(fields=('recipe', 'rank')),
+        ),
+    },
+
+    # Пересчёт популярности читает события за окно по `added`
+    # и группирует по рецепту: в PostgreSQL - только из индекса.
+    # Фильтры избранного и корзины по пользователю уже читают только
+    # индекс уникальности (user, recipe).
+    ValidateModelName.FAVORITEADDED: {
+        POSTGRESQL: (
+            models.Index(
+                name='favorite_added_recipe',
+                fields=('added',),
+                include=('recipe',),
+            ),
+        ),
+        SQLITE: (
+            models.Index(
+                name='favorite_added_recipe',
+                fields=('added', 'recipe'),
+            ),
+        ),
+    },
+
+    ValidateModelName.SHOPPINGCART: {
+        POSTGRESQL: (
+            models.Index(
+                name='cart_added_recipe',
+                fields=('added',),
+                include=('recipe',),
+            ),
+        ),
+        SQLITE: (
+            models.Index(
+                name='cart_added_recipe',
+                fields=('added', 'recipe'),
+            ),
+        ),
+    },
+
+    # Фильтр рецептов по тегу: у Django здесь только индекс по tag_id,
+    # и за recipe_id приходится читать таблицу.
+    ValidateModelName.RECIPE_TAGS: {
+        POSTGRESQL: (
+            models.Index(
+                name='recipe_tags_tag_recipe',
+                fields=('tag',),
+                include=('recipe',),
+            ),
+        ),
+        SQLITE: (
+            models.Index(
+                name='recipe_tags_tag_recipe',
+                fields=('tag', 'recipe'),
+            ),
+        ),
+    },
+
 }
 
 
@@ -132,3 +298,34 @@ def get_indexes_for_model(model_name: str) -> Indexes:
     logger.debug(f'Индексация для модели {model_name} успешно подготовлена.')
 
     return indexes
+
+
+def create_m2m_indexes(using: str = DEFAULT_DB_ALIAS, **kwargs) -> None:
+    """Создаёт индексы реестра для таблиц M2M, созданных Django.
+
+    Подключается к сигналу `post_migrate`: создаёт индексы, которых
+    ещё нет в базе, поэтому безопасна при повторных запусках.
+    """
+    connection = connections[using]
+    registered = {name.value for name in ValidateModelName}
+    for model in apps.get_models(include_auto_created=True):
+        model_name = model._meta.model_name
+        if not model._meta.auto_created or model_name not in registered:
+            continue
+        with connection.cursor() as cursor:
+            existing = connection.introspection.get_constraints(
+                cursor, model._meta.db_table
+            )
+        missing = [
+            index for index in get_indexes_for_model(model_name)
+            if index.name not in existing
+        ]
+        if not missing:
+            continue
+        with connection.schema_editor() as schema_editor:
+            for index in missing:
+                schema_editor.add_index(model, index)
+        logger.info(
+            f'Созданы индексы таблицы {model._meta.db_table}: '
+            f'{", ".join(index.name for index in missing)}.'
+        )
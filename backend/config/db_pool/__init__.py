@@ -0,0 +1,7 @@
+"""
+Бэкенд PostgreSQL с пулом соединений внутри процесса.
+
+Подключается через `ENGINE = 'config.db_pool'` при `DB_POOL=True`.
+Соединения не закрываются по окончании запроса, а возвращаются в пул
+и переиспользуются другими потоками того же процесса.
+"""
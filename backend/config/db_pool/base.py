@@ -0,0 +1,56 @@
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from config.db_pool.pool import ConnectionPool, get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Обёртка PostgreSQL, берущая соединения из пула процесса.
+
+    `close()` возвращает соединение в пул вместо закрытия, поэтому
+    `CONN_MAX_AGE` должен быть равен 0: тогда соединение освобождается
+    в конце каждого запроса и достаётся следующему потоку.
+    """
+
+    @property
+    def pool(self) -> ConnectionPool:
+        return get_pool(self.alias, self.settings_dict)
+
+    def _connect_raw(self):
+        """Открывает новое соединение в обход пула."""
+        return super().get_new_connection(self.get_connection_params())
+
+    def get_new_connection(self, conn_params):
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = (
+            IsolationLevel.READ_COMMITTED if isolation_level is None
+            else IsolationLevel(isolation_level)
+        )
+        check = (
+            self._check_raw if self.settings_dict['CONN_HEALTH_CHECKS']
+            else None
+        )
+        return self.pool.acquire(self._connect_raw, check)
+
+    def _check_raw(self, connection) -> bool:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except self.Database.Error:
+            return False
+        return True
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            # Соединение, закрываемое внутри транзакции, остаётся у обёртки
+            # до `connect()`, поэтому его нельзя отдавать другим потокам.
+            self.pool.release(
+                self.connection,
+                discard=self.in_atomic_block or self.errors_occurred,
+            )
+
+    def warm_up_pool(self) -> int:
+        """Заранее открывает `POOL['MIN_SIZE']` соединений."""
+        return self.pool.fill(self._connect_raw)
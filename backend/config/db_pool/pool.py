@@ -0,0 +1,321 @@
+"""
+Пул соединений с базой данных и его метрики.
+
+Пул хранится отдельно для каждого псевдонима базы данных и процесса.
+Метрики (время ожидания свободного соединения и загрузка пула)
+доступны через `pool_stats()` и отдаются эндпоинтом `/health/`.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Iterable, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+# Соединение, простоявшее без дела дольше этого времени,
+# проверяется перед выдачей, если включены CONN_HEALTH_CHECKS.
+HEALTH_CHECK_IDLE_SECONDS: float = 30.0
+
+_pools: dict[str, 'ConnectionPool'] = {}
+_pools_lock = threading.Lock()
+# Соединения, унаследованные от родительского процесса после fork.
+# Их нельзя закрывать в дочернем процессе: закрытие оборвёт сессию
+# родителя. Ссылки хранятся, чтобы сборщик мусора их не закрыл.
+_orphaned: list[Any] = []
+
+
+class PoolTimeout(DatabaseError):
+    """Свободное соединение не появилось за отведённое время."""
+
+
+class ConnectionPool:
+    """Потокобезопасный пул соединений ограниченного размера.
+
+    Соединения выдаются в порядке LIFO, чтобы лишние простаивали
+    и закрывались по истечении `max_lifetime`.
+    """
+
+    def __init__(
+        self,
+        alias: str,
+        min_size: int,
+        max_size: int,
+        timeout: float,
+        max_lifetime: Optional[float],
+    ) -> None:
+        self.alias = alias
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self._pid = os.getpid()
+        self._condition = threading.Condition()
+        self._idle: deque = deque()
+        self._created: dict[int, float] = {}
+        self._in_use = 0
+        self._opening = 0
+        self._waiting = 0
+        self._counters = {
+            'acquired': 0,
+            'waited': 0,
+            'timeouts': 0,
+            'opened': 0,
+            'closed': 0,
+        }
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._in_use_max = 0
+
+    @property
+    def size(self) -> int:
+        return len(self._created) + self._opening
+
+    def _check_fork(self) -> None:
+        if self._pid == os.getpid():
+            return
+        _orphaned.extend(connection for connection, _ in self._idle)
+        self._idle.clear()
+        self._created.clear()
+        self._in_use = 0
+        self._opening = 0
+        self._pid = os.getpid()
+
+    def _expired(self, connection, now: float) -> bool:
+        created = self._created.get(id(connection), now)
+        return (
+            self.max_lifetime is not None
+            and now - created >= self.max_lifetime
+        )
+
+    def _discard(self, connection) -> None:
+        """Закрывает соединение и освобождает место в пуле."""
+        self._created.pop(id(connection), None)
+        self._counters['closed'] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def acquire(
+        self,
+        connect: Callable[[], Any],
+        check: Optional[Callable[[Any], bool]] = None,
+    ):
+        """Выдаёт соединение из пула или открывает новое.
+
+        Если пул заполнен, ждёт возврата соединения не дольше `timeout`.
+        Соединение, долго простоявшее в пуле, проверяется `check`.
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        with self._condition:
+            self._check_fork()
+            while True:
+                now = time.monotonic()
+                # Пока есть ожидающие, новые потоки встают в очередь за ними,
+                # иначе освободившееся соединение перехватывает тот же поток.
+                if waited or not self._waiting:
+                    connection = self._pop_idle(now, check)
+                    if connection is not None or self.size < self.max_size:
+                        break
+                remaining = deadline - now
+                if remaining <= 0:
+                    if waited:
+                        self._waiting -= 1
+                    self._counters['timeouts'] += 1
+                    logger.warning(
+                        f'Пул соединений {self.alias} исчерпан: '
+                        f'{self.max_size} соединений заняты '
+                        f'дольше {self.timeout} с.'
+                    )
+                    raise PoolTimeout(
+                        f'Нет свободных соединений в пуле "{self.alias}".'
+                    )
+                if not waited:
+                    waited = True
+                    self._waiting += 1
+                self._condition.wait(remaining)
+            if waited:
+                self._waiting -= 1
+                if self._waiting and (
+                    self._idle or self.size + 1 < self.max_size
+                ):
+                    self._condition.notify()
+            if connection is None:
+                # Место резервируется до открытия соединения,
+                # чтобы другие потоки не превысили `max_size`.
+                self._opening += 1
+            self._in_use += 1
+            self._in_use_max = max(self._in_use_max, self._in_use)
+
+        if connection is None:
+            try:
+                connection = connect()
+            except Exception:
+                with self._condition:
+                    self._opening -= 1
+                    self._in_use -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self._opening -= 1
+                self._add(connection)
+
+        wait = time.monotonic() - started
+        with self._condition:
+            self._counters['acquired'] += 1
+            if waited:
+                self._counters['waited'] += 1
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+        return connection
+
+    def _pop_idle(self, now: float, check: Optional[Callable[[Any], bool]]):
+        """Достаёт из пула последнее исправное соединение."""
+        while self._idle:
+            connection, idle_since = self._idle.pop()
+            if (
+                connection.closed
+                or self._expired(connection, now)
+                or check is not None
+                and now - idle_since >= HEALTH_CHECK_IDLE_SECONDS
+                and not check(connection)
+            ):
+                self._discard(connection)
+                continue
+            return connection
+        return None
+
+    def _add(self, connection) -> None:
+        self._created[id(connection)] = time.monotonic()
+        self._counters['opened'] += 1
+
+    def release(self, connection, discard: bool = False) -> None:
+        """Возвращает соединение в пул.
+
+        Незавершённая транзакция откатывается. Сломанное или устаревшее
+        соединение закрывается.
+        """
+        if not discard and not connection.closed:
+            try:
+                # `info.transaction_status` есть и в psycopg2 (с 2.8),
+                # и в psycopg 3; 0 - IDLE, транзакция не открыта.
+                if connection.info.transaction_status:
+                    connection.rollback()
+            except Exception:
+                discard = True
+        with self._condition:
+            if os.getpid() != self._pid:
+                _orphaned.append(connection)
+                return
+            self._in_use = max(self._in_use - 1, 0)
+            if (
+                discard
+                or connection.closed
+                or self._expired(connection, time.monotonic())
+            ):
+                self._discard(connection)
+            else:
+                self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def fill(self, connect: Callable[[], Any]) -> int:
+        """Открывает соединения до `min_size`. Возвращает число открытых."""
+        opened = 0
+        while True:
+            with self._condition:
+                self._check_fork()
+                if self.size >= self.min_size:
+                    return opened
+            connection = connect()
+            with self._condition:
+                self._add(connection)
+                self._idle.append((connection, time.monotonic()))
+                self._condition.notify()
+            opened += 1
+
+    def close_all(self) -> None:
+        """Закрывает простаивающие соединения."""
+        with self._condition:
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+
+    def stats(self) -> dict[str, Any]:
+        """Возвращает метрики пула."""
+        with self._condition:
+            waited = self._counters['waited']
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self.size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'in_use_max': self._in_use_max,
+                'saturation': round(self._in_use / self.max_size, 3),
+                **self._counters,
+                'wait_seconds_total': round(self._wait_total, 4),
+                'wait_seconds_avg': round(
+                    self._wait_total / waited, 4
+                ) if waited else 0.0,
+                'wait_seconds_max': round(self._wait_max, 4),
+            }
+
+
+def get_pool(alias: str, settings_dict: dict) -> ConnectionPool:
+    """Возвращает пул для базы данных, создавая его при первом обращении."""
+    pool = _pools.get(alias)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        if alias not in _pools:
+            options = settings_dict.get('POOL', {})
+            _pools[alias] = ConnectionPool(
+                alias,
+                min_size=options.get('MIN_SIZE', 0),
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 10.0),
+                max_lifetime=options.get('MAX_LIFETIME'),
+            )
+        return _pools[alias]
+
+
+def pool_stats() -> dict[str, dict[str, Any]]:
+    """Возвращает метрики всех пулов текущего процесса."""
+    return {alias: pool.stats() for alias, pool in _pools.items()}
+
+
+def close_pools() -> None:
+    """Закрывает простаивающие соединения всех пулов процесса.
+
+    Вызывается в мастере gunicorn перед запуском воркеров.
+    """
+    for pool in _pools.values():
+        pool.close_all()
+
+
+def warm_up(aliases: Optional[Iterable[str]] = None) -> None:
+    """Открывает соединения заранее, при старте воркера.
+
+    Для баз данных с пулом открывает `MIN_SIZE` соединений,
+    для остальных с постоянными соединениями (`CONN_MAX_AGE`) —
+    соединение текущего потока. По умолчанию — основная база и реплики.
+    """
+    if aliases is None:
+        aliases = [DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS]
+    for alias in aliases:
+        connection = connections[alias]
+        try:
+            if hasattr(connection, 'warm_up_pool'):
+                connection.warm_up_pool()
+            elif connection.settings_dict['CONN_MAX_AGE']:
+                connection.ensure_connection()
+        except DatabaseError as error:
+            logger.warning(
+                f'Не удалось заранее открыть соединения с "{alias}": {error}'
+            )
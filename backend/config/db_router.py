@@ -0,0 +1,131 @@
+"""
+Маршрутизация чтения на реплики базы данных.
+
+Реплики описываются в `settings.DATABASE_REPLICAS`. Чтение уходит на
+реплику только внутри запроса, для которого это явно разрешено через
+`route_reads_to_replica()` (см. `api.mixins.ReplicaReadMixin`), все
+остальные запросы и любая запись идут в основную базу.
+
+Чтобы пользователь сразу видел свои изменения, после успешного
+изменяющего запроса `PrimaryPinMiddleware` закрепляет его за основной
+базой на `DB_REPLICA_STICKY_SECONDS` секунд. Отметка хранится в кеше,
+при нескольких воркерах он должен быть общим (`CACHE_BACKEND`): с кешем
+в памяти процесса при заданных репликах `manage.py check` сообщает
+об ошибке `api.E002`.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+SAFE_METHODS: tuple[str, ...] = ('GET', 'HEAD', 'OPTIONS')
+PIN_KEY: str = 'db-router:pin:{user_id}'
+
+_read_alias: ContextVar[Optional[str]] = ContextVar(
+    'read_alias', default=None
+)
+_primary_only: ContextVar[bool] = ContextVar('primary_only', default=False)
+
+
+def pin_to_primary(user_id: int) -> None:
+    """Закрепляет чтение пользователя за основной базой."""
+    cache.set(
+        PIN_KEY.format(user_id=user_id), True,
+        timeout=settings.DB_REPLICA_STICKY_SECONDS,
+    )
+
+
+def is_pinned(user) -> bool:
+    """Проверяет, изменял ли пользователь данные недавно."""
+    return user.is_authenticated and cache.get(
+        PIN_KEY.format(user_id=user.pk), False
+    )
+
+
+def choose_replica(user) -> Optional[str]:
+    """Выбирает реплику для запроса, None — читать из основной базы."""
+    if (
+        not settings.DATABASE_REPLICAS
+        or _primary_only.get()
+        or is_pinned(user)
+    ):
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+def route_reads_to_replica(user) -> Token:
+    """Направляет чтение текущего контекста на реплику.
+
+    Возвращает токен для `reset_reads()`.
+    """
+    return _read_alias.set(choose_replica(user))
+
+
+def reset_reads(token: Token) -> None:
+    """Возвращает чтение в основную базу."""
+    _read_alias.reset(token)
+
+
+@contextmanager
+def read_from_primary():
+    """Запрещает чтение с реплик в текущем контексте.
+
+    Нужен коду, который не должен видеть отставание реплик
+    (например, при сохранении ответов API в файлы).
+    """
+    token = _primary_only.set(True)
+    try:
+        yield
+    finally:
+        _primary_only.reset(token)
+
+
+class ReplicaRouter:
+    """Отправляет разрешённое чтение на реплику, запись — в основную базу."""
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        alias = _read_alias.get()
+        if alias is None:
+            return None
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Связанные объекты читаются из той же базы, что и исходный.
+            return instance._state.db
+        return alias
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> Optional[bool]:
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints) -> Optional[bool]:
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class PrimaryPinMiddleware:
+    """Закрепляет за основной базой пользователя, изменившего данные."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and user is not None
+            and user.is_authenticated
+        ):
+            pin_to_primary(user.pk)
+        return response
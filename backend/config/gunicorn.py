@@ -0,0 +1,132 @@
+"""
+Настройки gunicorn для production.
+
+Запуск: `gunicorn -c python:config.gunicorn`. Все параметры задаются
+переменными окружения `GUNICORN_*`:
+
+- `GUNICORN_WORKER_CLASS` - модель воркеров: `sync` (процесс на запрос),
+  `gthread` (`GUNICORN_THREADS` потоков в процессе) или `asgi`
+  (uvicorn, приложение `config.asgi`);
+- `GUNICORN_PRELOAD` - приложение импортируется один раз в мастере,
+  воркеры получают его через fork и делят страницы памяти
+  с мастером (copy-on-write), а не импортируют Django заново;
+- `GUNICORN_MAX_REQUESTS` с разбросом `GUNICORN_MAX_REQUESTS_JITTER`
+  и `GUNICORN_MAX_WORKER_MEMORY` - перезапуск воркера после числа
+  запросов или роста памяти, чтобы утечки и фрагментация не копились.
+
+С `GUNICORN_PRELOAD` код не перечитывается по HUP: новая версия
+выкатывается перезапуском контейнера.
+"""
+import gc
+import os
+import resource
+
+from environs import Env
+
+env = Env()
+env.read_env()
+
+WORKER_CLASSES: dict[str, str] = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'asgi': 'uvicorn.workers.UvicornWorker',
+}
+APPLICATIONS: dict[str, str] = {
+    'sync': 'config.wsgi:application',
+    'gthread': 'config.wsgi:application',
+    'asgi': 'config.asgi:application',
+}
+
+worker_model = env.str('GUNICORN_WORKER_CLASS', 'gthread')
+if worker_model not in WORKER_CLASSES:
+    raise ValueError(
+        f'GUNICORN_WORKER_CLASS: ожидается одно из {", ".join(WORKER_CLASSES)}'
+    )
+cpus = len(os.sched_getaffinity(0))
+
+# Server >>
+
+bind = env.str('GUNICORN_BIND', '0.0.0.0:8000')
+wsgi_app = APPLICATIONS[worker_model]
+worker_class = WORKER_CLASSES[worker_model]
+# 0 - по числу доступных процессору ядер.
+workers = env.int('GUNICORN_WORKERS', 0) or (
+    cpus * 2 + 1 if worker_model == 'sync' else cpus + 1
+)
+threads = env.int('GUNICORN_THREADS', 4 if worker_model == 'gthread' else 1)
+preload_app = env.bool('GUNICORN_PRELOAD', True)
+# Файлы пульса воркеров в памяти: запись на overlayfs контейнера
+# может подвисать, и мастер убьёт здоровый воркер по таймауту.
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Timeouts >>
+
+timeout = env.int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env.int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = env.int('GUNICORN_KEEPALIVE', 5)
+
+# Worker recycling >>
+
+max_requests = env.int('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = env.int('GUNICORN_MAX_REQUESTS_JITTER', 200)
+# Мегабайты пикового RSS воркера, 0 - без ограничения.
+max_worker_memory = env.int('GUNICORN_MAX_WORKER_MEMORY', 512)
+
+# Logging >>
+
+accesslog = env.str('GUNICORN_ACCESS_LOG', '') or None
+errorlog = '-'
+loglevel = env.str('GUNICORN_LOG_LEVEL', 'info')
+
+
+# Hooks >>
+
+def when_ready(server):
+    """Готовит мастер к fork после загрузки приложения.
+
+    Соединения с базой, открытые при импорте `config.wsgi`, закрываются:
+    унаследованный сокет нельзя делить между процессами. Объекты,
+    созданные при загрузке, исключаются из сборки мусора (`gc.freeze`),
+    иначе проходы сборщика в воркерах касаются их заголовков
+    и копируют общие страницы памяти.
+    """
+    if not preload_app:
+        return
+    from django.db import connections
+
+    from config.db_pool.pool import close_pools
+
+    connections.close_all()
+    close_pools()
+    gc.collect()
+    gc.freeze()
+    server.log.info('Приложение загружено в мастере, объектов: %d',
+                    gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    """Открывает соединения с базой в воркере до первого запроса."""
+    if not preload_app:
+        # Без preload воркер импортирует config.wsgi и открывает их сам.
+        return
+    from config.db_pool.pool import warm_up
+
+    warm_up()
+
+
+def post_request(worker, req, environ, resp):
+    """Перезапускает воркер, превысивший `max_worker_memory`.
+
+    Вызывается только воркерами sync и gthread; воркер дообслуживает
+    текущие соединения и завершается, мастер запускает новый.
+    """
+    if not max_worker_memory or not worker.alive:
+        return
+    # ru_maxrss в Linux - в килобайтах.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+    if peak > max_worker_memory:
+        worker.log.info(
+            'Воркер %s использует %d МБ (предел %d МБ), перезапуск',
+            worker.pid, peak, max_worker_memory,
+        )
+        worker.alive = False
@@ -0,0 +1,243 @@
+"""
+Реализует создание уменьшенных копий изображений (производных).
+
+Для каждого исходного изображения создаются копии заданной в настройках
+ширины в исходном формате и в WebP. Копии хранятся в том же хранилище
+рядом с оригиналом:
+
+    food/recipes/photo.jpg
+    food/recipes/photo.w320.jpg
+    food/recipes/photo.w320.webp
+
+Создание выполняется фоновой задачей (`api/tasks.py`) после сохранения
+модели. Чтение копий не создаёт: пока их нет, ответ отдаёт пустой
+список копий и ссылку на оригинал, а задача ставится в очередь ещё раз
+на случай, если изображение сохранено в обход сигналов. Отсутствие
+копий запоминается на `IMAGE_DERIVATIVE_RETRY_INTERVAL` секунд, чтобы
+не обращаться к хранилищу при каждом чтении. Файл копии заменяется целиком
+(запись во временный файл и переименование), поэтому читатель
+не увидит недописанную копию, а повторная генерация не оставляет
+файлов с подобранными хранилищем именами. После создания копий
+отправляется сигнал `derivatives_created`: ответы, сохранённые без копий,
+нужно обновить.
+"""
+import logging
+import os
+import posixpath
+import tempfile
+import threading
+import time
+from io import BytesIO
+from typing import Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage, default_storage
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+
+from jobs.queue import enqueue
+
+logger = logging.getLogger(__name__)
+
+WEBP: str = 'webp'
+FALLBACK_FORMATS: dict[str, str] = {
+    'jpg': 'JPEG',
+    'jpeg': 'JPEG',
+    'png': 'PNG',
+}
+DEFAULT_FALLBACK_EXT: str = 'jpg'
+# Сколько имён с уже готовыми копиями помнить в пределах процесса.
+READY_CACHE_SIZE: int = 10_000
+
+_ready: set[str] = set()
+# Имена без копий и время последней проверки хранилища.
+_missing: dict[str, float] = {}
+_lock = threading.Lock()
+
+
+# Копии изображения созданы; аргумент `name` - имя оригинала.
+derivatives_created = Signal()
+
+
+def _fallback_ext(name: str) -> str:
+    """Возвращает расширение копии в исходном формате."""
+    ext = posixpath.splitext(name)[1].lstrip('.').lower()
+    return ext if ext in FALLBACK_FORMATS else DEFAULT_FALLBACK_EXT
+
+
+def derivative_name(name: str, width: int, ext: str) -> str:
+    """Возвращает имя файла копии заданной ширины и формата."""
+    root = posixpath.splitext(name)[0]
+    return f'{root}.w{width}.{ext}'
+
+
+def derivative_names(name: str) -> dict[int, dict[str, str]]:
+    """Возвращает имена всех копий изображения по ширине и формату."""
+    fallback = _fallback_ext(name)
+    return {
+        width: {
+            fallback: derivative_name(name, width, fallback),
+            WEBP: derivative_name(name, width, WEBP),
+        }
+        for width in settings.IMAGE_DERIVATIVE_WIDTHS
+    }
+
+
+def _save(storage: Storage, name: str, image: Image.Image, ext: str) -> None:
+    """Перезаписывает файл копии в хранилище."""
+    image_format = FALLBACK_FORMATS.get(ext, WEBP.upper())
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    buffer = BytesIO()
+    image.save(
+        buffer,
+        format=image_format,
+        quality=settings.IMAGE_DERIVATIVE_QUALITY,
+        optimize=True,
+    )
+    _replace(storage, name, buffer.getvalue())
+
+
+def _replace(storage: Storage, name: str, content: bytes) -> None:
+    """Записывает файл вместо существующего одним действием.
+
+    В локальном хранилище файл пишется во временный в том же каталоге
+    и переименовывается (`os.replace`). Хранилище без локальных путей
+    должно перезаписывать объект под тем же именем (у S3 -
+    `file_overwrite`).
+    """
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        storage.save(name, ContentFile(content))
+        return
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(content)
+        os.chmod(temporary, storage.file_permissions_mode or 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def generate_derivatives(
+    name: str, storage: Optional[Storage] = None
+) -> None:
+    """Создаёт все копии изображения, перезаписывая существующие.
+
+    Копии не увеличиваются: если оригинал уже меньше заданной ширины,
+    копия сохраняется в исходном разрешении.
+    """
+    storage = storage or default_storage
+    with storage.open(name) as file, Image.open(file) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ('RGB', 'RGBA'):
+            original = original.convert('RGBA')
+
+        for width, names in derivative_names(name).items():
+            resized = original.copy()
+            resized.thumbnail(
+                (width, original.height), Image.Resampling.LANCZOS
+            )
+            for ext, derivative in names.items():
+                _save(storage, derivative, resized, ext)
+
+    _mark_ready(name)
+    logger.debug(f'Созданы уменьшенные копии для {name}.')
+
+
+def delete_derivatives(
+    name: str, storage: Optional[Storage] = None
+) -> None:
+    """Удаляет все копии изображения."""
+    storage = storage or default_storage
+    for names in derivative_names(name).values():
+        for derivative in names.values():
+            storage.delete(derivative)
+    with _lock:
+        _ready.discard(name)
+        _missing.pop(name, None)
+
+
+def _mark_ready(name: str) -> None:
+    with _lock:
+        if len(_ready) >= READY_CACHE_SIZE:
+            _ready.clear()
+        _ready.add(name)
+        _missing.pop(name, None)
+
+
+def schedule_derivatives(name: str) -> None:
+    """Ставит создание копий в очередь, если задача ещё не ждёт."""
+    enqueue(
+        'images.ensure_derivatives',
+        {'name': name},
+        unique_key=f'images:{name}',
+    )
+
+
+def derivatives_ready(name: str, storage: Optional[Storage] = None) -> bool:
+    """Проверяет, созданы ли копии изображения.
+
+    Достаточно проверить последнюю копию: файлы создаются по порядку.
+    """
+    if name in _ready:
+        return True
+    storage = storage or default_storage
+    last_width = settings.IMAGE_DERIVATIVE_WIDTHS[-1]
+    if storage.exists(derivative_name(name, last_width, WEBP)):
+        _mark_ready(name)
+        return True
+    return False
+
+
+def variants_ready(name: str, storage: Optional[Storage] = None) -> bool:
+    """Проверка для чтения: готовы ли копии изображения.
+
+    Если копий нет, ставит их создание в очередь и до истечения
+    `IMAGE_DERIVATIVE_RETRY_INTERVAL` секунд отвечает «нет»
+    без обращения к хранилищу.
+    """
+    if name in _ready:
+        return True
+    now = time.monotonic()
+    with _lock:
+        checked_at = _missing.get(name)
+    if (
+        checked_at is not None
+        and now - checked_at < settings.IMAGE_DERIVATIVE_RETRY_INTERVAL
+    ):
+        return False
+    if derivatives_ready(name, storage):
+        return True
+    with _lock:
+        if len(_missing) >= READY_CACHE_SIZE:
+            _missing.clear()
+        _missing[name] = now
+    schedule_derivatives(name)
+    return False
+
+
+def ensure_derivatives(name: str) -> None:
+    """Создаёт копии изображения, если их ещё нет.
+
+    Если оригинал уже удалён или не читается как изображение,
+    ничего не делает: повтор задачи его не исправит.
+    """
+    if not name or derivatives_ready(name):
+        return
+    if not default_storage.exists(name):
+        logger.debug(f'Изображение {name} удалено, копии не нужны.')
+        return
+    try:
+        generate_derivatives(name)
+    except (OSError, ValueError, Image.DecompressionBombError) as error:
+        logger.warning(f'Копии изображения {name} не созданы: {error}')
+        return
+    derivatives_created.send(sender=None, name=name)
@@ -0,0 +1,41 @@
+"""
+Пагинатор списков админки с оценочным числом строк.
+
+Список изменений админки на каждой странице считает строки
+`COUNT(*)`, что на таблицах с миллионами строк означает полный проход.
+На PostgreSQL `EstimatedCountPaginator` сначала берёт оценку
+планировщика (`EXPLAIN`), и только если она меньше
+`ADMIN_EXACT_COUNT_LIMIT`, считает строки точно. На SQLite оценок
+нет, и число строк всегда точное.
+"""
+import json
+from typing import Optional
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset: QuerySet) -> Optional[int]:
+    """Оценка числа строк запроса по плану PostgreSQL."""
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор с оценочным числом строк для больших таблиц."""
+
+    @cached_property
+    def count(self) -> int:
+        if isinstance(self.object_list, QuerySet):
+            estimate = estimate_count(self.object_list)
+            if (
+                estimate is not None
+                and estimate >= settings.ADMIN_EXACT_COUNT_LIMIT
+            ):
+                return estimate
+        return super().count
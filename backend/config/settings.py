@@ -5,6 +5,7 @@
 Расширены использованием дополнительных инструментов для взаимодействия
 с переменными окружения и логгером.
 """
+import tempfile
 from pathlib import Path
 
 from environs import Env
@@ -72,6 +73,10 @@ LOGGING = {
             'level': env.str('LOGGER_DJANGO_LEVEL', 'WARNING'),
             'propagate': True,
         },
+        'jobs': {
+            'handlers': ['console', 'file'],
+            'level': env.str('LOGGER_JOBS_LEVEL', 'INFO'),
+        },
     },
 }
 
@@ -96,6 +101,7 @@ INSTALLED_APPS = [
     # Applications
     'api',
     'food',
+    'jobs',
     'users',
 ]
 
@@ -131,6 +137,8 @@ TEMPLATES = [
 SQLITE: str = 'sqlite'
 POSTGRESQL: str = 'postgresql'
 DATABASE_NAME: str = SQLITE if DEBUG and env.bool('SQLITE') else POSTGRESQL
+# Пул соединений внутри процесса (`config/db_pool`), только для PostgreSQL.
+DB_POOL = env.bool('DB_POOL', False)
 
 DATABASES = {
     SQLITE: {
@@ -138,16 +146,76 @@ DATABASES = {
         'NAME': BASE_DIR / 'db.sqlite3',
     },
     POSTGRESQL: {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': (
+            'config.db_pool' if DB_POOL else 'django.db.backends.postgresql'
+        ),
         'NAME': env.str('POSTGRES_DB', 'django'),
         'USER': env.str('POSTGRES_USER', 'django'),
         'PASSWORD': env.str('POSTGRES_PASSWORD', ''),
         'HOST': env.str('POSTGRES_HOST', ''),
         'PORT': env.int('POSTGRES_PORT', 5432),
+        # С пулом соединение возвращается в него в конце каждого запроса.
+        'CONN_MAX_AGE': 0 if DB_POOL else env.int('DB_CONN_MAX_AGE', 60),
+        'CONN_HEALTH_CHECKS': env.bool('DB_CONN_HEALTH_CHECKS', True),
+        'POOL': {
+            'MIN_SIZE': env.int('DB_POOL_MIN_SIZE', 1),
+            'MAX_SIZE': env.int('DB_POOL_MAX_SIZE', 10),
+            'TIMEOUT': env.float('DB_POOL_TIMEOUT', 10.0),
+            'MAX_LIFETIME': env.float('DB_POOL_MAX_LIFETIME', 1800.0),
+        },
     }
 }
 DATABASES['default'] = DATABASES[DATABASE_NAME]
 
+# Реплики для чтения (config/db_router.py)
+# DB_REPLICA_HOSTS: хосты реплик PostgreSQL в виде host[:port] через запятую.
+# SQLITE_REPLICA: файл SQLite, заменяющий реплику при локальной разработке.
+
+DB_REPLICA_HOSTS = env.list('DB_REPLICA_HOSTS', [])
+DB_REPLICA_STICKY_SECONDS = env.int('DB_REPLICA_STICKY_SECONDS', 10)
+SQLITE_REPLICA = env.str('SQLITE_REPLICA', '')
+
+if DATABASE_NAME == POSTGRESQL:
+    for number, replica_host in enumerate(DB_REPLICA_HOSTS, start=1):
+        replica_host, _, replica_port = replica_host.partition(':')
+        DATABASES[f'replica_{number}'] = {
+            **DATABASES[POSTGRESQL],
+            'HOST': replica_host,
+            'PORT': int(replica_port or DATABASES[POSTGRESQL]['PORT']),
+            'TEST': {'MIRROR': 'default'},
+        }
+elif SQLITE_REPLICA:
+    DATABASES['replica_1'] = {
+        **DATABASES[SQLITE],
+        'NAME': BASE_DIR / SQLITE_REPLICA,
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica_')]
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['config.db_router.ReplicaRouter']
+    MIDDLEWARE.append('config.db_router.PrimaryPinMiddleware')
+
+
+# Cache
+# При нескольких воркерах нужен общий для них кеш, например
+# django.core.cache.backends.filebased.FileBasedCache.
+
+CACHES = {
+    'default': {
+        'BACKEND': env.str('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env.str('CACHE_LOCATION', ''),
+    },
+    # Сжатые тела ответов (config/compression.py): кеш процесса,
+    # не вытесняющий записи 'default'.
+    'compression': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'compression',
+        'OPTIONS': {
+            'MAX_ENTRIES': env.int('COMPRESSION_CACHE_MAX_ENTRIES', 1000),
+        },
+    },
+}
+
 
 # Password validation
 
@@ -188,6 +256,163 @@ MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 
+# Uploads
+# Файлы больше FILE_UPLOAD_MAX_MEMORY_SIZE Django пишет во временные файлы.
+# DATA_UPLOAD_MAX_MEMORY_SIZE согласован с `client_max_body_size` в nginx.
+
+FILE_UPLOAD_MAX_MEMORY_SIZE = env.int('FILE_UPLOAD_MAX_MEMORY_SIZE', 256 * 1024)
+DATA_UPLOAD_MAX_MEMORY_SIZE = env.int('DATA_UPLOAD_MAX_MEMORY_SIZE', 10 * 1024 * 1024)
+IMAGE_MAX_UPLOAD_SIZE = env.int('IMAGE_MAX_UPLOAD_SIZE', 5 * 1024 * 1024)
+IMAGE_MAX_DIMENSION = env.int('IMAGE_MAX_DIMENSION', 4096)
+
+# Уменьшенные копии изображений (config/images.py)
+
+IMAGE_DERIVATIVE_WIDTHS = sorted(env.list('IMAGE_DERIVATIVE_WIDTHS', [160, 320, 640], subcast=int))
+IMAGE_DERIVATIVE_QUALITY = env.int('IMAGE_DERIVATIVE_QUALITY', 80)
+IMAGE_DERIVATIVE_RETRY_INTERVAL = env.int('IMAGE_DERIVATIVE_RETRY_INTERVAL', 30)  # секунды
+
+
+# Фоновые задачи (jobs)
+# JOBS_ALWAYS_EAGER выполняет задачи сразу после коммита, без воркера.
+
+JOBS_ALWAYS_EAGER = env.bool('JOBS_ALWAYS_EAGER', False)
+JOBS_THREADS = env.int('JOBS_THREADS', 4)
+JOBS_POLL_INTERVAL = env.float('JOBS_POLL_INTERVAL', 1.0)
+JOBS_MAX_ATTEMPTS = env.int('JOBS_MAX_ATTEMPTS', 5)
+JOBS_RETRY_BACKOFF = env.int('JOBS_RETRY_BACKOFF', 10)  # секунды
+JOBS_RETRY_BACKOFF_MAX = env.int('JOBS_RETRY_BACKOFF_MAX', 3600)
+JOBS_LOCK_TIMEOUT = env.int('JOBS_LOCK_TIMEOUT', 600)
+JOBS_METRICS_INTERVAL = env.int('JOBS_METRICS_INTERVAL', 60)
+JOBS_KEEP_DONE_DAYS = env.int('JOBS_KEEP_DONE_DAYS', 7)
+
+
+# Предварительная отрисовка публичных страниц API (api/prerender.py)
+# PRERENDER_BASE_URL: адрес сайта для абсолютных ссылок в ответах,
+# его хост должен входить в ALLOWED_HOSTS.
+# PRERENDER_BROTLI: писать копии .json.br, нужен nginx с ngx_brotli.
+
+PRERENDER_API = env.bool('PRERENDER_API', False)
+PRERENDER_ROOT = env.path('PRERENDER_ROOT', BASE_DIR / 'prerendered')
+PRERENDER_BASE_URL = env.str('PRERENDER_BASE_URL', 'http://localhost')
+PRERENDER_RECIPE_PAGES = env.int('PRERENDER_RECIPE_PAGES', 3)
+PRERENDER_DELAY = env.int('PRERENDER_DELAY', 5)  # секунды
+PRERENDER_BROTLI = env.bool('PRERENDER_BROTLI', False)
+
+
+# Суррогатные ключи и сброс кеша обратного прокси (api/surrogate.py)
+# SURROGATE_PURGE_BACKEND: путь к классу бэкенда сброса, например
+# api.surrogate.HttpPurgeBackend. Пока он пуст, Cache-Control не задаётся.
+
+SURROGATE_KEY_HEADER = env.str('SURROGATE_KEY_HEADER', 'Surrogate-Key')
+# Не больше буфера заголовков прокси (proxy_buffer_size nginx - 4 КБ)
+# за вычетом остальных заголовков ответа.
+SURROGATE_KEY_MAX_LENGTH = env.int('SURROGATE_KEY_MAX_LENGTH', 2048)  # байты
+SURROGATE_PURGE_BACKEND = env.str('SURROGATE_PURGE_BACKEND', '')
+SURROGATE_PURGE_URL = env.str('SURROGATE_PURGE_URL', '')
+SURROGATE_PURGE_METHOD = env.str('SURROGATE_PURGE_METHOD', 'PURGE')
+SURROGATE_PURGE_HEADER = env.str('SURROGATE_PURGE_HEADER', 'Surrogate-Key')
+SURROGATE_PURGE_HEADERS = env.dict('SURROGATE_PURGE_HEADERS', {})
+SURROGATE_PURGE_BATCH_SIZE = env.int('SURROGATE_PURGE_BATCH_SIZE', 256)
+SURROGATE_PURGE_TIMEOUT = env.float('SURROGATE_PURGE_TIMEOUT', 5.0)  # секунды
+SURROGATE_PURGE_FILE = env.str('SURROGATE_PURGE_FILE', str(BASE_DIR / 'logs' / 'purge.log'))
+SURROGATE_PROXY_TTL = env.int('SURROGATE_PROXY_TTL', 24 * 60 * 60)  # секунды
+SURROGATE_BROWSER_TTL = env.int('SURROGATE_BROWSER_TTL', 0)  # секунды
+
+
+# Сжатие ответов gzip и brotli (config/compression.py)
+# Сжатые тела ответов без токена хранятся в кеше COMPRESSION_CACHE
+# (отдельный LocMemCache процесса) по хешу содержимого.
+
+COMPRESSION_ENABLED = env.bool('COMPRESSION_ENABLED', True)
+COMPRESSION_CONTENT_TYPES = env.list('COMPRESSION_CONTENT_TYPES', ['application/json'])
+COMPRESSION_MIN_LENGTH = env.int('COMPRESSION_MIN_LENGTH', 1024)  # байты
+COMPRESSION_GZIP_LEVEL = env.int('COMPRESSION_GZIP_LEVEL', 6)
+COMPRESSION_BROTLI_QUALITY = env.int('COMPRESSION_BROTLI_QUALITY', 5)
+COMPRESSION_CACHE = env.str('COMPRESSION_CACHE', 'compression')
+COMPRESSION_CACHE_TIMEOUT = env.int('COMPRESSION_CACHE_TIMEOUT', 10 * 60)  # секунды
+
+if COMPRESSION_ENABLED:
+    # Сразу после SecurityMiddleware: сжимается окончательное тело ответа.
+    MIDDLEWARE.insert(1, 'config.compression.CompressionMiddleware')
+
+
+# Лента подписок (api/feed.py)
+# Рецепты авторов, у которых подписчиков больше FEED_FANOUT_MAX_SUBSCRIBERS,
+# не раскладываются по лентам, а читаются при запросе ленты.
+
+FEED_FANOUT_MAX_SUBSCRIBERS = env.int('FEED_FANOUT_MAX_SUBSCRIBERS', 5000)
+FEED_FANOUT_BATCH_SIZE = env.int('FEED_FANOUT_BATCH_SIZE', 1000)
+FEED_BACKFILL_SIZE = env.int('FEED_BACKFILL_SIZE', 100)
+FEED_POPULAR_CACHE_TTL = env.int('FEED_POPULAR_CACHE_TTL', 300)  # секунды
+FEED_MAX_LIMIT = env.int('FEED_MAX_LIMIT', 100)
+
+
+# Похожие рецепты (api/similar.py)
+
+SIMILAR_TOP_K = env.int('SIMILAR_TOP_K', 10)
+SIMILAR_TAG_WEIGHT = env.float('SIMILAR_TAG_WEIGHT', 0.5)
+SIMILAR_MAX_FEATURE_SHARE = env.float('SIMILAR_MAX_FEATURE_SHARE', 0.05)
+SIMILAR_UPDATE_DELAY = env.int('SIMILAR_UPDATE_DELAY', 60)  # секунды
+SIMILAR_INDEX_MAX_AGE = env.int('SIMILAR_INDEX_MAX_AGE', 3600)  # секунды
+
+
+# Подбор рецептов по ингредиентам (api/pantry.py)
+
+PANTRY_REBUILD_INTERVAL = env.int('PANTRY_REBUILD_INTERVAL', 60)  # секунды
+PANTRY_MAX_DELTA = env.int('PANTRY_MAX_DELTA', 1000)
+PANTRY_MAX_AGE = env.int('PANTRY_MAX_AGE', 600)  # секунды
+
+
+# Популярность рецептов (api/popularity.py)
+# Вклад добавления в избранное или корзину уменьшается вдвое
+# каждые POPULARITY_HALF_LIFE часов.
+
+POPULARITY_HALF_LIFE = env.float('POPULARITY_HALF_LIFE', 72)  # часы
+POPULARITY_FAVORITE_WEIGHT = env.float('POPULARITY_FAVORITE_WEIGHT', 1.0)
+POPULARITY_CART_WEIGHT = env.float('POPULARITY_CART_WEIGHT', 2.0)
+POPULARITY_MAX_LIMIT = env.int('POPULARITY_MAX_LIMIT', 100)
+
+
+# Списки админки (config/paginators.py)
+# Если оценка планировщика PostgreSQL не меньше ADMIN_EXACT_COUNT_LIMIT,
+# список показывает её вместо точного COUNT(*).
+
+ADMIN_EXACT_COUNT_LIMIT = env.int('ADMIN_EXACT_COUNT_LIMIT', 10_000)
+
+
+# Кеш токенов (api/authentication.py)
+# AUTH_TOKEN_SHARED_CACHE: псевдоним из CACHES, общего для всех воркеров.
+# AUTH_TOKEN_CACHE_VERIFY_INTERVAL: через сколько секунд сброс токена
+# виден другим воркерам.
+
+AUTH_TOKEN_CACHE_SIZE = env.int('AUTH_TOKEN_CACHE_SIZE', 10_000)
+AUTH_TOKEN_CACHE_TTL = env.int('AUTH_TOKEN_CACHE_TTL', 300)  # секунды
+AUTH_TOKEN_SHARED_CACHE = env.str('AUTH_TOKEN_SHARED_CACHE', '')
+AUTH_TOKEN_CACHE_VERIFY_INTERVAL = env.int(
+    'AUTH_TOKEN_CACHE_VERIFY_INTERVAL', 5
+)  # секунды
+
+
+# Ограничение частоты запросов (api/throttling.py)
+# Корзины жетонов общие для всех воркеров узла и хранятся в THROTTLE_FILE.
+# THROTTLE_NUM_PROXIES: число прокси перед бэкендом (на сервере - внешний
+# nginx и nginx из docker compose), клиентский IP берётся
+# из X-Forwarded-For с учётом их числа.
+
+THROTTLE_ENABLED = env.bool('THROTTLE_ENABLED', True)
+THROTTLE_FILE = env.str('THROTTLE_FILE', str(
+    Path('/dev/shm' if Path('/dev/shm').is_dir() else tempfile.gettempdir())
+    / 'foodgram-throttle'
+))
+THROTTLE_SLOTS = env.int('THROTTLE_SLOTS', 65_536)
+THROTTLE_NUM_PROXIES = env.int('THROTTLE_NUM_PROXIES', 2)
+THROTTLE_RATES = {
+    'anon': env.str('THROTTLE_ANON_RATE', '120/min'),
+    'user': env.str('THROTTLE_USER_RATE', '300/min'),
+    'shopping_cart': env.str('THROTTLE_SHOPPING_CART_RATE', '20/hour'),
+}
+
+
 # Django REST Framework
 
 REST_FRAMEWORK = {
@@ -196,9 +421,22 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.AnonBucketThrottle',
+        'api.throttling.UserBucketThrottle',
+        'api.throttling.ScopedBucketThrottle',
+    ] if THROTTLE_ENABLED else [],
+    'DEFAULT_THROTTLE_RATES': THROTTLE_RATES,
+    'NUM_PROXIES': THROTTLE_NUM_PROXIES,
+
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': PAGINATION_SIZE,
 }
@@ -10,12 +10,19 @@ from django.http import HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.urls import include, path, re_path
 
+from config.db_pool.pool import pool_stats
 from food.models import SHORT_CODE_LENGTH, Recipe
 
 
 def health_check(request):
-    """Отдаёт статус 200, используется для проверки здоровья контейнера."""
-    return JsonResponse({"status": "ok"}, status=200)
+    """Отдаёт статус 200, используется для проверки здоровья контейнера.
+
+    При включённом пуле соединений добавляет метрики пулов этого процесса.
+    """
+    data = {"status": "ok"}
+    if settings.DB_POOL:
+        data["db_pool"] = pool_stats()
+    return JsonResponse(data, status=200)
 
 
 urlpatterns = [
@@ -3,30 +3,107 @@
 
 Дополнительно настроены счётчики для рецепта, отображающие
 количество добавлений в избранное и в список покупок.
+
+Связи с большими таблицами (пользователи, рецепты, ингредиенты)
+выбираются через автодополнение, а не через `<select>` со всеми
+записями, поэтому страницы изменения не зависят от размера каталога.
+
+Списки больших таблиц показывают оценочное число строк
+(`config/paginators.py`) и ищут по началу строки (`^field`) в одной
+таблице, чтобы поиск шёл по индексу (`config/db_indexes.py`).
 """
 from typing import Any
 
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.contrib.auth import get_user_model
-from django.db.models import Count
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.db.models.query import QuerySet
+from django.forms.models import BaseInlineFormSet
 from django.http import HttpRequest
 
-from food.models import Ingredient, Recipe, RecipeIngredient, ShoppingCart, Tag
+from config.paginators import EstimatedCountPaginator
+from food.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart, Tag,
+)
 
 User = get_user_model()
 
 
+def count_per_recipe(model) -> Coalesce:
+    """Число строк `model` для рецепта, подзапросом в строке списка."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(recipe=OuterRef('pk'))
+            .order_by()
+            .values('recipe')
+            .annotate(count=Count('pk'))
+            .values('count')
+        ),
+        0,
+    )
+
+
 class RecipeAuthorInline(admin.TabularInline):
     """Вставка с отображением автора рецепта."""
     model = User
     fk_name = 'author'
 
 
+class PreloadedAutocompleteSelect(AutocompleteSelect):
+    """Автодополнение, которое не запрашивает уже загруженный объект.
+
+    `AutocompleteSelect` для подписи выбранного значения делает запрос
+    в каждой строке вставки. Если объект строки уже загружен
+    (`preloaded`), подпись берётся из него.
+    """
+    preloaded = None
+
+    def optgroups(self, name, value, attr=None):
+        obj = self.preloaded
+        if obj is None or [str(item) for item in value] != [str(obj.pk)]:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        options.append(self.create_option(
+            name, obj.pk, self.choices.field.label_from_instance(obj),
+            True, len(options),
+        ))
+        return [(None, options, 0)]
+
+
+class RecipeIngredientFormSet(BaseInlineFormSet):
+    """Загружает ингредиенты всех строк вставки одним запросом."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not queryset.query.select_related:
+            self._queryset = queryset = queryset.select_related('ingredient')
+        return queryset
+
+    def _construct_form(self, i, **kwargs):
+        form = super()._construct_form(i, **kwargs)
+        if form.instance.pk is not None:
+            widget = form.fields['ingredient'].widget.widget
+            widget.preloaded = form.instance.ingredient
+        return form
+
+
 class RecipeIngredientInline(admin.TabularInline):
     """Вставка с отображением ингридиента."""
     model = RecipeIngredient
+    formset = RecipeIngredientFormSet
     fields = ('ingredient', 'amount')
+    autocomplete_fields = ('ingredient',)
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'ingredient':
+            kwargs['widget'] = PreloadedAutocompleteSelect(
+                db_field, self.admin_site, using=kwargs.get('using')
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
 @admin.register(Recipe)
@@ -40,16 +117,26 @@ class RecipeAdmin(admin.ModelAdmin):
         'cooking_time',
         'favorites_count',
         'shopping_cart_count',
+        'popularity',
     )
     list_filter = ('tags',)
-    search_fields = ('name', 'author__username')
+    list_select_related = ('author',)
+    # Рецепты автора открываются ссылкой со страницы пользователя.
+    search_fields = ('^name',)
+    search_help_text = 'Поиск по началу названия.'
+    autocomplete_fields = ('author',)
     inlines = (RecipeIngredientInline,)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def get_queryset(self, request: HttpRequest) -> QuerySet[Any]:
+        """Счётчики считаются подзапросами только для строк страницы,
+        а не группировкой всей таблицы с соединением избранного и корзины.
+        """
         queryset = super().get_queryset(request)
         return queryset.annotate(
-            _favorites_count=Count('is_favorited'),
-            _shopping_cart_count=Count('is_in_shopping_cart')
+            _favorites_count=count_per_recipe(Favorite),
+            _shopping_cart_count=count_per_recipe(ShoppingCart),
         )
 
     @admin.display(
@@ -77,7 +164,8 @@ class RecipeAdmin(admin.ModelAdmin):
 class IngredientAdmin(admin.ModelAdmin):
     """Отображение модели `Ingredient` в админ части сайта."""
     list_display = ('__str__',)
-    search_fields = ('name',)
+    # Поиск по началу названия использует индекс по `name`.
+    search_fields = ('^name',)
 
 
 @admin.register(Tag)
@@ -91,11 +179,33 @@ class TagAdmin(admin.ModelAdmin):
 class RecipeIngredientAdmin(admin.ModelAdmin):
     """Отображение модели `RecipeIngredient` в админке."""
     list_display = ('recipe', 'ingredient', 'amount')
-    search_fields = ('recipe__name', 'ingredient__name')
+    list_select_related = ('recipe__author', 'ingredient')
+    search_fields = ('^recipe__name',)
+    search_help_text = 'Поиск по началу названия рецепта.'
+    autocomplete_fields = ('recipe', 'ingredient')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Favorite)
+class FavoriteAdmin(admin.ModelAdmin):
+    """Отображение таблицы избранного `favorite` в админке."""
+    list_display = ('user', 'recipe')
+    list_select_related = ('user', 'recipe__author')
+    search_fields = ('^user__username',)
+    search_help_text = 'Поиск по началу имени пользователя.'
+    autocomplete_fields = ('user', 'recipe')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
     """Отображение модели 'ShoppingCart' в админке."""
-    list_display = ('user', 'recipe')
-    search_fields = ('user__username', 'recipe__name')
+    list_display = ('user', 'recipe', 'added')
+    list_select_related = ('user', 'recipe__author')
+    search_fields = ('^user__username',)
+    search_help_text = 'Поиск по началу имени пользователя.'
+    autocomplete_fields = ('user', 'recipe')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class FoodConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'food'
+
+    def ready(self):
+        from config.db_indexes import create_m2m_indexes
+
+        # Индексы таблиц M2M без `through` не попадают в миграции.
+        post_migrate.connect(create_m2m_indexes, sender=self)
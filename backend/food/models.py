@@ -5,12 +5,15 @@
     - Recipe: рецепт;
     - Ingredient: ингредиент;
     - Tag: теги;
-    - RecipeIngredient: расширенная связь рецепта с ингредиентом.
+    - RecipeIngredient: расширенная связь рецепта с ингредиентом;
+    - FavoriteAdded: время добавления рецепта в избранное;
+    - ShoppingCart: рецепт в корзине для покупок пользователя;
+    - TimelineEntry: рецепт в ленте подписок пользователя;
+    - SimilarRecipe: похожий рецепт с оценкой сходства.
 
 Таблицы, созданные под капотом Django:
-    - favorite: связь рецепта с `User` для реализации избранного;
-    - in_shopping_cart: связь рецепта с `User` для реализации добавления
-    рецепта в корзину для покупок.
+    - favorite: связь рецепта с `User` для реализации избранного
+    (модель доступна как `Favorite`).
 """
 import random
 import string
@@ -18,6 +21,7 @@ import string
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from django.db import IntegrityError, models
+from django.utils import timezone
 
 from config.db_indexes import get_indexes_for_model
 
@@ -115,6 +119,12 @@ class Recipe(NamedModel):
         unique=True,
         editable=False,
     )
+    popularity = models.FloatField(
+        'популярность',
+        default=0,
+        editable=False,
+        help_text='Пересчитывается командой refresh_popularity.',
+    )
 
     class Meta:
         indexes = get_indexes_for_model('Recipe')
@@ -170,6 +180,49 @@ class RecipeIngredient(models.Model):
         verbose_name_plural = 'Ингредиенты в рецептах'
 
 
+Favorite = Recipe.is_favorited.through
+
+
+class FavoriteAdded(models.Model):
+    """Время добавления рецепта в избранное пользователя.
+
+    Нужно для популярности с затуханием. Хранится отдельно от таблицы
+    `favorite`, созданной Django для `ManyToManyField`: добавить поле
+    в неё можно только заменой связи на `through`-модель, которую
+    `makemigrations` не выполняет. Записи ведут сигналы избранного
+    и сверяет с `favorite` команда `refresh_popularity`.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='favorite_times',
+        verbose_name='пользователь'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='favorite_times',
+        verbose_name='рецепт'
+    )
+    added = models.DateTimeField(
+        'дата добавления', default=timezone.now, editable=False
+    )
+
+    class Meta:
+        indexes = get_indexes_for_model('FavoriteAdded')
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_user_recipe_favorite_added',
+            )
+        ]
+        verbose_name = 'Рецепт в избранном'
+        verbose_name_plural = 'Рецепты в избранном'
+
+    def __str__(self):
+        return f'Рецепт "{self.recipe}" в избранном у {self.user}'
+
+
 class ShoppingCart(models.Model):
     """Модель для связи 'пользователь <-> рецепт' в корзине."""
     user = models.ForeignKey(
@@ -184,9 +237,13 @@ class ShoppingCart(models.Model):
         related_name='shopping_cart_positions',
         verbose_name='рецепт'
     )
+    added = models.DateTimeField(
+        'дата добавления', default=timezone.now, editable=False
+    )
 
     class Meta:
         db_table = 'in_shopping_cart'
+        indexes = get_indexes_for_model('ShoppingCart')
         constraints = [
             models.UniqueConstraint(
                 fields=('user', 'recipe'),
@@ -198,3 +255,80 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'Рецепт "{self.recipe}" в корзине у {self.user}'
+
+
+class TimelineEntry(models.Model):
+    """Рецепт в ленте пользователя от автора, на которого он подписан.
+
+    Записи создаются фоновыми задачами при публикации рецепта и при
+    подписке (`api/feed.py`). Автор и дата публикации копируются
+    из рецепта, чтобы лента читалась по одному индексу без соединений.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='владелец ленты',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='рецепт',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='автор рецепта',
+    )
+    pub_date = models.DateTimeField('дата публикации рецепта')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_timeline_entry',
+            )
+        ]
+        indexes = get_indexes_for_model('TimelineEntry')
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+
+    def __str__(self):
+        return f'Рецепт "{self.recipe}" в ленте {self.user}'
+
+
+class SimilarRecipe(models.Model):
+    """Похожий рецепт из списка ближайших соседей рецепта.
+
+    Списки пересчитываются фоновыми задачами (`api/similar.py`).
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='рецепт',
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='похожий рецепт',
+    )
+    score = models.FloatField('сходство')
+    rank = models.PositiveSmallIntegerField('место')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('recipe', 'similar'),
+                name='unique_similar_recipe',
+            )
+        ]
+        indexes = get_indexes_for_model('SimilarRecipe')
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+
+    def __str__(self):
+        return f'{self.similar} похож на {self.recipe}'
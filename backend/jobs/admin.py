@@ -0,0 +1,42 @@
+"""
+Описывает отображение фоновых задач в админке.
+
+Дополнительно:
+    - requeue: действие, возвращающее выбранные задачи в очередь
+    (например, задачи из dead letter после исправления ошибки).
+"""
+from django.contrib import admin
+from django.utils import timezone
+
+from jobs.models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Отображение модели `Job` в админ части сайта."""
+    list_display = (
+        'id',
+        'task',
+        'status',
+        'attempts',
+        'max_attempts',
+        'run_at',
+        'finished_at',
+        'locked_by',
+    )
+    list_filter = ('status', 'task')
+    search_fields = ('task', 'unique_key')
+    readonly_fields = (
+        'created_at', 'started_at', 'finished_at', 'locked_by', 'last_error',
+    )
+    actions = ('requeue',)
+
+    @admin.action(description='Вернуть в очередь')
+    def requeue(self, request, queryset):
+        updated = queryset.exclude(status=Job.Status.RUNNING).update(
+            status=Job.Status.PENDING,
+            attempts=0,
+            locked_by='',
+            run_at=timezone.now(),
+        )
+        self.message_user(request, f'Возвращено в очередь задач: {updated}.')
@@ -0,0 +1,81 @@
+import json
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.queue import registered_tasks
+from jobs.worker import Worker, queue_stats
+
+
+def _run_worker(threads: int, poll_interval: float, once: bool) -> None:
+    """Запускает воркер в текущем процессе и останавливает его по сигналу."""
+    worker = Worker(threads=threads, poll_interval=poll_interval)
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: worker.stop())
+    worker.run(once=once)
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в базе данных.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=settings.JOBS_THREADS,
+            help='Число потоков в каждом процессе воркера.',
+        )
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Число процессов воркера.',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            default=settings.JOBS_POLL_INTERVAL,
+            help='Пауза между опросами пустой очереди, в секундах.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Завершиться, когда очередь опустеет.',
+        )
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Вывести состояние очереди в JSON и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(queue_stats()))
+            return
+
+        self.stdout.write(
+            f'Зарегистрированные задачи: {", ".join(registered_tasks())}'
+        )
+        worker_args = (
+            options['threads'], options['poll_interval'], options['once'],
+        )
+        if options['processes'] <= 1:
+            _run_worker(*worker_args)
+            return
+
+        # Соединения с БД не должны наследоваться дочерними процессами.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=_run_worker, args=worker_args)
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+
+        def stop(*args):
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for process in processes:
+            process.join()
+        self.stdout.write(self.style.SUCCESS('Воркеры остановлены.'))
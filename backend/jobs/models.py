@@ -0,0 +1,72 @@
+"""
+Описывает модель фоновой задачи, хранимой в основной базе данных.
+
+Очередь не требует брокера сообщений: задачи записываются в таблицу
+в той же транзакции, что и изменения данных, а воркер
+(`manage.py run_jobs`) забирает их из таблицы.
+
+Жизненный цикл задачи:
+    pending -> running -> done
+                       -> pending (повтор с задержкой)
+                       -> dead (исчерпаны попытки, dead letter)
+"""
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from config.db_indexes import get_indexes_for_model
+
+STATUS_LENGTH: int = 10
+TASK_NAME_LENGTH: int = 200
+UNIQUE_KEY_LENGTH: int = 200
+WORKER_NAME_LENGTH: int = 100
+
+
+class Job(models.Model):
+    """Модель фоновой задачи."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'в очереди'
+        RUNNING = 'running', 'выполняется'
+        DONE = 'done', 'выполнена'
+        DEAD = 'dead', 'не выполнена (dead letter)'
+
+    task = models.CharField('задача', max_length=TASK_NAME_LENGTH)
+    payload = models.JSONField('аргументы', default=dict, blank=True)
+    status = models.CharField(
+        'статус',
+        max_length=STATUS_LENGTH,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    unique_key = models.CharField(
+        'ключ уникальности',
+        max_length=UNIQUE_KEY_LENGTH,
+        blank=True,
+        help_text=(
+            'Пока в очереди есть задача с этим ключом, '
+            'новая с таким же ключом не создаётся.'
+        ),
+    )
+    attempts = models.PositiveSmallIntegerField('попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'максимум попыток',
+        default=settings.JOBS_MAX_ATTEMPTS,
+    )
+    run_at = models.DateTimeField('запустить не раньше', default=timezone.now)
+    created_at = models.DateTimeField('создана', auto_now_add=True)
+    started_at = models.DateTimeField('запущена', null=True, blank=True)
+    finished_at = models.DateTimeField('завершена', null=True, blank=True)
+    locked_by = models.CharField(
+        'воркер', max_length=WORKER_NAME_LENGTH, blank=True,
+    )
+    last_error = models.TextField('последняя ошибка', blank=True)
+
+    class Meta:
+        indexes = get_indexes_for_model('Job')
+        ordering = ('-created_at',)
+        verbose_name = 'фоновая задача'
+        verbose_name_plural = 'фоновые задачи'
+
+    def __str__(self) -> str:
+        return f'{self.task} #{self.pk} ({self.status})'
@@ -0,0 +1,137 @@
+"""
+Реализует регистрацию задач и постановку их в очередь.
+
+Пример:
+    # food/tasks.py
+    from jobs.queue import task
+
+    @task('food.refresh_something')
+    def refresh_something(recipe_id: int) -> None:
+        ...
+
+    # В коде записи данных:
+    enqueue('food.refresh_something', {'recipe_id': recipe.id})
+
+Задача записывается в текущей транзакции: если транзакция откатится,
+задача тоже не появится. Аргументы задачи должны сериализоваться в JSON.
+"""
+import logging
+from datetime import timedelta
+from typing import Any, Callable, Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from jobs.models import Job
+
+logger = logging.getLogger(__name__)
+
+TaskFunction = Callable[..., Any]
+
+_registry: dict[str, TaskFunction] = {}
+
+
+def task(name: str) -> Callable[[TaskFunction], TaskFunction]:
+    """Регистрирует функцию как фоновую задачу с заданным именем."""
+    def decorator(function: TaskFunction) -> TaskFunction:
+        if name in _registry and _registry[name] is not function:
+            raise ValueError(f'Задача "{name}" уже зарегистрирована.')
+        _registry[name] = function
+        return function
+    return decorator
+
+
+def get_task(name: str) -> TaskFunction:
+    """Возвращает функцию задачи по имени."""
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f'Задача "{name}" не зарегистрирована.')
+
+
+def registered_tasks() -> list[str]:
+    """Возвращает имена всех зарегистрированных задач."""
+    return sorted(_registry)
+
+
+def enqueue(
+    name: str,
+    payload: Optional[dict[str, Any]] = None,
+    *,
+    delay: float = 0,
+    max_attempts: Optional[int] = None,
+    unique_key: str = '',
+) -> Optional[Job]:
+    """Ставит задачу в очередь.
+
+    Args:
+        name: Имя зарегистрированной задачи.
+        payload: Именованные аргументы задачи.
+        delay: Задержка запуска в секундах.
+        max_attempts: Число попыток до переноса в dead letter.
+        unique_key: Если в очереди уже ждёт задача с таким ключом,
+            новая не создаётся (например, для пересборки кеша).
+
+    Returns:
+        Созданная задача или None, если задача выполнена сразу
+        (`JOBS_ALWAYS_EAGER`) либо уже стоит в очереди.
+    """
+    get_task(name)
+    payload = payload or {}
+
+    if settings.JOBS_ALWAYS_EAGER:
+        transaction.on_commit(lambda: get_task(name)(**payload))
+        return None
+
+    if unique_key and Job.objects.filter(
+        unique_key=unique_key, status=Job.Status.PENDING
+    ).exists():
+        logger.debug(f'Задача {name} с ключом {unique_key} уже в очереди.')
+        return None
+
+    job = Job.objects.create(
+        task=name,
+        payload=payload,
+        unique_key=unique_key,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+    logger.debug(f'Задача {job} поставлена в очередь.')
+    return job
+
+
+def enqueue_many(
+    name: str,
+    payloads: Iterable[dict[str, Any]],
+    *,
+    delay: float = 0,
+    max_attempts: Optional[int] = None,
+) -> list[Job]:
+    """Ставит в очередь несколько задач одним запросом.
+
+    Используется при массовой записи данных, когда сигналы моделей
+    не отправляются (например, после `bulk_create`).
+    """
+    get_task(name)
+    payloads = list(payloads)
+
+    if settings.JOBS_ALWAYS_EAGER:
+        for payload in payloads:
+            transaction.on_commit(
+                lambda payload=payload: get_task(name)(**payload)
+            )
+        return []
+
+    run_at = timezone.now() + timedelta(seconds=delay)
+    jobs = Job.objects.bulk_create(
+        Job(
+            task=name,
+            payload=payload,
+            max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+            run_at=run_at,
+        )
+        for payload in payloads
+    )
+    logger.debug(f'В очередь поставлено задач {name}: {len(jobs)}.')
+    return jobs
@@ -0,0 +1,271 @@
+"""
+Реализует воркер, выполняющий задачи из очереди в пуле потоков.
+
+Захват задач:
+    - PostgreSQL: `SELECT ... FOR UPDATE SKIP LOCKED`, поэтому несколько
+      воркеров не ждут друг друга и не получают одну задачу дважды;
+    - SQLite: блокировок строк нет, задача достаётся тому воркеру,
+      чей условный `UPDATE ... WHERE status = 'pending'` изменил строку.
+      Новые задачи находятся опросом таблицы раз в `poll_interval` секунд.
+
+Упавшая задача повторяется с экспоненциальной задержкой, после
+`max_attempts` попыток переносится в статус `dead` (dead letter).
+Задачи, зависшие в статусе `running` дольше `JOBS_LOCK_TIMEOUT`
+(например, после падения воркера), возвращаются в очередь.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import get_task
+
+logger = logging.getLogger(__name__)
+
+MAX_ERROR_LENGTH: int = 10_000
+
+
+class Metrics:
+    """Потокобезопасные счётчики работы воркера."""
+    FIELDS: tuple[str, ...] = (
+        'claimed', 'succeeded', 'retried', 'dead', 'recovered',
+    )
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.busy_seconds = 0.0
+        self.counters = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    def add_busy(self, seconds: float) -> None:
+        with self._lock:
+            self.busy_seconds += seconds
+
+    def snapshot(self) -> dict[str, Any]:
+        """Возвращает текущие значения счётчиков."""
+        with self._lock:
+            finished = self.counters['succeeded'] + self.counters['dead']
+            return {
+                **self.counters,
+                'uptime_seconds': round(time.monotonic() - self.started, 1),
+                'busy_seconds': round(self.busy_seconds, 3),
+                'avg_job_seconds': round(
+                    self.busy_seconds / finished, 3
+                ) if finished else 0.0,
+            }
+
+
+def queue_stats() -> dict[str, Any]:
+    """Возвращает состояние очереди: число задач по статусам и задержку."""
+    counts = dict.fromkeys(Job.Status.values, 0)
+    counts.update(
+        Job.objects.values_list('status')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    oldest = Job.objects.filter(
+        status=Job.Status.PENDING, run_at__lte=timezone.now()
+    ).aggregate(oldest=Min('run_at'))['oldest']
+    lag = (timezone.now() - oldest).total_seconds() if oldest else 0.0
+    return {**counts, 'lag_seconds': round(lag, 1)}
+
+
+def retry_delay(attempt: int) -> timedelta:
+    """Возвращает задержку перед повтором: растёт вдвое с каждой попыткой."""
+    seconds = settings.JOBS_RETRY_BACKOFF * 2 ** max(attempt - 1, 0)
+    return timedelta(seconds=min(seconds, settings.JOBS_RETRY_BACKOFF_MAX))
+
+
+def claim_jobs(worker_name: str, limit: int) -> list[Job]:
+    """Забирает до `limit` готовых к запуску задач."""
+    now = timezone.now()
+    with transaction.atomic():
+        candidates = Job.objects.filter(
+            status=Job.Status.PENDING, run_at__lte=now,
+        ).order_by('run_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('id', flat=True)[:limit])
+        if not ids:
+            return []
+        Job.objects.filter(id__in=ids, status=Job.Status.PENDING).update(
+            status=Job.Status.RUNNING,
+            locked_by=worker_name,
+            started_at=now,
+            attempts=F('attempts') + 1,
+        )
+    return list(Job.objects.filter(
+        id__in=ids,
+        status=Job.Status.RUNNING,
+        locked_by=worker_name,
+        started_at=now,
+    ).order_by('run_at', 'id'))
+
+
+def recover_stale_jobs() -> int:
+    """Возвращает в очередь задачи, зависшие в статусе `running`."""
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.Status.RUNNING,
+        started_at__lt=now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT),
+    )
+    dead = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.Status.DEAD,
+        finished_at=now,
+        last_error='Превышено время выполнения.',
+    )
+    retried = stale.update(
+        status=Job.Status.PENDING,
+        locked_by='',
+        run_at=now,
+        last_error='Превышено время выполнения.',
+    )
+    return dead + retried
+
+
+def purge_finished_jobs() -> int:
+    """Удаляет выполненные задачи старше `JOBS_KEEP_DONE_DAYS` дней."""
+    border = timezone.now() - timedelta(days=settings.JOBS_KEEP_DONE_DAYS)
+    deleted, _ = Job.objects.filter(
+        status=Job.Status.DONE, finished_at__lt=border,
+    ).delete()
+    return deleted
+
+
+def execute_job(job: Job, metrics: Metrics) -> None:
+    """Выполняет задачу и записывает результат."""
+    close_old_connections()
+    started = time.monotonic()
+    try:
+        get_task(job.task)(**job.payload)
+    except Exception:
+        error = traceback.format_exc()[-MAX_ERROR_LENGTH:]
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.Status.DEAD, finished_at=now, last_error=error,
+            )
+            metrics.add('dead')
+            logger.error(f'Задача {job} перенесена в dead letter:\n{error}')
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.Status.PENDING,
+                locked_by='',
+                run_at=now + retry_delay(job.attempts),
+                last_error=error,
+            )
+            metrics.add('retried')
+            logger.warning(
+                f'Задача {job} упала (попытка {job.attempts} '
+                f'из {job.max_attempts}), будет повторена.'
+            )
+    else:
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.Status.DONE,
+            finished_at=timezone.now(),
+            last_error='',
+        )
+        metrics.add('succeeded')
+    finally:
+        metrics.add_busy(time.monotonic() - started)
+        close_old_connections()
+
+
+class Worker:
+    """Воркер, выполняющий задачи в пуле потоков."""
+
+    def __init__(
+        self,
+        threads: int = 1,
+        poll_interval: float = 1.0,
+        name: str = '',
+    ) -> None:
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.metrics = Metrics()
+        self._stop = threading.Event()
+        self._slots = threading.Semaphore(threads)
+
+    def stop(self) -> None:
+        """Просит воркер завершиться после текущих задач."""
+        self._stop.set()
+
+    def _run_job(self, job: Job) -> None:
+        try:
+            execute_job(job, self.metrics)
+        finally:
+            self._slots.release()
+
+    def _maintenance(self) -> None:
+        recovered = recover_stale_jobs()
+        if recovered:
+            self.metrics.add('recovered', recovered)
+            logger.warning(f'Возвращено в очередь зависших задач: {recovered}')
+        purge_finished_jobs()
+        logger.info(
+            f'Воркер {self.name}: {self.metrics.snapshot()}, '
+            f'очередь: {queue_stats()}'
+        )
+
+    def run(self, once: bool = False) -> None:
+        """Выполняет задачи, пока не будет вызван `stop()`.
+
+        Args:
+            once: Завершиться, как только очередь опустеет.
+        """
+        logger.info(f'Воркер {self.name} запущен, потоков: {self.threads}.')
+        next_maintenance = 0.0
+        with ThreadPoolExecutor(
+            max_workers=self.threads, thread_name_prefix='job'
+        ) as executor:
+            while not self._stop.is_set():
+                if time.monotonic() >= next_maintenance:
+                    self._maintenance()
+                    next_maintenance = (
+                        time.monotonic() + settings.JOBS_METRICS_INTERVAL
+                    )
+
+                free = 0
+                while self._slots.acquire(blocking=False):
+                    free += 1
+                jobs = claim_jobs(self.name, free) if free else []
+                for _ in range(free - len(jobs)):
+                    self._slots.release()
+
+                self.metrics.add('claimed', len(jobs))
+                for job in jobs:
+                    executor.submit(self._run_job, job)
+
+                if not jobs:
+                    if once and self._idle():
+                        break
+                    self._stop.wait(self.poll_interval)
+        close_old_connections()
+        logger.info(
+            f'Воркер {self.name} остановлен: {self.metrics.snapshot()}'
+        )
+
+    def _idle(self) -> bool:
+        """Проверяет, что все потоки свободны."""
+        acquired = 0
+        while self._slots.acquire(blocking=False):
+            acquired += 1
+        for _ in range(acquired):
+            self._slots.release()
+        return acquired == self.threads
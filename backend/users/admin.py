@@ -2,25 +2,58 @@
 Описывает отображение пользователя в админке.
 
 Дополнительно:
-    - RecipeInline: подключает отображение рецептов,
-    автором которых является пользователь.
+    - RecipeInline: подключает отображение последних рецептов,
+    автором которых является пользователь. Полный список открывается
+    ссылкой на список рецептов, отфильтрованный по автору.
 """
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin
+from django.forms.models import BaseInlineFormSet
+from django.urls import reverse
+from django.utils.html import format_html
 
+from config.paginators import EstimatedCountPaginator
 from food.models import Recipe
 from users.models import Subscription
 
 PAGINATION_SIZE_USER_ADMIN: int = 10
+RECIPE_INLINE_LIMIT: int = 10
 
 User = get_user_model()
 
 
+class LatestRecipesFormSet(BaseInlineFormSet):
+    """Ограничивает вставку последними рецептами автора."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not queryset.query.is_sliced:
+            queryset = queryset.only('author', *RecipeInline.fields)
+            self._queryset = queryset = queryset[:RECIPE_INLINE_LIMIT]
+        return queryset
+
+    def _construct_form(self, i, **kwargs):
+        form = super()._construct_form(i, **kwargs)
+        # Подпись строки (`Recipe.__str__`) обращается к автору.
+        form.instance.author = self.instance
+        return form
+
+
 class RecipeInline(admin.TabularInline):
-    """Вставка с отображением авторских рецептов."""
+    """Вставка с отображением последних авторских рецептов."""
     model = Recipe
     fk_name = 'author'
+    formset = LatestRecipesFormSet
+    fields = ('name', 'pub_date', 'cooking_time')
+    readonly_fields = fields
+    verbose_name_plural = f'последние рецепты (до {RECIPE_INLINE_LIMIT})'
+    show_change_link = True
+    can_delete = False
+    extra = 0
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(User)
@@ -31,17 +64,42 @@ class CustomUserAdmin(UserAdmin):
         'username',
         'first_name',
         'last_name',
+        'recipes_count',
+        'subscribers_count',
         'is_active',
         'is_superuser',
     )
-    search_fields = ('email', 'username', 'first_name', 'last_name')
+    search_fields = ('^username', '^email')
+    search_help_text = 'Поиск по началу имени пользователя или почты.'
     list_filter = ('is_active', 'is_staff', 'is_superuser')
     inlines = (RecipeInline,)
     list_per_page = PAGINATION_SIZE_USER_ADMIN
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    fieldsets = UserAdmin.fieldsets + (
+        ('Рецепты', {
+            'fields': ('recipes_count', 'subscribers_count', 'recipes_link'),
+        }),
+    )
+    readonly_fields = ('recipes_count', 'subscribers_count', 'recipes_link')
+
+    @admin.display(description='Все рецепты')
+    def recipes_link(self, obj):
+        """Ссылка на список рецептов пользователя."""
+        url = reverse('admin:food_recipe_changelist')
+        return format_html(
+            '<a href="{}?author__id__exact={}">Открыть список</a>',
+            url, obj.pk,
+        )
 
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
     """Отображение модели Subscription в админ части сайта."""
     list_display = ('user', 'author',)
-    search_fields = ('user__username', 'author__username')
+    list_select_related = ('user', 'author')
+    search_fields = ('^user__username',)
+    search_help_text = 'Поиск по началу имени подписчика.'
+    autocomplete_fields = ('user', 'author')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
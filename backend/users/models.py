@@ -2,7 +2,8 @@
 Модуль описывает универсальную модель пользователя и функционал подписок.
 
 Основные классы:
-    - User: расширенная модель пользователя с дополнительным полем `avatar`.
+    - User: расширенная модель пользователя с дополнительным полем `avatar`
+    и счётчиками рецептов и подписчиков.
     - Subscription: представляет подписку одного пользователя на другого.
 
 Применение:
@@ -13,6 +14,9 @@ from django.db import models
 
 from config.db_indexes import get_indexes_for_model
 
+# Меняются только выражениями в базе (`api/counters.py`).
+COUNTER_FIELDS: tuple[str, ...] = ('recipes_count', 'subscribers_count')
+
 
 class User(AbstractUser):
     """Расширенная модель пользователя."""
@@ -23,17 +27,49 @@ class User(AbstractUser):
         blank=True,
         null=True,
     )
+    recipes_count = models.PositiveIntegerField(
+        'рецептов',
+        default=0,
+        editable=False,
+    )
+    subscribers_count = models.PositiveIntegerField(
+        'подписчиков',
+        default=0,
+        editable=False,
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 
     class Meta:
+        indexes = get_indexes_for_model('User')
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
 
     def __str__(self) -> str:
         return self.username
 
+    def save(self, *args, **kwargs):
+        """Сохраняет пользователя, не трогая счётчики.
+
+        Экземпляр мог быть загружен до их изменения, и полное сохранение
+        вернуло бы старые значения. Незагруженные поля (пользователь
+        из кеша токенов) тоже не сохраняются, как и в `Model.save`.
+        """
+        if (
+            not self._state.adding
+            and not kwargs.get('force_insert')
+            and kwargs.get('update_fields') is None
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
 
 class Subscription(models.Model):
     """Модель пользовательской подписки."""